@@ -9,7 +9,7 @@ from pulsewave.validators import validate_name
 
 class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField('Эл. почта', unique=True)
-    date_joined = models.DateTimeField('Дата создания', auto_now_add=True)
+    date_joined = models.DateTimeField('Дата создания', auto_now_add=True, db_index=True)
     is_active = models.BooleanField('Активирован', default=True)  # обязательно
     is_staff = models.BooleanField('Персонал', default=False)  # для админ панели
 
@@ -3,6 +3,8 @@ from rest_framework_simplejwt.utils import aware_utcnow
 from celery import shared_task
 from django.contrib.auth import get_user_model
 
+from logic.sweeper import sweep_expired
+
 User = get_user_model()
 
 
@@ -11,8 +13,15 @@ def clear_expired_token():
     OutstandingToken.objects.filter(expires_at__lte=aware_utcnow()).delete()
 
 
+@shared_task
+def sweep_expired_objects():
+    """Удаление просроченных приглашений и неактивированных пользователей"""
+    return sweep_expired()
+
+
 @shared_task
 def delete_inactive_user(user_id):
+    # задачи, поставленные до перехода на sweep_expired_objects
     user = User.objects.filter(id=user_id).first()
     if user and not user.is_active:
         user.delete()
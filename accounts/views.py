@@ -192,14 +192,13 @@ class DeleteTelegramView(generics.GenericAPIView):
         telebot_user = TeleBotID.objects.filter(user_id=user.id)
         if telebot_user:
             # получаем id телеграм чата юзера
-            recipients = get_telegram_id([user.id, ])
+            recipients = list(get_telegram_id([user.id, ]).values())
             # удаляем подписку на телеграм
             telebot_user.delete()
             # отправляем уведомление в телеграм об удалении
-            send_notification_to_redis(
-                bot_message['mail_delete'],
-                recipients,
-            )
+            send_notification_to_redis([
+                (bot_message['mail_delete'], recipients),
+            ])
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             return Response(
@@ -0,0 +1,67 @@
+from typing import Iterable
+
+from logic.ancestry import ancestry
+from logic.cache import TwoLevelCache
+from workspaces.models import WorkSpace
+
+
+class AccessCache(TwoLevelCache):
+    """
+    Кэш прав доступа к РП и их обьектам.
+    Право пользователя на доску, колонку или задачу раскладывается на две
+    записи: РП обьекта (logic.ancestry) и множество РП, участником которых
+    он является. Обе хранятся в Redis и в памяти процесса, в обычном
+    случае проверка прав не делает запросов к БД.
+
+    Записи участников сбрасываются при изменении WorkSpace.users
+    (см. workspaces.signals).
+    """
+    timeout_setting = 'ACL_CACHE_TIMEOUT'
+
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f'acl:user:{user_id}'
+
+    @staticmethod
+    def _loader(user_id: int):
+        def load():
+            ids = (WorkSpace.users.through.objects
+                   .filter(user_id=user_id)
+                   .values_list('workspace_id', flat=True))
+            return ','.join(map(str, ids))
+
+        return load
+
+    @staticmethod
+    def _parse(value: str) -> frozenset:
+        return frozenset(int(ws_id) for ws_id in value.split(',') if ws_id)
+
+    def user_workspaces(self, user_id: int) -> frozenset:
+        """id РП, участником которых является пользователь"""
+        return self._parse(self.get(self._user_key(user_id), self._loader(user_id)))
+
+    async def auser_workspaces(self, user_id: int) -> frozenset:
+        return self._parse(await self.aget(self._user_key(user_id), self._loader(user_id)))
+
+    def has_access(self, user_id: int, kind: str, obj_id: int) -> bool:
+        """Пользователь - участник РП (kind='workspace') или РП обьекта"""
+        if kind == 'workspace':
+            ws_id = obj_id
+        else:
+            ws_id = ancestry.workspace_id(kind, obj_id)
+        return ws_id is not None and ws_id in self.user_workspaces(user_id)
+
+    async def ahas_access(self, user_id: int, kind: str, obj_id: int) -> bool:
+        """has_access для вебсокетов, без пула потоков, если данные в кэше"""
+        if kind == 'workspace':
+            ws_id = obj_id
+        else:
+            parents = await ancestry.aresolve(kind, obj_id)
+            ws_id = None if parents is None else parents.workspace_id
+        return ws_id is not None and ws_id in await self.auser_workspaces(user_id)
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> None:
+        self.invalidate(self._user_key(user_id) for user_id in user_ids)
+
+
+access_cache = AccessCache()
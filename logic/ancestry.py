@@ -0,0 +1,69 @@
+from typing import NamedTuple, Optional
+
+from logic.cache import TwoLevelCache
+from workspaces.models import Board, Column, Task
+
+
+class Ancestry(NamedTuple):
+    workspace_id: int
+    board_id: int
+    column_id: Optional[int] = None
+
+
+# вид обьекта: модель и поля родителей (РП, доска, колонка)
+ANCESTRY_FIELDS = {
+    'board': (Board, ('workspace_id', 'id')),
+    'column': (Column, ('board__workspace_id', 'board_id')),
+    'task': (Task, ('column__board__workspace_id', 'column__board_id', 'column_id')),
+}
+
+
+class AncestryIndex(TwoLevelCache):
+    """
+    Родители доски, колонки или задачи (РП, доска, колонка) без join-ов:
+    цепочка задача -> колонка -> доска -> РП читается из БД один раз и
+    кэшируется. Запись обьекта сбрасывается при создании, смене
+    родителя и удалении (см. workspaces.signals).
+    """
+    timeout_setting = 'ANCESTRY_CACHE_TIMEOUT'
+
+    @staticmethod
+    def key(kind: str, obj_id: int) -> str:
+        return f'ancestry:{kind}:{obj_id}'
+
+    @staticmethod
+    def _loader(kind: str, obj_id: int):
+        model_class, fields = ANCESTRY_FIELDS[kind]
+
+        def load():
+            row = model_class.objects.filter(pk=obj_id).values_list(*fields).first()
+            return None if row is None else ','.join(map(str, row))
+
+        return load
+
+    @staticmethod
+    def _parse(value: Optional[str]) -> Optional[Ancestry]:
+        if value is None:
+            return None
+        return Ancestry(*map(int, value.split(',')))
+
+    def resolve(self, kind: str, obj_id: int) -> Optional[Ancestry]:
+        """Родители обьекта, None - обьекта нет"""
+        return self._parse(self.get(self.key(kind, obj_id), self._loader(kind, obj_id)))
+
+    async def aresolve(self, kind: str, obj_id: int) -> Optional[Ancestry]:
+        return self._parse(await self.aget(self.key(kind, obj_id), self._loader(kind, obj_id)))
+
+    def workspace_id(self, kind: str, obj_id: int) -> Optional[int]:
+        ancestry = self.resolve(kind, obj_id)
+        return None if ancestry is None else ancestry.workspace_id
+
+    def board_id(self, kind: str, obj_id: int) -> Optional[int]:
+        ancestry = self.resolve(kind, obj_id)
+        return None if ancestry is None else ancestry.board_id
+
+    def forget(self, kind: str, obj_id: int) -> None:
+        self.invalidate([self.key(kind, obj_id)])
+
+
+ancestry = AncestryIndex()
@@ -0,0 +1,138 @@
+import time
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import redis
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from logic.redis_client import get_redis, get_async_redis
+
+# база Redis для кэшей обьектов РП
+CACHE_REDIS_DB = 5
+
+# запись значения, только если ключ не инвалидирован после чтения из БД:
+# иначе устаревшие данные, прочитанные до фиксации транзакции,
+# могут перезаписать свежую инвалидацию
+SET_IF_GENERATION_LUA = """
+    if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+        return 1
+    end
+    return 0
+"""
+
+
+class TwoLevelCache:
+    """
+    Кэш строковых значений в памяти процесса и в Redis.
+    В памяти значение живет LOCAL_CACHE_TIMEOUT секунд, в Redis - timeout_setting.
+    Каждому ключу соответствует счетчик инвалидаций (ключ:gen), значение
+    из БД записывается в Redis, только если счетчик не изменился за время запроса.
+    """
+    timeout_setting = None
+    max_local_keys = 10000
+
+    def __init__(self):
+        self._local: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._set_script = None
+
+    @property
+    def redis(self) -> redis.Redis:
+        return get_redis(CACHE_REDIS_DB)
+
+    @property
+    def timeout(self) -> int:
+        return settings.WORKSAPCES.get(self.timeout_setting, 3600)
+
+    @property
+    def local_timeout(self) -> float:
+        return settings.WORKSAPCES.get('LOCAL_CACHE_TIMEOUT', 2)
+
+    def _get_local(self, key: str) -> Optional[str]:
+        entry = self._local.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def _set_local(self, key: str, value: str) -> None:
+        with self._lock:
+            if len(self._local) >= self.max_local_keys:
+                self._local.clear()
+            self._local[key] = (time.monotonic() + self.local_timeout, value)
+
+    def get(self, key: str, load: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        Значение из памяти процесса, затем из Redis, затем из БД (load).
+        None (обьекта нет) не кэшируется.
+        """
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        cached, generation = self.redis.mget(key, f'{key}:gen')
+        generation = generation or b'0'
+        if cached is not None:
+            value = cached.decode()
+        else:
+            value = load()
+            if value is None:
+                return None
+            if self._set_script is None:
+                self._set_script = self.redis.register_script(SET_IF_GENERATION_LUA)
+            self._set_script(keys=[key, f'{key}:gen'], args=[generation, value, self.timeout])
+
+        self._set_local(key, value)
+        return value
+
+    async def aget(self, key: str, load: Callable[[], Optional[str]]) -> Optional[str]:
+        """
+        get для асинхронного кода: Redis читается асинхронным клиентом,
+        в пул потоков уходит только запрос к БД (load) при промахе кэша
+        """
+        value = self._get_local(key)
+        if value is not None:
+            return value
+
+        client = get_async_redis(CACHE_REDIS_DB)
+        cached, generation = await client.mget(key, f'{key}:gen')
+        if cached is not None:
+            value = cached.decode()
+        else:
+            value = await database_sync_to_async(load)()
+            if value is None:
+                return None
+            await client.eval(SET_IF_GENERATION_LUA, 2, key, f'{key}:gen',
+                              generation or b'0', value, self.timeout)
+
+        self._set_local(key, value)
+        return value
+
+    def _invalidate(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(f'{key}:gen')
+            pipe.expire(f'{key}:gen', self.timeout)
+            pipe.delete(key)
+        pipe.execute()
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        """
+        Сброс записей сразу (id обьектов могут использоваться повторно)
+        и после фиксации транзакции: записи, прочитанные другими
+        процессами до фиксации, устарели
+        """
+        keys = list(keys)
+        self._invalidate(keys)
+        transaction.on_commit(lambda: self._invalidate(keys))
@@ -1,15 +1,26 @@
-from typing import Union, Optional
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import F
+from django.db import transaction
+from django.db.models import F, Q, Count, Max, Window
+from django.db.models.functions import RowNumber
 from django.db.models.query import QuerySet
 
-from workspaces.models import Column, Task
+from workspaces.models import Board, Column, Task
 
 User = get_user_model()
 
 
 class ShiftObjects:
+    """
+    Плотные порядковые номера: index обьектов всегда 0, 1, 2...
+    При перемещении номера обьектов между старой и новой позицией
+    сдвигаются одним запросом UPDATE ... SET index = index ± 1,
+    строка родителя блокируется до конца транзакции.
+    """
+    ordering = ('index', 'id')
+
     def __init__(self):
         self.instance = None
         self.objects = None
@@ -19,98 +30,322 @@ class ShiftObjects:
               instance: Union[Task, Column],
               new_index: int,
               new_col=None) -> Union[Task, Column]:
+        """
+        Пересчет порядковых номеров при перемещении обьекта.
+        Строку самого обьекта сохраняет вызывающий код
+        (сериализатор при обновлении).
+        """
         self.objects = objects
         self.instance = instance
+        model_class = instance.__class__
+        # номер и родитель обьекта перечитываются под блокировкой:
+        # значения, проверенные при валидации, могли устареть
+        self._lock_instance(model_class, new_col)
 
         if self.is_new_column(new_col):
-            self.delete_shift_index(instance)
-
-        return self._shift_indexes(self.instance, new_index, new_col)
+            new_index = min(new_index, model_class.objects.filter(column_id=new_col.id).count())
+            # закрываем промежуток в старой колонке и освобождаем место в новой
+            self._shift_range(model_class, {'column_id': instance.column_id},
+                              -1, start=instance.index + 1)
+            self._shift_range(model_class, {'column_id': new_col.id},
+                              1, start=new_index)
+            instance.column = new_col
+        else:
+            parent = self._get_parent_kwargs(model_class)
+            new_index = min(new_index, model_class.objects.filter(**parent).count() - 1)
 
-    def _shift_indexes(self,
-                       instance: Union[Task, Column],
-                       new_index: int,
-                       new_col: Optional[Column] = None) -> Union[Task, Column]:
-        """Функция пересчитывает порядковые номера обьектов при их перемещении"""
-        if self.is_new_column(new_col):
-            self.instance.column = new_col
-            instance = self._insert_object(self.instance, new_index)
-        elif new_index > self.instance.index:
-            instance = self._left_shift(instance, new_index)
-        elif new_index < self.instance.index:
-            instance = self._right_shift(instance, new_index)
+            if new_index > instance.index:
+                self._shift_range(model_class, parent, -1,
+                                  start=instance.index + 1, stop=new_index)
+            elif new_index < instance.index:
+                self._shift_range(model_class, parent, 1,
+                                  start=new_index, stop=instance.index - 1)
 
+        instance.index = new_index
         return instance
 
-    def _insert_object(self, instance: Task, new_index: int) -> Task:
-        """Функция перемещения задачи между колонками"""
-        # присваиваем индекс None, так как при вставке задачи в новую колонку вставка идет с конца
-        instance.index = None
-        return self._right_shift(instance, new_index)
+    @staticmethod
+    def _shift_range(model_class: Union[Task, Column],
+                     parent: dict,
+                     delta: int,
+                     start: int,
+                     stop: Optional[int] = None) -> int:
+        """Сдвиг порядковых номеров обьектов родителя в диапазоне [start, stop] на delta"""
+        if stop is None:
+            objs = model_class.objects.filter(index__gte=start, **parent)
+        else:
+            objs = model_class.objects.filter(index__range=(start, stop), **parent)
 
-    def _left_shift(self, instance: Union[Task, Column], new_index: int) -> Union[Task, Column]:
-        """Сдвиг порядковых номеров влево при перемещении обьекта вправо"""
-        slice_objects = self.objects[instance.index: new_index + 1]
+        return objs.update(index=F('index') + delta)
 
-        for obj in slice_objects:
-            if obj == instance:
-                obj.index = instance.index = new_index
-                continue
+    def delete_shift_index(self, instance: Union[Task, Column]) -> None:
+        """Пересчет порядковых номеров при удалении объекта"""
+        self.instance = instance
+        model_class = self.instance.__class__
+        if not self._lock_instance(model_class):
+            # обьект уже удален
+            return
 
-            obj.index -= 1
-        instance.__class__.objects.bulk_update(slice_objects, ['index'])
+        parent = self._get_parent_kwargs(model_class)
+        self._shift_range(model_class, parent, -1, start=instance.index + 1)
 
-        return instance
+    def next_position(self, model_class: Union[Task, Column], **kwargs) -> dict:
+        """
+        Значения полей сортировки для нового обьекта, который добавляется
+        в конец колонки (задача) или доски (колонка).
+        kwargs: фильтр родителя, например column_id=1
+        """
+        return {'index': model_class.objects.filter(**kwargs).count()}
 
-    def _right_shift(self, instance: Union[Task, Column], new_index: int) -> Union[Task, Column]:
-        """Сдвиг порядковых номеров вправо при перемещении обьекта влево"""
-        # если индекс None, то пересчет порядковых номеров идет до последнего элемента
-        right_border = instance.index + 1 if instance.index is not None else None
-        slice_objects = list(self.objects[new_index: right_border])
+    def position(self, instance: Union[Task, Column]) -> int:
+        """Плотный порядковый номер обьекта для ответа API"""
+        return instance.index
 
-        for obj in slice_objects:
-            if obj == instance:
-                obj.index = instance.index = new_index
-                continue
+    def sort_key(self, instance: Union[Task, Column]) -> tuple:
+        """Ключ для сортировки уже загруженных обьектов"""
+        return tuple(getattr(instance, field) for field in self.ordering)
 
-            obj.index += 1
+    def positions(self, objects: Iterable[Union[Task, Column]]) -> List[Tuple[Union[Task, Column], int]]:
+        """Обьекты одного родителя в порядке сортировки с их порядковыми номерами"""
+        return [(obj, obj.index) for obj in sorted(objects, key=self.sort_key)]
 
-        instance.__class__.objects.bulk_update(slice_objects, ['index'])
+    def positions_map(self, objects: Iterable[Union[Task, Column]]) -> Dict[int, int]:
+        """
+        Порядковые номера произвольных обьектов (не обязательно всех
+        обьектов родителя): id - номер
+        """
+        return {obj.id: obj.index for obj in objects}
 
-        return instance
+    def _get_parent_kwargs(self, model_class: Union[Task, Column]) -> dict:
+        if model_class is Column:
+            return {'board_id': self.instance.board_id}
+        elif model_class is Task:
+            return {'column_id': self.instance.column_id}
 
-    def delete_shift_index(self, instance: Union[Task, Column]) -> None:
-        """Пересчет порядковых номеров при удалении объекта"""
-        self.instance = instance
-        model_class = self.instance.__class__
-        kwargs = self._getkwargs(model_class)
+        assert False, ('Пересчет порядковых номеров осуществляется только'
+                       ' для обьектов Task или Column')
 
-        objs = (model_class.objects
-                .filter(index__gte=instance.index + 1)
-                .filter(**kwargs)
-                )
+    @staticmethod
+    def _lock_parent(model_class: Union[Task, Column], *pks: int) -> None:
+        """
+        Блокировка строк родителей (колонок или доски) до конца транзакции,
+        чтобы одновременные перемещения внутри родителя шли по очереди.
+        Строки блокируются в порядке id, чтобы не было взаимных блокировок.
+        """
+        parent_class = Board if model_class is Column else Column
+        list(parent_class.objects
+             .select_for_update()
+             .filter(pk__in=pks)
+             .order_by('id')
+             .values_list('id'))
 
-        objs.update(index=F('index') - 1)
+    def _lock_instance(self, model_class: Union[Task, Column], new_col: Optional[Column] = None) -> bool:
+        """
+        Блокировка родителей обьекта (и новой колонки) и строки самого обьекта.
+        index и родитель обьекта перечитываются: пока ждали блокировку,
+        другое перемещение могло их изменить. Если обьект перенесли
+        в другого родителя, блокируется и он.
+        Возвращает False, если обьект уже удален.
+        """
+        parent_field = 'board_id' if model_class is Column else 'column_id'
+        locked = set()
+        while True:
+            parents = {getattr(self.instance, parent_field)}
+            if new_col is not None:
+                parents.add(new_col.id)
+            self._lock_parent(model_class, *(parents - locked))
+            locked |= parents
 
-    def _getkwargs(self, model_class: Union[Task, Column]) -> dict:
-        if model_class is Column:
-            kwargs = {
-                'board': self.instance.board
-            }
-        elif model_class is Task:
-            kwargs = {
-                'column': self.instance.column
-            }
-        else:
-            assert False, ('Пересчет порядковых номеров осуществляется только'
-                           ' для обьектов Task или Column')
-        return kwargs
+            current = (model_class.objects
+                       .select_for_update()
+                       .filter(pk=self.instance.pk)
+                       .values_list('index', parent_field)
+                       .first())
+            if current is None:
+                return False
+
+            self.instance.index = current[0]
+            if current[1] in locked:
+                setattr(self.instance, parent_field, current[1])
+                return True
+            setattr(self.instance, parent_field, current[1])
 
     def is_new_column(self, new_col: Column) -> bool:
-        if new_col is not None and self.instance.column != new_col:
+        if new_col is not None and self.instance.column_id != new_col.id:
             return True
         else:
             return False
 
 
-index_recalculation = ShiftObjects
+class RankShiftObjects(ShiftObjects):
+    """
+    Разреженные ключи сортировки (rank) с шагом step.
+    При перемещении перезаписывается только строка перемещаемого обьекта:
+    ему присваивается ключ из середины промежутка между новыми соседями.
+    Если промежуток исчерпан, ключи родителя перераспределяются сразу,
+    если промежуток стал слишком узким - перераспределение ставится в фон.
+    Плотный index для API вычисляется по порядку ключей,
+    поле index в БД для остальных обьектов не обновляется.
+    """
+    ordering = ('rank', 'index', 'id')
+    step = 2 ** 16
+    min_gap = 2 ** 4
+
+    def shift(self,
+              objects: QuerySet,
+              instance: Union[Task, Column],
+              new_index: int,
+              new_col=None) -> Union[Task, Column]:
+        self.instance = instance
+        model_class = instance.__class__
+        self._lock_instance(model_class, new_col)
+
+        if self.is_new_column(new_col):
+            self.instance.column = new_col
+
+        parent = self._get_parent_kwargs(model_class)
+        # соседа могли удалить после проверки номера (index_validate):
+        # номер за концом списка ставит обьект последним
+        new_index = min(new_index, model_class.objects.filter(**parent).exclude(pk=instance.pk).count())
+
+        prev_rank, next_rank = self._get_neighbours(model_class, parent, new_index)
+        if not self._has_gap(prev_rank, next_rank):
+            # промежутка нет - перераспределяем ключи родителя и ищем соседей заново
+            self.rebalance(model_class, **parent)
+            prev_rank, next_rank = self._get_neighbours(model_class, parent, new_index)
+
+        instance.rank = self._get_middle(prev_rank, next_rank)
+        instance.index = new_index
+
+        if self._gap_is_narrow(prev_rank, instance.rank, next_rank):
+            self._schedule_rebalance(model_class, parent)
+
+        return instance
+
+    def delete_shift_index(self, instance: Union[Task, Column]) -> None:
+        """При удалении обьекта ключи остальных обьектов не меняются"""
+        pass
+
+    def next_position(self, model_class: Union[Task, Column], **kwargs) -> dict:
+        aggregate = model_class.objects.filter(**kwargs).aggregate(
+            count=Count('id'), last_rank=Max('rank')
+        )
+        return {
+            'index': aggregate['count'],
+            'rank': (aggregate['last_rank'] or 0) + self.step,
+        }
+
+    def position(self, instance: Union[Task, Column]) -> int:
+        self.instance = instance
+        model_class = instance.__class__
+        parent = self._get_parent_kwargs(model_class)
+        before = (Q(rank__lt=instance.rank)
+                  | Q(rank=instance.rank, index__lt=instance.index)
+                  | Q(rank=instance.rank, index=instance.index, id__lt=instance.id))
+        return model_class.objects.filter(**parent).filter(before).count()
+
+    def positions(self, objects: Iterable[Union[Task, Column]]) -> List[Tuple[Union[Task, Column], int]]:
+        return [(obj, position) for position, obj in enumerate(sorted(objects, key=self.sort_key))]
+
+    def positions_map(self, objects: Iterable[Union[Task, Column]]) -> Dict[int, int]:
+        """Номера считаются одним запросом: нумерация строк внутри каждого родителя"""
+        objects = list(objects)
+        if not objects:
+            return {}
+
+        model_class = objects[0].__class__
+        parent_field = 'board_id' if model_class is Column else 'column_id'
+        ids = {obj.id for obj in objects}
+        numbered = (model_class.objects
+                    .filter(**{f'{parent_field}__in': {getattr(obj, parent_field) for obj in objects}})
+                    .annotate(position=Window(RowNumber(), partition_by=[F(parent_field)],
+                                              order_by=[F(field).asc() for field in self.ordering]))
+                    .values_list('id', 'position'))
+        return {pk: position - 1 for pk, position in numbered if pk in ids}
+
+    def rebalance(self,
+                  model_class: Union[Task, Column],
+                  ordering: Optional[tuple] = None,
+                  **kwargs) -> None:
+        """
+        Перераспределение ключей сортировки обьектов родителя с шагом step.
+        Заодно перезаписывает плотные порядковые номера index.
+        ordering: порядок, который считается актуальным (по умолчанию - по ключам)
+        """
+        # перемещение, зафиксированное между чтением и записью ключей, было бы перезаписано
+        self._lock_parent(model_class, *kwargs.values())
+        objects = list(model_class.objects
+                       .filter(**kwargs)
+                       .order_by(*(ordering or self.ordering))
+                       .only('id', 'rank', 'index'))
+
+        for position, obj in enumerate(objects):
+            obj.rank = (position + 1) * self.step
+            obj.index = position
+
+        model_class.objects.bulk_update(objects, ['rank', 'index'])
+
+    def _get_neighbours(self,
+                        model_class: Union[Task, Column],
+                        parent: dict,
+                        new_index: int) -> Tuple[Optional[int], Optional[int]]:
+        """Ключи соседей, между которыми встанет обьект"""
+        siblings = (model_class.objects
+                    .filter(**parent)
+                    .exclude(pk=self.instance.pk)
+                    .order_by(*self.ordering)
+                    .values_list('rank', flat=True))
+
+        if new_index == 0:
+            return None, siblings.first()
+
+        ranks = list(siblings[new_index - 1: new_index + 1])
+        prev_rank = ranks[0] if ranks else None
+        next_rank = ranks[1] if len(ranks) > 1 else None
+        return prev_rank, next_rank
+
+    @staticmethod
+    def _has_gap(prev_rank: Optional[int], next_rank: Optional[int]) -> bool:
+        if prev_rank is None or next_rank is None:
+            return True
+        return next_rank - prev_rank > 1
+
+    def _get_middle(self, prev_rank: Optional[int], next_rank: Optional[int]) -> int:
+        if prev_rank is None and next_rank is None:
+            return self.step
+        elif prev_rank is None:
+            return next_rank - self.step
+        elif next_rank is None:
+            return prev_rank + self.step
+        return (prev_rank + next_rank) // 2
+
+    def _gap_is_narrow(self, prev_rank: Optional[int], rank: int, next_rank: Optional[int]) -> bool:
+        gaps = [rank - prev_rank if prev_rank is not None else self.step,
+                next_rank - rank if next_rank is not None else self.step]
+        return min(gaps) <= self.min_gap
+
+    @staticmethod
+    def _schedule_rebalance(model_class: Union[Task, Column], parent: dict) -> None:
+        # импорт внутри функции, т.к. модуль задач сам импортирует этот модуль
+        from workspaces.tasks import rebalance_indexes
+
+        model_name = model_class.__name__.lower()
+        parent_id = next(iter(parent.values()))
+        transaction.on_commit(
+            lambda: rebalance_indexes.delay(model_name, parent_id)
+        )
+
+
+INDEXING_ENGINES = {
+    'shift': ShiftObjects,
+    'rank': RankShiftObjects,
+}
+
+
+def index_recalculation() -> ShiftObjects:
+    """
+    Движок пересчета порядковых номеров, выбранный в
+    settings.WORKSAPCES['INDEXING_ENGINE']
+    """
+    engine = settings.WORKSAPCES.get('INDEXING_ENGINE', 'shift')
+    return INDEXING_ENGINES[engine]()
@@ -0,0 +1,41 @@
+import asyncio
+import weakref
+from functools import lru_cache
+
+import redis
+from redis import asyncio as aioredis
+
+from django.conf import settings
+
+# асинхронные клиенты привязаны к циклу событий, в котором созданы
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _connection_kwargs(db: int) -> dict:
+    return dict(
+        username=f'{settings.REDIS_USER}',
+        password=f'{settings.REDIS_PASS}',
+        host=f'{settings.REDIS_HOST}',
+        port=f'{settings.REDIS_PORT}',
+        db=db,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_redis(db: int) -> redis.Redis:
+    """
+    Синхронный клиент Redis для указанной базы.
+    Клиент (и его пул соединений) создается один раз на процесс.
+    """
+    return redis.Redis(**_connection_kwargs(db))
+
+
+def get_async_redis(db: int) -> aioredis.Redis:
+    """
+    Асинхронный клиент Redis для указанной базы.
+    Клиент создается один раз на цикл событий.
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if db not in clients:
+        clients[db] = aioredis.Redis(**_connection_kwargs(db))
+    return clients[db]
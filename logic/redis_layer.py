@@ -1,13 +1,82 @@
 import time
+import random
+import struct
+import hashlib
 import logging
+import collections
+from typing import Iterable, Optional
 
+import msgpack
+from redis.exceptions import NoScriptError
 from channels_redis.core import RedisChannelLayer
 
 logger = logging.getLogger(__name__)
 
+# доставка сообщения в очереди каналов одного шарда: очистка устаревших
+# сообщений и запись с учетом емкости канала
+GROUP_SEND_LUA = """
+    local over_capacity = 0
+    local current_time = ARGV[#ARGV - 1]
+    local expiry = ARGV[#ARGV]
+    local stale = math.floor(tonumber(current_time)) - tonumber(expiry)
+    for i=1,#KEYS do
+        redis.call('ZREMRANGEBYSCORE', KEYS[i], 0, stale)
+        if redis.call('ZCOUNT', KEYS[i], '-inf', '+inf') < tonumber(ARGV[i + #KEYS]) then
+            redis.call('ZADD', KEYS[i], current_time, ARGV[i])
+            redis.call('EXPIRE', KEYS[i], expiry)
+        else
+            over_capacity = over_capacity + 1
+        end
+    end
+    return over_capacity
+"""
+GROUP_SEND_SHA = hashlib.sha1(GROUP_SEND_LUA.encode()).hexdigest()
+
+# признак сообщения группы: байт, с которого не начинается ни msgpack,
+# ни зашифрованное сообщение (Fernet токен в base64)
+GROUP_MESSAGE_MARKER = b'\xc1'
+# длина заголовка со списком каналов
+GROUP_HEADER = struct.Struct('>I')
+
 
 class CustomRedisChannelLayer(RedisChannelLayer):
-    """Переопределен метод group_send для канального слоя Redis"""
+    """
+    Переопределен метод group_send для канального слоя Redis.
+
+    group_cache_ttl: время (в секундах) хранения состава групп в памяти
+    процесса. Пока состав группы в кэше, рассылка в группу не читает
+    его из Redis. Добавление и удаление каналов группы в этом процессе
+    сбрасывает кэш группы, изменения из других процессов становятся
+    видны не позже, чем через group_cache_ttl. 0 - кэш отключен.
+    """
+    max_cached_groups = 1024
+
+    def __init__(self, *args, group_cache_ttl: float = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.group_cache_ttl = group_cache_ttl
+        # имя группы: (время устаревания, имена каналов)
+        self._group_cache = {}
+        self.group_cache_hits = 0
+        self.group_cache_misses = 0
+
+    def group_cache_info(self) -> dict:
+        """Статистика кэша состава групп"""
+        requests = self.group_cache_hits + self.group_cache_misses
+        return {
+            'hits': self.group_cache_hits,
+            'misses': self.group_cache_misses,
+            'hit_rate': self.group_cache_hits / requests if requests else 0,
+            'groups': len(self._group_cache),
+        }
+
+    async def group_add(self, group, channel):
+        await super().group_add(group, channel)
+        self._group_cache.pop(group, None)
+
+    async def group_discard(self, group, channel):
+        await super().group_discard(group, channel)
+        self._group_cache.pop(group, None)
+
     async def group_send(self, group, message, exclude_channel=None):
         """
         В метод добавлена возможность исключить определенный канал из рассылки.
@@ -16,16 +85,27 @@ class CustomRedisChannelLayer(RedisChannelLayer):
         без рассылки изменения в группу.
         exclude_channel: имя канала, который нужно исключить их получателей
         """
-        assert self.valid_group_name(group), "Group name not valid"
-        key = self._group_key(group)
-        connection = self.connection(self.consistent_hash(group))
-        await connection.zremrangebyscore(
-            key, min=0, max=int(time.time()) - self.group_expiry
-        )
+        await self.group_send_many([group], message, exclude_channel=exclude_channel)
 
-        # это измененная строка исходного кода
-        channel_names = [x.decode("utf8") for x in await connection.zrange(key, 0, -1) if
-                         x.decode("utf8") != exclude_channel]
+    async def group_send_many(self,
+                              groups: Iterable[str],
+                              message: dict,
+                              exclude_channel: Optional[str] = None) -> None:
+        """
+        Рассылка одного сообщения в несколько групп.
+        Состав групп читается одним конвейером (pipeline) на каждый шард групп,
+        сообщение доставляется одним вызовом скрипта (EVALSHA) на каждый шард каналов.
+        Канал, состоящий в нескольких группах, получает сообщение один раз.
+        exclude_channel: имя канала, который нужно исключить из получателей
+        """
+        groups = list(dict.fromkeys(groups))
+        for group in groups:
+            assert self.valid_group_name(group), "Group name not valid"
+
+        channel_names = await self._group_channels(groups)
+        channel_names = [name for name in channel_names if name != exclude_channel]
+        if not channel_names:
+            return
 
         (
             connection_to_channel_keys,
@@ -34,48 +114,139 @@ class CustomRedisChannelLayer(RedisChannelLayer):
         ) = self._map_channel_keys_to_connection(channel_names, message)
 
         for connection_index, channel_redis_keys in connection_to_channel_keys.items():
-            pipe = connection.pipeline()
-            for key in channel_redis_keys:
-                pipe.zremrangebyscore(
-                    key, min=0, max=int(time.time()) - int(self.expiry)
-                )
-            await pipe.execute()
-
-            group_send_lua = """
-                local over_capacity = 0
-                local current_time = ARGV[#ARGV - 1]
-                local expiry = ARGV[#ARGV]
-                for i=1,#KEYS do
-                    if redis.call('ZCOUNT', KEYS[i], '-inf', '+inf') < tonumber(ARGV[i + #KEYS]) then
-                        redis.call('ZADD', KEYS[i], current_time, ARGV[i])
-                        redis.call('EXPIRE', KEYS[i], expiry)
-                    else
-                        over_capacity = over_capacity + 1
-                    end
-                end
-                return over_capacity
-            """
-
             args = [
                 channel_keys_to_message[channel_key]
                 for channel_key in channel_redis_keys
             ]
-
             args += [
                 channel_keys_to_capacity[channel_key]
                 for channel_key in channel_redis_keys
             ]
-
             args += [time.time(), self.expiry]
 
             connection = self.connection(connection_index)
-            channels_over_capacity = await connection.eval(
-                group_send_lua, len(channel_redis_keys), *channel_redis_keys, *args
+            channels_over_capacity = await self._evalsha(
+                connection, channel_redis_keys, args
             )
             if channels_over_capacity > 0:
                 logger.info(
-                    "%s of %s channels over capacity in group %s",
+                    "%s of %s channels over capacity in groups %s",
                     channels_over_capacity,
                     len(channel_names),
-                    group,
+                    groups,
                 )
+
+    async def _group_channels(self, groups: list) -> list:
+        """
+        Имена каналов всех групп без повторов. Группы, которых нет
+        в кэше, читаются одним конвейером на шард.
+        """
+        channel_names = {}
+        connection_to_groups = {}
+        now = time.monotonic()
+        for group in groups:
+            cached = self._group_cache.get(group)
+            if cached is not None and cached[0] > now:
+                self.group_cache_hits += 1
+                channel_names.update(dict.fromkeys(cached[1]))
+            else:
+                if self.group_cache_ttl:
+                    self.group_cache_misses += 1
+                connection_to_groups.setdefault(self.consistent_hash(group), []).append(group)
+
+        for connection_index, shard_groups in connection_to_groups.items():
+            pipe = self.connection(connection_index).pipeline(transaction=False)
+            for group in shard_groups:
+                key = self._group_key(group)
+                pipe.zremrangebyscore(key, min=0, max=int(time.time()) - self.group_expiry)
+                pipe.zrange(key, 0, -1)
+            results = await pipe.execute()
+
+            for group, members in zip(shard_groups, results[1::2]):
+                members = [name.decode("utf8") for name in members]
+                channel_names.update(dict.fromkeys(members))
+                if self.group_cache_ttl:
+                    self._cache_group(group, members, now)
+
+        return list(channel_names)
+
+    def _cache_group(self, group: str, members: list, now: float) -> None:
+        if group not in self._group_cache and len(self._group_cache) >= self.max_cached_groups:
+            self._group_cache = {
+                name: cached for name, cached in self._group_cache.items() if cached[0] > now
+            }
+            if len(self._group_cache) >= self.max_cached_groups:
+                # вытесняется группа, добавленная раньше остальных
+                self._group_cache.pop(next(iter(self._group_cache)))
+
+        self._group_cache[group] = (now + self.group_cache_ttl, members)
+
+    def _map_channel_keys_to_connection(self, channel_names, message):
+        """
+        Как в исходном коде, но сообщение сериализуется (и шифруется) один раз
+        для всех получателей. Для каждого ключа канала к нему добавляется
+        только открытый заголовок со списком каналов процесса.
+        """
+        connection_to_channel_keys = collections.defaultdict(list)
+        channel_key_to_channels = dict()
+        channel_key_to_capacity = dict()
+
+        for channel in channel_names:
+            channel_non_local_name = channel
+            if "!" in channel:
+                channel_non_local_name = self.non_local_name(channel)
+            channel_key = self.prefix + channel_non_local_name
+            if channel_key not in channel_key_to_channels:
+                channel_key_to_channels[channel_key] = [channel]
+                channel_key_to_capacity[channel_key] = self.get_capacity(channel)
+                idx = self.consistent_hash(channel_non_local_name)
+                connection_to_channel_keys[idx].append(channel_key)
+            else:
+                channel_key_to_channels[channel_key].append(channel)
+
+        body = msgpack.packb(message, use_bin_type=True)
+        if self.crypter:
+            body = self.crypter.encrypt(body)
+
+        channel_key_to_message = {
+            key: self._pack_group_message(channels, body)
+            for key, channels in channel_key_to_channels.items()
+        }
+        return (
+            connection_to_channel_keys,
+            channel_key_to_message,
+            channel_key_to_capacity,
+        )
+
+    @staticmethod
+    def _pack_group_message(channels: list, body: bytes) -> bytes:
+        header = msgpack.packb(channels, use_bin_type=True)
+        # случайный префикс обеспечивает уникальность сообщения в sorted set
+        random_prefix = random.getrandbits(8 * 12).to_bytes(12, "big")
+        return b''.join((random_prefix, GROUP_MESSAGE_MARKER, GROUP_HEADER.pack(len(header)), header, body))
+
+    def deserialize(self, message):
+        """Разбор сообщения группы, остальные сообщения - как в исходном коде"""
+        if message[12:13] != GROUP_MESSAGE_MARKER:
+            return super().deserialize(message)
+
+        header_start = 13 + GROUP_HEADER.size
+        header_length, = GROUP_HEADER.unpack(message[13:header_start])
+        body_start = header_start + header_length
+        channels = msgpack.unpackb(message[header_start:body_start], raw=False)
+
+        body = message[body_start:]
+        if self.crypter:
+            body = self.crypter.decrypt(body, self.expiry + 10)
+        result = msgpack.unpackb(body, raw=False)
+        result["__asgi_channel__"] = channels
+        return result
+
+    @staticmethod
+    async def _evalsha(connection, keys: list, args: list) -> int:
+        """Вызов скрипта по хэшу, скрипт загружается в Redis только если его там нет"""
+        try:
+            return await connection.evalsha(GROUP_SEND_SHA, len(keys), *keys, *args)
+        except NoScriptError:
+            await connection.script_load(GROUP_SEND_LUA)
+            return await connection.evalsha(GROUP_SEND_SHA, len(keys), *keys, *args)
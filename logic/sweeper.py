@@ -0,0 +1,62 @@
+import time
+import logging
+from datetime import timedelta
+from typing import Dict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from workspaces.models import InvitedUsers
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def delete_in_batches(queryset: QuerySet, batch_size: int = 1000) -> int:
+    """
+    Удаление обьектов выборки пачками по id.
+    Каждая пачка удаляется в своей транзакции, прерванная очистка
+    продолжается при следующем запуске с того же места.
+    """
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+
+        with transaction.atomic():
+            queryset.model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+
+
+def sweep_expired(now=None) -> Dict[str, float]:
+    """
+    Удаление просроченных приглашений в РП и пользователей, не
+    активировавших аккаунт (и ни разу не входивших). Выборки идут
+    по индексам created_at и date_joined, повторный запуск безопасен.
+    Возвращает количество удаленных обьектов и время работы.
+    """
+    now = now or timezone.now()
+    start = time.monotonic()
+
+    invite_timeout = timedelta(seconds=settings.WORKSAPCES.get('INVITE_TOKEN_TIMEOUT', 3600 * 24))
+    invitations = delete_in_batches(
+        InvitedUsers.objects.filter(created_at__lt=now - invite_timeout)
+    )
+
+    user_timeout = timedelta(**settings.DJOSER.get('INACTIVE_USER_TIMEOUT', {'hours': 24}))
+    users = delete_in_batches(
+        User.objects.filter(date_joined__lt=now - user_timeout, is_active=False, last_login__isnull=True)
+    )
+
+    result = {
+        'invitations': invitations,
+        'users': users,
+        'runtime': round(time.monotonic() - start, 3),
+    }
+    logger.info(f'Очистка просроченных обьектов: {result}')
+    return result
@@ -0,0 +1,133 @@
+import time
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from logic.cache import CACHE_REDIS_DB
+from logic.redis_client import get_redis
+from telebot.models import TeleBotID
+
+CHATS_KEY = 'telegram:chats'
+
+# значения из БД записываются, только если поле еще не заполнено:
+# id чата, записанный при подключении телеграма, не перезаписывается
+# прочитанным до этого отсутствием подключения. Время жизни ставится
+# при создании хэша и ограничивает срок жизни пропущенных изменений
+FILL_CHATS_LUA = """
+    for i = 2, #ARGV, 2 do
+        redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+    if redis.call('TTL', KEYS[1]) == -1 then
+        redis.call('EXPIRE', KEYS[1], ARGV[1])
+    end
+"""
+
+
+class TelegramChatCache:
+    """
+    id телеграм чатов пользователей для рассылки уведомлений.
+    Хранятся в хэше Redis (id пользователя - id чата, 0 - телеграм
+    не подключен) и в памяти процесса (LOCAL_CACHE_TIMEOUT).
+    Из БД читаются только пользователи, которых нет в хэше.
+    Записи обновляются при подключении и отключении телеграма
+    (см. telebot.signals).
+    """
+    max_local_keys = 10000
+
+    def __init__(self):
+        self._local: Dict[int, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._fill_script = None
+
+    @property
+    def redis(self):
+        return get_redis(CACHE_REDIS_DB)
+
+    @property
+    def timeout(self) -> int:
+        return settings.WORKSAPCES.get('TELEGRAM_CHAT_CACHE_TIMEOUT', 3600 * 24)
+
+    @property
+    def local_timeout(self) -> float:
+        return settings.WORKSAPCES.get('LOCAL_CACHE_TIMEOUT', 2)
+
+    def _set_local(self, chats: Dict[int, int]) -> None:
+        expires = time.monotonic() + self.local_timeout
+        with self._lock:
+            if len(self._local) + len(chats) > self.max_local_keys:
+                self._local.clear()
+            for user_id, chat_id in chats.items():
+                self._local[user_id] = (expires, chat_id)
+
+    def get_many(self, users: Iterable[int]) -> Dict[int, int]:
+        """Словарь: id пользователя - id телеграм чата (только с подключенным телеграмом)"""
+        chats: Dict[int, int] = {}
+        missing = []
+        now = time.monotonic()
+        for user_id in dict.fromkeys(users):
+            entry = self._local.get(user_id)
+            if entry is not None and entry[0] > now:
+                chats[user_id] = entry[1]
+            else:
+                missing.append(user_id)
+
+        if missing:
+            found = {}
+            values = self.redis.hmget(CHATS_KEY, missing)
+            not_cached = []
+            for user_id, value in zip(missing, values):
+                if value is None:
+                    not_cached.append(user_id)
+                else:
+                    found[user_id] = int(value)
+
+            if not_cached:
+                loaded = dict(TeleBotID.objects
+                              .filter(user_id__in=not_cached)
+                              .values_list('user_id', 'telegram_id'))
+                loaded = {user_id: loaded.get(user_id, 0) for user_id in not_cached}
+                self._fill(loaded)
+                found.update(loaded)
+
+            self._set_local(found)
+            chats.update(found)
+
+        return {user_id: chat_id for user_id, chat_id in chats.items() if chat_id}
+
+    def _fill(self, chats: Dict[int, int]) -> None:
+        if self._fill_script is None:
+            self._fill_script = self.redis.register_script(FILL_CHATS_LUA)
+        args = [self.timeout]
+        for user_id, chat_id in chats.items():
+            args.extend((user_id, chat_id))
+        self._fill_script(keys=[CHATS_KEY], args=args)
+
+    def _forget(self, user_id: int) -> None:
+        with self._lock:
+            self._local.pop(user_id, None)
+        self.redis.hdel(CHATS_KEY, user_id)
+
+    def _set(self, user_id: int, chat_id: int) -> None:
+        with self._lock:
+            self._local.pop(user_id, None)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(CHATS_KEY, user_id, chat_id)
+        # время жизни, если хэш создан этой записью
+        pipe.eval(FILL_CHATS_LUA, 1, CHATS_KEY, self.timeout)
+        pipe.execute()
+
+    def update(self, user_id: int, chat_id: Optional[int]) -> None:
+        """
+        Запись id чата пользователя (None - телеграм отключен).
+        Запись сбрасывается сразу, новое значение записывается после
+        фиксации транзакции: при откате транзакции значение будет
+        прочитано из БД, а прочитанное другими процессами до фиксации
+        будет перезаписано
+        """
+        self._forget(user_id)
+        transaction.on_commit(lambda: self._set(user_id, chat_id or 0))
+
+
+telegram_chats = TelegramChatCache()
@@ -0,0 +1,122 @@
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+import redis
+
+from celery import current_app
+
+from logic.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# база Redis для отложенных задач
+TIMERS_REDIS_DB = 5
+
+# извлечение наступивших таймеров: одновременно запущенные
+# обработчики не получат один таймер дважды
+POP_DUE_LUA = """
+    local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+    if #due > 0 then
+        redis.call('ZREM', KEYS[1], unpack(due))
+    end
+    return due
+"""
+
+
+class TimerWheel:
+    """
+    Отложенные задачи в sorted set Redis.
+    Таймер - пара (вид, id обьекта), например ('end_deadline', task_id),
+    время срабатывания - score. Для каждого обьекта хранится только
+    один таймер каждого вида, повторная установка переносит срабатывание.
+
+    Наступившие таймеры раз в несколько секунд забирает одна периодическая
+    задача (см. fire_due_timers) и запускает обработчики пачками:
+    стоимость проверки не зависит от количества ожидающих таймеров.
+    """
+    key = 'timers'
+    batch_size = 500
+
+    # вид таймера: celery задача, которая получает список id обьектов
+    handlers = {
+        'end_deadline': 'notification.create_notify.tasks.end_deadlines',
+    }
+
+    def __init__(self):
+        self._pop_script = None
+
+    @property
+    def redis(self) -> redis.Redis:
+        return get_redis(TIMERS_REDIS_DB)
+
+    @staticmethod
+    def _member(kind: str, obj_id: int) -> str:
+        return f'{kind}:{obj_id}'
+
+    def schedule(self, kind: str, obj_id: int, run_at: datetime | float) -> None:
+        """Установка (или перенос) таймера, run_at - время или unix timestamp"""
+        assert kind in self.handlers, f'Неизвестный вид таймера: {kind}'
+        if isinstance(run_at, datetime):
+            run_at = run_at.timestamp()
+        self.redis.zadd(self.key, {self._member(kind, obj_id): run_at})
+
+    def cancel(self, kind: str, obj_id: int) -> None:
+        self.redis.zrem(self.key, self._member(kind, obj_id))
+
+    def pending(self, kind: str, obj_id: int) -> float | None:
+        """Время срабатывания таймера, None - таймера нет"""
+        return self.redis.zscore(self.key, self._member(kind, obj_id))
+
+    def pop_due(self, now: float | None = None) -> Dict[str, List[int]]:
+        """Наступившие таймеры, сгруппированные по видам. Таймеры удаляются"""
+        if self._pop_script is None:
+            self._pop_script = self.redis.register_script(POP_DUE_LUA)
+
+        now = time.time() if now is None else now
+        due = {}
+        while True:
+            members = self._pop_script(keys=[self.key], args=[now, self.batch_size])
+            for member in members:
+                kind, obj_id = member.decode().rsplit(':', 1)
+                due.setdefault(kind, []).append(int(obj_id))
+            if len(members) < self.batch_size:
+                return due
+
+    def restore(self, kind: str, obj_ids: Iterable[int], run_at: float) -> None:
+        """
+        Возврат таймеров, которые не удалось запустить.
+        Таймер, установленный заново после извлечения, не переносится
+        """
+        obj_ids = list(obj_ids)
+        if obj_ids:
+            self.redis.zadd(self.key, {self._member(kind, obj_id): run_at for obj_id in obj_ids}, nx=True)
+
+
+timer_wheel = TimerWheel()
+
+
+def fire_due_timers() -> Dict[str, int]:
+    """
+    Запуск обработчиков наступивших таймеров, одна celery задача на вид таймера.
+    Возвращает количество запущенных таймеров каждого вида.
+    """
+    now = time.time()
+    fired = {}
+    for kind, obj_ids in timer_wheel.pop_due(now).items():
+        handler = timer_wheel.handlers.get(kind)
+        if handler is None:
+            logger.error(f'Нет обработчика таймеров {kind}, пропущено: {len(obj_ids)}')
+            continue
+
+        try:
+            current_app.send_task(handler, args=[obj_ids])
+        except Exception:
+            timer_wheel.restore(kind, obj_ids, now)
+            raise
+        fired[kind] = len(obj_ids)
+
+    if fired:
+        logger.info(f'Запущены отложенные задачи: {fired}')
+    return fired
@@ -0,0 +1,115 @@
+import json
+from typing import Optional
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import router
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import UntypedToken
+
+from logic.cache import TwoLevelCache
+
+User = get_user_model()
+
+# поля пользователя, которые не попадают в кэш
+EXCLUDED_USER_FIELDS = ('password',)
+
+
+class WebsocketAuthCache(TwoLevelCache):
+    """
+    Авторизация вебсокетов по JWT с кэшем пользователей.
+    Подпись и срок действия токена проверяются при каждом подключении,
+    отметка о блокировке токена (token_blacklist, по jti) и поля
+    пользователя (по id) кэшируются в памяти процесса и в Redis
+    (WS_AUTH_CACHE_TIMEOUT). Повторное подключение с тем же токеном
+    не обращается к БД.
+
+    Пользователь хранится строкой JSON (без пароля) и собирается
+    заново при каждом подключении.
+    Записи сбрасываются при блокировке токена и изменении
+    пользователя (см. workspaces.signals).
+    """
+    timeout_setting = 'WS_AUTH_CACHE_TIMEOUT'
+
+    def __init__(self):
+        super().__init__()
+        self.stats = {'db': 0}
+
+    @staticmethod
+    def _token_key(jti: str) -> str:
+        return f'ws_auth:token:{jti}'
+
+    @staticmethod
+    def _user_key(user_id) -> str:
+        return f'ws_auth:user:{user_id}'
+
+    @staticmethod
+    def _user_fields():
+        return [field for field in User._meta.concrete_fields if field.name not in EXCLUDED_USER_FIELDS]
+
+    def _token_loader(self, jti: str):
+        def load():
+            self.stats['db'] += 1
+            return '1' if BlacklistedToken.objects.filter(token__jti=jti).exists() else '0'
+
+        return load
+
+    def _user_loader(self, user_id):
+        def load():
+            """Поля пользователя, пустая строка - пользователя нет или он не может войти"""
+            self.stats['db'] += 1
+            user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                return ''
+            return json.dumps({
+                field.attname: None if field.value_from_object(user) is None else field.value_to_string(user)
+                for field in self._user_fields()
+            })
+
+        return load
+
+    def _build_user(self, value: str) -> Optional[User]:
+        if not value:
+            return None
+        data = json.loads(value)
+        fields = [field for field in self._user_fields() if field.attname in data]
+        values = [None if data[field.attname] is None else field.to_python(data[field.attname])
+                  for field in fields]
+        return User.from_db(router.db_for_read(User), [field.attname for field in fields], values)
+
+    async def _resolve(self, jti: str, user_id) -> Optional[User]:
+        """Пользователь токена, None - токен заблокирован или пользователя нет"""
+        blacklisted = await self.aget(self._token_key(jti), self._token_loader(jti))
+        if blacklisted != '0':
+            return None
+        return self._build_user(await self.aget(self._user_key(user_id), self._user_loader(user_id)))
+
+    async def get_user(self, token: Optional[str]):
+        """Пользователь по JWT или AnonymousUser"""
+        if not token:
+            return AnonymousUser()
+
+        try:
+            payload = UntypedToken(token).payload
+        except TokenError:
+            return AnonymousUser()
+
+        jti = payload.get(api_settings.JTI_CLAIM)
+        user_id = payload.get(api_settings.USER_ID_CLAIM)
+        if jti is None or user_id is None:
+            return AnonymousUser()
+
+        # у каждого подключения свой экземпляр пользователя
+        user = await self._resolve(jti, user_id)
+        return user if user is not None else AnonymousUser()
+
+    def forget_token(self, jti: str) -> None:
+        self.invalidate([self._token_key(jti)])
+
+    def forget_user(self, user_id) -> None:
+        self.invalidate([self._user_key(user_id)])
+
+
+ws_auth_cache = WebsocketAuthCache()
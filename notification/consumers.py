@@ -1,22 +1,29 @@
+from typing import Optional
+
+from django.contrib.auth import get_user_model
 from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
 from djangochannelsrestframework import mixins
 from djangochannelsrestframework.observer.generics import action
 
 from rest_framework import status
 
-from notification.models import Notification
+from notification.models import NotificationRecipient
+from notification.pagination import KeysetPagination, keyset_page
+from notification.unread import unread_counter
 from workspaces.mixins import ConsumerMixin
 from workspaces.websocket.permissions import IsAuthenticated
 from .serializers import NotificationListSerializer, NotificationUpdateSerializer
 
+User = get_user_model()
+
 
-class NotificationConsumer(mixins.ListModelMixin,
-                           mixins.PatchModelMixin,
+class NotificationConsumer(mixins.PatchModelMixin,
                            ConsumerMixin,
                            GenericAsyncAPIConsumer):
-    queryset = Notification.objects.all()
+    queryset = NotificationRecipient.objects.all()
     serializer_class = NotificationListSerializer
-    lookup_field = "pk"
+    lookup_field = "notification_id"
+    lookup_url_kwarg = "pk"
     permission_classes = [IsAuthenticated, ]
 
     def get_serializer_class(self, **kwargs):
@@ -29,25 +36,57 @@ class NotificationConsumer(mixins.ListModelMixin,
     def get_queryset(self, **kwargs):
         queryset = super().get_queryset()
         user = self.scope['user']
-        queryset = queryset.filter(recipients=user)
-        return queryset.order_by('-created_at')[:25]
+        queryset = (queryset
+                    .filter(user=user)
+                    .select_related('notification__workspace', 'notification__board')
+                    .order_by('-created_at', '-id'))
+        return queryset
+
+    @action()
+    def list(self, cursor: Optional[str] = None, page_size: int = KeysetPagination.page_size, **kwargs):
+        """
+        Страница уведомлений, начиная после курсора.
+        cursor: курсор следующей страницы из предыдущего ответа
+        """
+        if not isinstance(page_size, int):
+            page_size = KeysetPagination.page_size
+        page_size = min(max(page_size, 1), KeysetPagination.max_page_size)
+        page, next_cursor = keyset_page(self.get_queryset(**kwargs), cursor, page_size)
+        data = NotificationListSerializer(page, many=True).data
+        return {'next_cursor': next_cursor, 'results': data}, status.HTTP_200_OK
+
+    def perform_patch(self, serializer, **kwargs):
+        if serializer.validated_data.get('read'):
+            unread_counter.mark_read(self.scope['user'].id, [serializer.instance.notification_id])
+            serializer.instance.read = True
 
     async def connect(self):
-        user = self.scope['user']
-        self.group_name = f'notification-{user.id}'
+        user = self.scope.get('user')
+        if type(user) is not User or not user.is_authenticated:
+            await self.close()
+            return
+
         await self.accept()
+        self.subscriptions.append(f'notification-{user.id}')
+        await self.add_group(f'notification-{user.id}')
 
     @action()
     def read_all(self, **kwargs):
         user = self.scope['user']
-        queryset = Notification.objects.filter(
-            recipients=user, read=False,
-        )
-        queryset.update(read=True)
+        unread_counter.mark_read(user.id)
+        page, _ = keyset_page(self.get_queryset(), None, KeysetPagination.page_size)
         return (NotificationListSerializer(
-            self.get_queryset(), many=True,
+            page, many=True,
         ).data, status.HTTP_200_OK)
 
+    @action()
+    def unread_count(self, **kwargs):
+        user = self.scope['user']
+        return {'unread': unread_counter.get(user.id)}, status.HTTP_200_OK
+
     async def subscribe(self, pk, **kwargs):
-        """Запрещает метод subscribe из ConsumerMixin"""
+        """Запрещает методы subscribe и unsubscribe из ConsumerMixin"""
+        pass
+
+    async def unsubscribe(self, pk, **kwargs):
         pass
@@ -4,14 +4,15 @@ from typing import Optional
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django_celery_beat.models import PeriodicTask
 
-from notification.create_notify.mixin import TaskCommonDataMixin
+from notification.create_notify.mixin import TaskCommonDataMixin, column_parents
 from notification.create_notify.utils import end_deadline_notify, sending_to_channels
 from notification.create_notify.notification_type import NOTIFICATION_TYPE as MESSAGE
-from notification.models import Notification
+from notification.models import Notification, NotificationRecipient
 
-from workspaces.models import Column, Board
+from workspaces.models import Column
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -57,22 +58,37 @@ class NotifyFactory:
             текста сообщения
         """
         logger.info(f'Создание уведомления...')
+        notifications = []
         for event, context in context.items():
             logger.info(f'Полученные данные для создания уведомления: {context=}, {data=}')
             text = MESSAGE[event].format(**context, **data)
-            workspace = data['workspace']
-            board = data['board']
             recipients = context['recipients']
             logger.info(f'Получатели уведомления: {recipients}')
             if recipients:
-                notification = Notification.objects.create(
+                notification = Notification(
                     text=text,
-                    workspace_id=workspace,
-                    board_id=board,
+                    workspace_id=data['workspace'],
+                    board_id=data['board'],
                 )
-                logger.info(f'Уведомление создано: {notification}')
-                notification.recipients.set(recipients)
-                sending_to_channels(notification, recipients)
+                notifications.append((notification, recipients))
+
+        if not notifications:
+            return
+
+        # все уведомления события и их получатели создаются двумя запросами
+        with transaction.atomic():
+            Notification.objects.bulk_create([n for n, _ in notifications])
+            NotificationRecipient.objects.bulk_create([
+                NotificationRecipient(
+                    notification_id=notification.id,
+                    user_id=user_id,
+                    created_at=notification.created_at,
+                )
+                for notification, recipients in notifications
+                for user_id in recipients
+            ])
+        logger.info(f'Создано уведомлений: {len(notifications)}')
+        transaction.on_commit(lambda: sending_to_channels(notifications))
 
     @staticmethod
     def generate_task_link(workspace: int, board: int, task: int) -> str:
@@ -156,11 +172,10 @@ class TaskNotification(TaskCommonDataMixin, NotifyFactory):
         if 'deadline' in data_keys:
             old_deadline = self.old['deadline']
             new_deadline = self.obj.deadline
+            # установка (или отмена) таймера окончания дедлайна
+            end_deadline_notify(self.obj)
 
             if new_deadline:
-                # запуск отложенной задачи об окончании дедлайна
-                end_deadline_notify(self.obj)
-
                 if old_deadline is None:
                     context.update({
                         'deadline_task': {
@@ -235,13 +250,13 @@ class WorkSpaceNotification(NotifyFactory):
 
 class DeleteTaskNotification(TaskNotification):
     def fill_common_data(self):
-        board = Board.objects.get(column_board=self.old['column'])
-        self.data['workspace'] = board.workspace_id
-        self.data['board'] = board.id
+        parents = column_parents(self.old['column'])
+        self.data['workspace'] = parents.workspace_id
+        self.data['board'] = parents.board_id
         self.data['task'] = self.old['name']
         self.data['link'] = self.generate_task_link(
-            board.workspace_id,
-            board.id,
+            parents.workspace_id,
+            parents.board_id,
             self.old['id']
         )
 
@@ -283,7 +298,8 @@ class CommentNotification(TaskCommonDataMixin, NotifyFactory):
 class DeadlineNotification(TaskCommonDataMixin, NotifyFactory):
     def handler(self):
         super().handler()
-        PeriodicTask.objects.get(
+        # отложенная задача celery-beat, созданная до перехода на таймеры
+        PeriodicTask.objects.filter(
             name=f'end_deadline_{self.obj.id}'
         ).delete()
 
@@ -1,13 +1,25 @@
 
 
+from logic.ancestry import Ancestry, ancestry
+from workspaces.models import Column
+
+
+def column_parents(column_id: int) -> Ancestry:
+    """РП и доска колонки, Column.DoesNotExist - колонка удалена"""
+    parents = ancestry.resolve('column', column_id)
+    if parents is None:
+        raise Column.DoesNotExist(f'Колонка {column_id} не найдена')
+    return parents
+
+
 class TaskCommonDataMixin:
     def fill_common_data(self):
-        board = self.obj.column.board
-        self.data['workspace'] = board.workspace_id
-        self.data['board'] = board.id
+        parents = column_parents(self.obj.column_id)
+        self.data['workspace'] = parents.workspace_id
+        self.data['board'] = parents.board_id
         self.data['task'] = self.obj.name
         self.data['link'] = self.generate_task_link(
-            board.workspace_id,
-            board.id,
+            parents.workspace_id,
+            parents.board_id,
             self.obj.id
         )
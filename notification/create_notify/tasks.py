@@ -1,4 +1,8 @@
+import logging
+import time
+
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 from celery import shared_task
 
@@ -8,15 +12,41 @@ from notification.create_notify.creator import (CommentNotification,
                                                 DeleteTaskNotification,
                                                 DeadlineNotification)
 
+from logic.timers import timer_wheel
 from workspaces.models import Task, WorkSpace
 
+logger = logging.getLogger(__name__)
+
 User = get_user_model()
 
+# через сколько секунд повторить уведомления о дедлайне, которые не удалось создать
+DEADLINE_RETRY_DELAY = 60
+
 
 @shared_task
 def end_deadline(pk: int):
     task = Task.objects.get(pk=pk)
-    DeadlineNotification(obj=task).handler()
+    DeadlineNotification(event_data=None, obj=task).handler()
+
+
+@shared_task
+def end_deadlines(pks: list[int]):
+    """Уведомления об истечении дедлайнов, запускается таймерами пачкой"""
+    tasks = (Task.objects
+             .filter(pk__in=pks, deadline__lte=timezone.now())
+             .select_related('column__board'))
+    failed = []
+    for task in tasks:
+        # таймеры уже извлечены из Redis: ошибка одного уведомления
+        # не должна терять остальные дедлайны пачки
+        try:
+            DeadlineNotification(event_data=None, obj=task).handler()
+        except Exception:
+            logger.exception(f'Уведомление о дедлайне задачи {task.id} не создано')
+            failed.append(task.id)
+
+    if failed:
+        timer_wheel.restore('end_deadline', failed, time.time() + DEADLINE_RETRY_DELAY)
 
 
 @shared_task
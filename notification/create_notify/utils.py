@@ -1,23 +1,21 @@
-import json
 import logging
-import zoneinfo
-import redis
 
-from typing import Tuple
+from typing import Iterable, Tuple
 
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
-from django.conf import settings
 
-from django_celery_beat.models import PeriodicTask, CrontabSchedule
+from django_celery_beat.models import PeriodicTask
 
 from channels.layers import get_channel_layer
 
-from notification.models import Notification
+from logic.telegram_chats import telegram_chats
+from logic.timers import timer_wheel
+from notification.models import Notification, NotificationRecipient
 from notification.serializers import NotificationListSerializer
-from telebot.models import TeleBotID
+from notification.unread import unread_counter
+from telebot.notify_queue import publish_notifications
 from workspaces.models import Task
-from workspaces.websocket.utils import group_send_data
+from workspaces.websocket.utils import group_send_data_many
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -27,38 +25,17 @@ User = get_user_model()
 
 def end_deadline_notify(task: Task):
     """
-    Создание отложенной задачи в celery-beat на
-    создание уведомления об истечении дедлайна
+    Установка таймера на создание уведомления об истечении дедлайна.
+    Если дедлайн убран, таймер отменяется.
     """
+    # отложенные задачи celery-beat, созданные до перехода на таймеры
+    PeriodicTask.objects.filter(name=f'end_deadline_{task.id}').delete()
+
     if task.deadline is None:
-        p = PeriodicTask.objects.filter(name=f'end_deadline_{task.id}').first()
-        if p:
-            p.delete()
-
-    month = str(task.deadline.month)
-    day = str(task.deadline.day)
-    hour = str(task.deadline.hour)
-    minute = str(task.deadline.minute)
-
-    schedule, _ = CrontabSchedule.objects.get_or_create(
-        minute=minute,
-        hour=hour,
-        day_of_week='*',
-        day_of_month=day,
-        month_of_year=month,
-        timezone=zoneinfo.ZoneInfo('UTC')
-    )
-    try:
-        PeriodicTask.objects.create(
-            crontab=schedule,
-            name=f'end_deadline_{task.id}',
-            task='notification.create_notify.tasks.end_deadline',
-            args=json.dumps([task.id])
-        )
-    except ValidationError:
-        p_task = PeriodicTask.objects.get(name=f'end_deadline_{task.id}')
-        p_task.crontab = schedule
-        p_task.save()
+        timer_wheel.cancel('end_deadline', task.id)
+        return
+
+    timer_wheel.schedule('end_deadline', task.id, task.deadline)
 
 
 def get_current_task(pk: int) -> dict | None:
@@ -85,57 +62,58 @@ def get_user_data(user: User) -> dict:
     return user_data
 
 
-def send_notification_to_redis(message: str, users: list[int]):
+def send_notification_to_redis(messages: list[Tuple[str, list[int]]]) -> None:
     """
-    Функция отправляет в редис сообщение, которое публикует бот.
-    message - строка.
-    users - список из id телеграм чатов пользователей.
+    Функция отправляет в очередь редиса сообщения, которые рассылает бот.
+    Все сообщения записываются одним конвейером (pipeline).
+    messages - список из строки сообщения и id телеграм чатов пользователей.
     """
-    redis_client = redis.Redis(
-        username=f'{settings.REDIS_USER}',
-        password=f'{settings.REDIS_PASS}',
-        host=f'{settings.REDIS_HOST}',
-        port=f'{settings.REDIS_PORT}',
-        db=3
-    )
-    data = {
-        'message': message,
-        'users': users,
-    }
-    redis_client.publish('notify', json.dumps(data))
+    publish_notifications(messages)
 
 
-def get_telegram_id(users: list[int]) -> list[int]:
+def get_telegram_id(users: Iterable[int]) -> dict[int, int]:
     """
     Получение id телеграм чатов для
-    рассылки уведомлений по id пользователей
+    рассылки уведомлений по id пользователей.
+    Возвращает словарь: id пользователя - id телеграм чата
     """
-    chat_ids = list(TeleBotID.objects
-                    .filter(user_id__in=users)
-                    .values_list('telegram_id', flat=True)
-                    )
-    return chat_ids
+    return telegram_chats.get_many(users)
 
 
-def sending_to_channels(notification: Notification,
-                        recipients: list[int]) -> None:
-    """Рассылка уведомлений с сервера в другие каналы"""
+def sending_to_channels(notifications: list[Tuple[Notification, list[int]]]) -> None:
+    """
+    Рассылка уведомлений с сервера в другие каналы.
+    notifications: уведомления и id их получателей
+    """
     logger.info(f'Рассылка уведомлений по каналам')
 
     # в телеграм
-    telegram_id_list = get_telegram_id(recipients)
-    send_notification_to_redis(
-        notification.text, telegram_id_list
-    )
+    telegram_ids = get_telegram_id({
+        user_id for _, recipients in notifications for user_id in recipients
+    })
+    send_notification_to_redis([
+        (notification.text, [telegram_ids[user_id] for user_id in recipients if user_id in telegram_ids])
+        for notification, recipients in notifications
+    ])
+
+    # счетчики непрочитанных
+    unread_counter.add(user_id for _, recipients in notifications for user_id in recipients)
 
     # по вебсокету
     channel_layer = get_channel_layer()
-    data = NotificationListSerializer(notification).data
-    for user_id in recipients:
-        group_send_data(channel_layer,
-                        f'notification-{user_id}',
-                        data
-                        )
+    queryset = (Notification.objects
+                .filter(pk__in=[notification.id for notification, _ in notifications])
+                .select_related('workspace', 'board')
+                .in_bulk())
+    for notification, recipients in notifications:
+        # новое уведомление одинаково для всех получателей
+        inbox = NotificationRecipient(notification=queryset[notification.id],
+                                      created_at=notification.created_at)
+        data = NotificationListSerializer(inbox).data
+        group_send_data_many(channel_layer,
+                             [f'notification-{user_id}' for user_id in recipients],
+                             data
+                             )
 
 
 def get_pre_inintial_data(user: User,
@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_recipients(apps, schema_editor):
+    """Перенос получателей и статуса прочтения во входящие пользователей"""
+    Notification = apps.get_model('notification', 'Notification')
+    NotificationRecipient = apps.get_model('notification', 'NotificationRecipient')
+    Through = Notification.recipients.through
+
+    batch = []
+    rows = (Through.objects
+            .values_list('notification_id', 'user_id', 'notification__created_at', 'notification__read')
+            .order_by('id')
+            .iterator(chunk_size=2000))
+    for notification_id, user_id, created_at, read in rows:
+        batch.append(NotificationRecipient(
+            notification_id=notification_id,
+            user_id=user_id,
+            created_at=created_at,
+            read=read,
+        ))
+        if len(batch) >= 2000:
+            NotificationRecipient.objects.bulk_create(batch)
+            batch = []
+    NotificationRecipient.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notification', '0002_alter_notification_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Время создания')),
+                ('read', models.BooleanField(default=False, verbose_name='Прочитано')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox', to='notification.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['user', '-created_at'], name='inbox_user_created_idx'),
+                    models.Index(condition=models.Q(('read', False)), fields=['user'], name='inbox_user_unread_idx'),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='notificationrecipient',
+            constraint=models.UniqueConstraint(fields=('notification', 'user'), name='notification_recipient_unique'),
+        ),
+        migrations.RunPython(copy_recipients, migrations.RunPython.noop),
+        # связь с получателями переводится на таблицу входящих
+        migrations.RemoveField(
+            model_name='notification',
+            name='recipients',
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recipients',
+            field=models.ManyToManyField(related_name='notification', through='notification.NotificationRecipient', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='read',
+        ),
+    ]
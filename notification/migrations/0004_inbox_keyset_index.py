@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_notificationrecipient'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificationrecipient',
+            name='inbox_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notificationrecipient',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='inbox_user_created_id_idx'),
+        ),
+    ]
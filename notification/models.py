@@ -8,8 +8,8 @@ class Notification(models.Model):
     text = models.TextField('Текст сообщения')
     created_at = models.DateTimeField('Время создания',
                                       auto_now_add=True)
-    read = models.BooleanField('Прочитано', default=False)
     recipients = models.ManyToManyField(settings.AUTH_USER_MODEL,
+                                        through='NotificationRecipient',
                                         related_name='notification')
     workspace = models.ForeignKey(WorkSpace,
                                   null=True,
@@ -19,3 +19,35 @@ class Notification(models.Model):
                               null=True,
                               on_delete=models.SET_NULL,
                               related_name='board_notifications')
+
+
+class NotificationRecipient(models.Model):
+    """
+    Входящие уведомления пользователя.
+    Статус прочтения свой у каждого получателя, время создания
+    дублируется из уведомления, чтобы последние уведомления
+    пользователя читались по индексу без соединения таблиц.
+    """
+    notification = models.ForeignKey(Notification,
+                                     on_delete=models.CASCADE,
+                                     related_name='inbox')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE,
+                             related_name='inbox')
+    created_at = models.DateTimeField('Время создания')
+    read = models.BooleanField('Прочитано', default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'user'],
+                                    name='notification_recipient_unique'),
+        ]
+        indexes = [
+            # курсор страницы - (created_at, id)
+            models.Index(fields=['user', '-created_at', '-id'],
+                         name='inbox_user_created_id_idx'),
+            # пересчет непрочитанных, если счетчика нет в Redis
+            models.Index(fields=['user'],
+                         condition=models.Q(read=False),
+                         name='inbox_user_unread_idx'),
+        ]
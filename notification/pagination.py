@@ -0,0 +1,102 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(obj) -> str:
+    position = [obj.created_at.isoformat(), obj.id]
+    return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    try:
+        created_at, pk = json.loads(urlsafe_b64decode(cursor.encode()))
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            raise ValueError
+        return created_at, int(pk)
+    except (TypeError, ValueError):
+        raise NotFound('Неверный курсор')
+
+
+def keyset_page(queryset: QuerySet,
+                cursor: Optional[str],
+                page_size: int) -> Tuple[list, Optional[str]]:
+    """
+    Страница обьектов по убыванию (created_at, id), начиная после курсора.
+    Страница читается по индексу без OFFSET, поэтому время чтения
+    не зависит от глубины истории.
+    Возвращает обьекты страницы и курсор следующей страницы (None - страница последняя).
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+
+    # лишний обьект показывает, есть ли следующая страница
+    objects = list(queryset[:page_size + 1])
+    if len(objects) > page_size:
+        return objects[:page_size], encode_cursor(objects[page_size - 1])
+    return objects, None
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная пагинация по (created_at, id).
+    Курсор следующей страницы передается в параметре cursor.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 25
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page, self.next_cursor = keyset_page(
+            queryset,
+            request.query_params.get(self.cursor_query_param),
+            self.get_page_size(request),
+        )
+        return page
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('next_cursor', self.next_cursor),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -4,7 +4,8 @@
 """
 
 from drf_spectacular.extensions import OpenApiViewExtension
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import extend_schema, inline_serializer
+from rest_framework import serializers
 
 
 class Fix1(OpenApiViewExtension):
@@ -27,6 +28,13 @@ class Fix1(OpenApiViewExtension):
             def read_all(self, request, *args, **kwargs):
                 return super().read_all(request, *args, **kwargs)
 
+            @extend_schema(
+                description='Количество непрочитанных уведомлений',
+                responses={200: inline_serializer('UnreadCount', {'unread': serializers.IntegerField()})},
+            )
+            def unread(self, request, *args, **kwargs):
+                return super().unread(request, *args, **kwargs)
+
         return Fixed
 
 
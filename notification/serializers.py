@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from notification.models import Notification
+from notification.models import NotificationRecipient
 from rest_framework.exceptions import ValidationError
 
 from workspaces.models import WorkSpace, Board
@@ -26,11 +26,14 @@ class BoardSerializer(serializers.ModelSerializer):
 
 
 class NotificationListSerializer(serializers.ModelSerializer):
-    workspace = WorkSpaceSerializer(read_only=True)
-    board = BoardSerializer(read_only=True)
+    """Уведомление из входящих пользователя"""
+    id = serializers.IntegerField(source='notification_id', read_only=True)
+    text = serializers.CharField(source='notification.text', read_only=True)
+    workspace = WorkSpaceSerializer(source='notification.workspace', read_only=True)
+    board = BoardSerializer(source='notification.board', read_only=True)
 
     class Meta:
-        model = Notification
+        model = NotificationRecipient
         fields = (
             'id',
             'text',
@@ -42,8 +45,10 @@ class NotificationListSerializer(serializers.ModelSerializer):
 
 
 class NotificationUpdateSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='notification_id', read_only=True)
+
     class Meta:
-        model = Notification
+        model = NotificationRecipient
         fields = (
             'id',
             'read',
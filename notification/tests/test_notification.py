@@ -1,11 +1,22 @@
 import datetime
+from unittest import mock
 
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
 from rest_framework.test import APITestCase, APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from django.urls import reverse
 from freezegun import freeze_time
 
-from notification.models import Notification
+from notification.create_notify.creator import DeleteTaskNotification, NotifyFactory
+from notification.consumers import NotificationConsumer
+from notification.create_notify.utils import sending_to_channels
+from notification.models import Notification, NotificationRecipient
+from notification.unread import unread_counter
+from pulsewave.asgi import application
+from telebot.models import TeleBotID
 from workspaces.models import WorkSpace, Board, Column, Task
 
 User = get_user_model()
@@ -14,3 +25,196 @@ User = get_user_model()
 class NotificationTestCase(APITestCase):
     # TODO переписать под вебсокеты
     pass
+
+
+class CreateNotificationTestCase(APITestCase):
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(email=f'user{i}@example.com', password='Pass!234', is_active=True)
+            for i in range(3)
+        ]
+        self.ws = WorkSpace.objects.create(owner=self.users[0], name='WorkSpace1')
+        self.board = Board.objects.create(workspace=self.ws, name='Board1')
+
+    def test_bulk_create(self):
+        data = {'user': 'user0', 'workspace': self.ws.id, 'board': self.board.id,
+                'task': 'task1', 'link': 'link'}
+        context = {
+            'change_name': {'old_name': 'old', 'recipients': [self.users[1].id, self.users[2].id]},
+            'change_priority': {'priority': 'Высокий', 'recipients': [self.users[1].id]},
+            'move_task': {'old_col': 'a', 'new_col': 'b', 'recipients': []},
+        }
+
+        with mock.patch('notification.create_notify.creator.sending_to_channels') as sending:
+            with self.captureOnCommitCallbacks(execute=True):
+                NotifyFactory.create_notification(data, context)
+
+        self.assertEquals(2, Notification.objects.count())
+        self.assertEquals(3, NotificationRecipient.objects.count())
+        self.assertEquals(1, self.users[1].notification.filter(text__contains='old').count())
+
+        # все уведомления рассылаются одним вызовом
+        (notifications,), _ = sending.call_args
+        self.assertEquals([2, 1], [len(recipients) for _, recipients in notifications])
+
+    def test_task_notification_column_deleted(self):
+        """Удаленная колонка - понятная ошибка, а не AttributeError"""
+        column = Column.objects.create(name='Deleted', board=self.board, index=3)
+        column_id = column.id
+        column.delete()
+
+        old = {'id': 1, 'name': 'task', 'column': column_id, 'responsible': []}
+        notification = DeleteTaskNotification({}, None, {'id': self.users[0].id, 'name': 'user0'}, old)
+        with self.assertRaises(Column.DoesNotExist):
+            notification.handler()
+
+    def test_sending_to_channels(self):
+        notification = Notification.objects.create(text='text', workspace=self.ws, board=self.board)
+        recipients = [self.users[1].id, self.users[2].id]
+        TeleBotID.objects.create(user=self.users[1], telegram_id=100)
+
+        with mock.patch('notification.create_notify.utils.send_notification_to_redis') as telegram:
+            with mock.patch('notification.create_notify.utils.group_send_data_many') as group_send:
+                sending_to_channels([(notification, recipients)])
+
+        telegram.assert_called_once_with([('text', [100])])
+        _, groups, data = group_send.call_args.args
+        self.assertEquals([f'notification-{user_id}' for user_id in recipients], groups)
+        self.assertEquals(self.board.id, data['board']['id'])
+
+
+class InboxTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        self.other = User.objects.create_user(email='user2@example.com', password='Pass!234', is_active=True)
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+
+        data = {'user': 'user', 'workspace': self.ws.id, 'board': None}
+        context = {
+            'added_in_ws': {'ws': 'WorkSpace1', 'recipients': [self.user.id, self.other.id]},
+            'del_from_ws': {'ws': 'WorkSpace1', 'recipients': [self.user.id]},
+        }
+        unread_counter.redis.delete(unread_counter._key(self.user.id), unread_counter._key(self.other.id))
+        with mock.patch('notification.create_notify.creator.sending_to_channels'):
+            NotifyFactory.create_notification(data, context)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('notification-list-list'))
+
+        self.assertIsNone(response.data['next'])
+        self.assertEquals(2, len(response.data['results']))
+        self.assertEquals([False, False], [n['read'] for n in response.data['results']])
+        self.assertEquals('WorkSpace1', response.data['results'][0]['workspace']['name'])
+
+    def test_cursor_pagination(self):
+        # уведомления с одинаковым временем создания не теряются между страницами
+        created_at = NotificationRecipient.objects.filter(user=self.user).first().created_at
+        for i in range(30):
+            notification = Notification.objects.create(text=f'text{i}', workspace=self.ws)
+            NotificationRecipient.objects.create(notification=notification, user=self.user,
+                                                 created_at=created_at)
+
+        ids = []
+        url = reverse('notification-list-list') + '?page_size=10'
+        while url:
+            response = self.client.get(url)
+            self.assertEquals(200, response.status_code)
+            ids += [n['id'] for n in response.data['results']]
+            url = response.data['next']
+
+        expected = list(NotificationRecipient.objects
+                        .filter(user=self.user)
+                        .order_by('-created_at', '-id')
+                        .values_list('notification_id', flat=True))
+        self.assertEquals(32, len(ids))
+        self.assertEquals(expected, ids)
+
+        response = self.client.get(reverse('notification-list-list') + '?cursor=broken')
+        self.assertEquals(404, response.status_code)
+
+    def test_read_state_per_recipient(self):
+        notification = Notification.objects.get(text__contains='добавлены')
+        self.assertEquals(2, unread_counter.get(self.user.id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('notification-update', kwargs={'pk': notification.id}), {'read': True}
+            )
+        self.assertEquals({'id': notification.id, 'read': True}, response.data)
+        self.assertEquals(1, unread_counter.get(self.user.id))
+
+        # другой получатель уведомление не прочитал
+        self.assertEquals(1, unread_counter.get(self.other.id))
+        self.assertFalse(NotificationRecipient.objects.get(user=self.other).read)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('notification-list-read_all_notification'))
+        self.assertEquals([True, True], [n['read'] for n in response.data])
+        self.assertEquals({'unread': 0}, self.client.get(reverse('notification-list-unread_count')).data)
+
+    def test_counter_follows_new_notifications(self):
+        self.assertEquals(2, unread_counter.get(self.user.id))
+        notification = Notification.objects.create(text='text', workspace=self.ws)
+        NotificationRecipient.objects.create(notification=notification, user=self.user,
+                                             created_at=notification.created_at)
+
+        with mock.patch('notification.create_notify.utils.send_notification_to_redis'):
+            with mock.patch('notification.create_notify.utils.group_send_data_many'):
+                sending_to_channels([(notification, [self.user.id])])
+
+        self.assertEquals(3, unread_counter.get(self.user.id))
+
+    def test_foreign_notification(self):
+        notification = Notification.objects.create(text='text', workspace=self.ws)
+        NotificationRecipient.objects.create(notification=notification, user=self.other,
+                                             created_at=notification.created_at)
+
+        response = self.client.patch(reverse('notification-update', kwargs={'pk': notification.id}), {'read': True})
+        self.assertEquals(404, response.status_code)
+
+
+class NotificationConsumerTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+
+    def connect(self, query_string: str = '') -> str:
+        async def run():
+            communicator = ApplicationCommunicator(application, {
+                'type': 'websocket',
+                'path': '/ws/notification/',
+                'query_string': query_string.encode(),
+                'headers': [],
+            })
+            await communicator.send_input({'type': 'websocket.connect'})
+            output = await communicator.receive_output(5)
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(2)
+            return output['type']
+
+        return async_to_sync(run)()
+
+    def test_connect(self):
+        token = RefreshToken.for_user(self.user).access_token
+        self.assertEquals('websocket.accept', self.connect(f'token={token}'))
+
+    def test_connect_unauthenticated(self):
+        self.assertEquals('websocket.close', self.connect())
+        self.assertEquals('websocket.close', self.connect('token=invalid'))
+
+    def test_connect_anonymous_not_subscribed(self):
+        """Анонимный пользователь не подписывается на уведомления (и при вызове из MultiplexConsumer)"""
+        consumer = NotificationConsumer()
+        consumer.scope = {'user': AnonymousUser()}
+        with mock.patch.object(consumer, 'accept') as accept, \
+                mock.patch.object(consumer, 'close') as close, \
+                mock.patch.object(consumer, 'add_group') as add_group:
+            async_to_sync(consumer.connect)()
+
+        close.assert_awaited_once()
+        accept.assert_not_called()
+        add_group.assert_not_called()
+        self.assertEquals([], consumer.subscriptions)
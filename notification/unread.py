@@ -0,0 +1,80 @@
+from typing import Iterable, Optional
+
+import redis
+
+from django.db import transaction
+
+from logic.redis_client import get_redis
+from notification.models import NotificationRecipient
+
+# база Redis для счетчиков непрочитанных уведомлений
+UNREAD_REDIS_DB = 5
+
+# изменение счетчика только если он есть: отсутствующий счетчик
+# пересчитывается из БД при чтении
+INCR_IF_EXISTS_LUA = """
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        return redis.call('INCRBY', KEYS[1], ARGV[1])
+    end
+    return nil
+"""
+
+
+class UnreadCounter:
+    """
+    Счетчик непрочитанных уведомлений пользователя в Redis.
+    Счетчик создается при первом чтении подсчетом по частичному индексу
+    непрочитанных и живет ограниченное время, чтобы возможное
+    расхождение с БД не накапливалось.
+    """
+    timeout = 3600 * 24
+
+    def __init__(self):
+        self._incr_script = None
+
+    @property
+    def redis(self) -> redis.Redis:
+        return get_redis(UNREAD_REDIS_DB)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f'notification_unread:{user_id}'
+
+    def get(self, user_id: int) -> int:
+        count = self.redis.get(self._key(user_id))
+        if count is not None:
+            return max(int(count), 0)
+
+        count = NotificationRecipient.objects.filter(user_id=user_id, read=False).count()
+        # счетчик мог быть создан параллельно, тогда верен он
+        if not self.redis.set(self._key(user_id), count, ex=self.timeout, nx=True):
+            return int(self.redis.get(self._key(user_id)) or count)
+        return count
+
+    def add(self, user_ids: Iterable[int], amount: int = 1) -> None:
+        """Изменение счетчиков пользователей одним конвейером"""
+        if self._incr_script is None:
+            self._incr_script = self.redis.register_script(INCR_IF_EXISTS_LUA)
+
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id in user_ids:
+            self._incr_script(keys=[self._key(user_id)], args=[amount], client=pipe)
+        pipe.execute()
+
+    def mark_read(self, user_id: int, notification_ids: Optional[Iterable[int]] = None) -> int:
+        """
+        Отметка уведомлений пользователя прочитанными (всех, если
+        notification_ids не переданы). Счетчик уменьшается на количество
+        уведомлений, статус которых действительно изменился.
+        """
+        queryset = NotificationRecipient.objects.filter(user_id=user_id, read=False)
+        if notification_ids is not None:
+            queryset = queryset.filter(notification_id__in=notification_ids)
+
+        updated = queryset.update(read=True)
+        if updated:
+            transaction.on_commit(lambda: self.add([user_id], -updated))
+        return updated
+
+
+unread_counter = UnreadCounter()
@@ -3,34 +3,50 @@ from rest_framework.decorators import action
 from rest_framework.mixins import ListModelMixin
 
 from . import serializers
-from .models import Notification
+from .models import NotificationRecipient
+from .pagination import KeysetPagination, keyset_page
+from .unread import unread_counter
 from rest_framework.response import Response
 
 
 class NotificationList(ListModelMixin,
                        viewsets.GenericViewSet):
     serializer_class = serializers.NotificationListSerializer
-    queryset = Notification.objects.all()
+    queryset = NotificationRecipient.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
         user = self.request.user
-        queryset = queryset.filter(recipients=user)
-        return queryset.order_by('-created_at')[:25]
+        queryset = (queryset
+                    .filter(user=user)
+                    .select_related('notification__workspace', 'notification__board'))
+        return queryset.order_by('-created_at', '-id')
 
     @action(methods=['patch'], detail=False, url_name='read_all_notification')
     def read_all(self, request, *args, **kwargs):
-        queryset = self.queryset.filter(
-            recipients=self.request.user,
-            read=False,
-        )
-        queryset.update(read=True)
-        data = self.serializer_class(self.get_queryset(), many=True).data
+        unread_counter.mark_read(self.request.user.id)
+        page, _ = keyset_page(self.get_queryset(), None, KeysetPagination.page_size)
+        data = self.serializer_class(page, many=True).data
         return Response(data)
 
+    @action(methods=['get'], detail=False, url_name='unread_count')
+    def unread(self, request, *args, **kwargs):
+        return Response({'unread': unread_counter.get(self.request.user.id)})
+
 
 class NotificationUpdate(generics.UpdateAPIView):
     serializer_class = serializers.NotificationUpdateSerializer
-    queryset = Notification.objects.all()
+    queryset = NotificationRecipient.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    lookup_field = 'notification_id'
+    lookup_url_kwarg = 'pk'
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
+
+    def perform_update(self, serializer):
+        if serializer.validated_data.get('read'):
+            unread_counter.mark_read(self.request.user.id, [serializer.instance.notification_id])
+            serializer.instance.read = True
@@ -76,4 +76,13 @@ app.conf.beat_schedule = {
         'task': 'accounts.tasks.clear_expired_token',
         'schedule': crontab(hour='1', minute='0'),
     },
+    'sweep_expired': {
+        'task': 'accounts.tasks.sweep_expired_objects',
+        'schedule': crontab(minute='*/10'),
+    },
+    # дедлайны задач (см. logic.timers)
+    'fire_timers': {
+        'task': 'workspaces.tasks.fire_timers',
+        'schedule': 15.0,
+    },
 }
@@ -103,6 +103,12 @@ CORS_ALLOWED_ORIGINS = [
 
 # SSE
 EVENTSTREAM_STORAGE_CLASS = 'sse.storage.RedisStorage'
+# хранение событий канала для переподключившихся клиентов:
+# последние MAX_EVENTS событий, TIMEOUT сек. после последнего события
+EVENTSTREAM_RETENTION = {
+    'MAX_EVENTS': 1000,
+    'TIMEOUT': 60 * 60,
+}
 EVENTSTREAM_ALLOW_ORIGIN = 'https://pulsewave.ru'
 EVENTSTREAM_ALLOW_CREDENTIALS = True
 EVENTSTREAM_ALLOW_HEADERS = 'Authorization'
@@ -161,10 +167,12 @@ sentry_sdk.init(
 # django channels
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "BACKEND": "logic.redis_layer.CustomRedisChannelLayer",
         "CONFIG": {
             "hosts": [f"redis://{REDIS_USER}:{REDIS_PASS}@{REDIS_HOST}:{REDIS_PORT}/4"],
             "symmetric_encryption_keys": [SECRET_KEY],
+            # состав групп кэшируется в памяти процесса на указанное число секунд
+            "group_cache_ttl": 1,
         },
     },
 }
\ No newline at end of file
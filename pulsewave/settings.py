@@ -173,6 +173,7 @@ DJOSER = {
     'ACTIVATION_URL': 'auth/activate/{uid}/{token}',
     'CHANGE_EMAIL_URL': 'u/security/change_email?token={token}',  # своя настройка, не из модуля
     'CHANGE_EMAIL_URL_EXPIRED': {'hours': 1},  # своя настройка, не из модуля
+    'INACTIVE_USER_TIMEOUT': {'hours': 24},  # своя настройка, не из модуля
     'SEND_ACTIVATION_EMAIL': True,
     'SERIALIZERS': {
         'current_user': 'accounts.serializers.ProfileUserSerializer',
@@ -236,6 +237,73 @@ WORKSAPCES = {
     # 'INVITE_NEW_USER_EMAIL_URL': 'auth/invite-new-user/{wuid}/{uid}/{token}',
     'INVITE_USER_EMAIL_URL': 'invite/workspace/{token}',
     'INVITE_TOKEN_TIMEOUT': 3600 * 24,
+    # движок порядковых номеров задач и колонок: 'shift' - плотные index,
+    # 'rank' - разреженные ключи, перемещение пишет одну строку
+    'INDEXING_ENGINE': 'shift',
+    # время жизни слепка доски для рассылки по вебсокету
+    'BOARD_SNAPSHOT_TIMEOUT': 3600 * 24,
+    # окно (сек.), за которое изменения доски собираются в одну рассылку
+    # по вебсокету; 0 - рассылка сразу после фиксации транзакции
+    'BROADCAST_WINDOW': 0.05,
+    # время жизни в Redis (сек.) кэша прав доступа и родителей обьектов РП
+    'ACL_CACHE_TIMEOUT': 3600,
+    'ANCESTRY_CACHE_TIMEOUT': 3600 * 24,
+    # время жизни кэша пользователей для авторизации вебсокетов (сек.)
+    'WS_AUTH_CACHE_TIMEOUT': 60,
+    # время жизни кэша id телеграм чатов пользователей (сек.)
+    'TELEGRAM_CHAT_CACHE_TIMEOUT': 3600 * 24,
+    # время жизни тех же кэшей в памяти процесса (сек.)
+    'LOCAL_CACHE_TIMEOUT': 2,
+}
+
+# рассылка уведомлений в телеграм (telebot.delivery)
+TELEGRAM_DELIVERY = {
+    # одновременных запросов к Telegram
+    'CONCURRENCY': 10,
+    # ограничения Telegram: сообщений в секунду на бота и в один чат
+    'GLOBAL_RATE': 30,
+    'CHAT_RATE': 1,
+    # повторов при ответе 429 (retry_after) и ошибках сети
+    'MAX_RETRIES': 3,
+}
+
+# очередь уведомлений телеграм бота (telebot.notify_queue)
+TELEGRAM_QUEUE = {
+    # записей за одно чтение и ожидание новых записей (мс)
+    'BATCH_SIZE': 50,
+    'BLOCK_MS': 5000,
+    # через сколько мс неподтвержденную запись забирает другой процесс
+    'CLAIM_IDLE_MS': 60000,
+    # попыток обработки до переноса в notify:dead
+    'MAX_DELIVERIES': 5,
+    # длина очереди и потока notify:dead (приблизительно)
+    'MAXLEN': 100000,
+    'DEAD_MAXLEN': 10000,
+}
+
+# вебхук телеграм бота (startbot --webhook, telebot.webhook)
+TELEGRAM_WEBHOOK = {
+    'PATH': '/telegram/webhook/',
+    'HOST': '0.0.0.0',
+    'PORT': 8081,
+    # апдейтов, обрабатываемых процессом одновременно
+    'CONCURRENCY': 20,
+    # одновременных запросов Telegram к вебхуку (на все процессы, 1-100)
+    'MAX_CONNECTIONS': 40,
+}
+
+# просмотр лога бота (telebot.views.view_logs)
+TELEGRAM_LOGS = {
+    'PATH': os.path.join(BASE_DIR, 'telegram_bot.log'),
+    # строк на странице по умолчанию и максимум
+    'PAGE_LINES': 200,
+    'MAX_PAGE_LINES': 1000,
+    # ?follow=1: проверка новых строк раз в FOLLOW_INTERVAL сек.,
+    # поток закрывается через FOLLOW_TIMEOUT сек.
+    'FOLLOW_INTERVAL': 1,
+    'FOLLOW_TIMEOUT': 60 * 5,
+    # под WSGI поток занимает синхронный воркер, поэтому он короче
+    'WSGI_FOLLOW_TIMEOUT': 5,
 }
 
 APPEND_SLASH = False
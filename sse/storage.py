@@ -1,63 +1,72 @@
-import os
 import json
-import redis
 
 from django.conf import settings
 
 from django_eventstream.storage import StorageBase, EventDoesNotExist
 from django_eventstream.event import Event
 
-EVENT_TIMEOUT = 60 * 24
+from logic.redis_client import get_redis
+
+# база Redis для событий SSE
+SSE_REDIS_DB = 1
+
+# номер события и запись в поток канала за одно обращение:
+# номера событий канала идут подряд и не повторяются
+APPEND_EVENT_LUA = """
+    local event_id = redis.call('INCR', KEYS[1])
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[3], event_id .. '-0',
+               'type', ARGV[1], 'data', ARGV[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+    return event_id
+"""
 
 
 class RedisStorage(StorageBase):
+    """
+    События SSE в Redis Streams, один поток на канал.
+    id записи потока - номер события ('<id>-0'), поэтому пропущенные
+    клиентом события читаются одним XRANGE. Хранятся последние
+    EVENTSTREAM_RETENTION['MAX_EVENTS'] событий канала, поток удаляется,
+    если в канал не было событий EVENTSTREAM_RETENTION['TIMEOUT'] секунд.
+    Счетчик номеров ('<канал>_id') не удаляется: после удаления потока
+    номера продолжаются и клиент со старым номером получит EventDoesNotExist.
+    """
+
     def __init__(self):
-        self.redis_conn = redis.StrictRedis(
-            username=f'{settings.REDIS_USER}',
-            password=f'{settings.REDIS_PASS}',
-            host=f'{settings.REDIS_HOST}',
-            port=f'{settings.REDIS_PORT}',
-            db=1
-        )
+        self.redis_conn = get_redis(SSE_REDIS_DB)
+        self._append_script = self.redis_conn.register_script(APPEND_EVENT_LUA)
 
-    def append_event(self, channel, event_type, data):
-        current_id = self.get_current_id(channel)
-        event_id = current_id + 1
+        retention = getattr(settings, 'EVENTSTREAM_RETENTION', {})
+        self.max_events = retention.get('MAX_EVENTS', 1000)
+        self.timeout = retention.get('TIMEOUT', 60 * 60)
 
-        event = Event(
-            channel=channel,
-            type=event_type,
-            data=data,
-            id=event_id,
-        )
+    @staticmethod
+    def _id_key(channel: str) -> str:
+        return f'{channel}_id'
 
-        self.redis_conn.setex(
-            f'{channel}-{event_id}',
-            EVENT_TIMEOUT,
-            self.to_json(event)
-        )
-        self.redis_conn.set(f'{channel}_id', event_id)
+    @staticmethod
+    def _stream_key(channel: str) -> str:
+        return f'sse:{channel}'
 
-        return event
+    def append_event(self, channel, event_type, data):
+        event_id = self._append_script(
+            keys=[self._id_key(channel), self._stream_key(channel)],
+            args=[event_type, json.dumps(data), self.max_events, self.timeout],
+        )
+        return Event(channel=channel, type=event_type, data=data, id=int(event_id))
 
     def get_events(self, channel, last_id, limit=100):
-        events = []
-        cur_id = self.get_current_id(channel)
+        pipe = self.redis_conn.pipeline(transaction=False)
+        pipe.get(self._id_key(channel))
+        # последнее полученное клиентом событие + limit следующих
+        pipe.xrange(self._stream_key(channel), min=f'{last_id}-0', count=limit + 1)
+        cur_id, entries = pipe.execute()
+        cur_id = int(cur_id or 0)
 
         if cur_id == last_id:
             return []
 
-        if not self.redis_conn.get(f'{channel}-{last_id}'):
-            raise EventDoesNotExist(
-                'No such event %d' % last_id,
-                cur_id)
-
-        for i in range(limit):
-            event = self.redis_conn.get(f'{channel}-{last_id+i}')
-            if event is None:
-                break
-            events.append(self.from_bytes_to_event(event))
-
+        events = [self.to_event(channel, *entry) for entry in entries]
         if len(events) == 0 or events[0].id != last_id:
             raise EventDoesNotExist(
                 'No such event %d' % last_id,
@@ -66,28 +75,13 @@ class RedisStorage(StorageBase):
         return events[1:]
 
     def get_current_id(self, channel: str):
-        if not self.redis_conn.exists(f'{channel}_id'):
-            self.redis_conn.set(f'{channel}_id', 0)
-
-        id_key = int(self.redis_conn.get(f'{channel}_id').decode())
-
-        return id_key
-
-    def to_json(self, event: Event):
-        return json.dumps({
-            'channel': event.channel,
-            'type': event.type,
-            'data': event.data,
-            'id': event.id
-        })
-
-    def from_bytes_to_event(self, b_str: bytes):
-        event_str = b_str.decode()
-        event_dict = json.loads(event_str)
-        event = Event(
-            channel=event_dict['channel'],
-            type=event_dict['type'],
-            data=event_dict['data'],
-            id=event_dict['id'],
+        return int(self.redis_conn.get(self._id_key(channel)) or 0)
+
+    @staticmethod
+    def to_event(channel: str, entry_id: bytes, fields: dict) -> Event:
+        return Event(
+            channel=channel,
+            type=fields[b'type'].decode(),
+            data=json.loads(fields[b'data']),
+            id=int(entry_id.split(b'-')[0]),
         )
-        return event
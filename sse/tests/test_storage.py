@@ -0,0 +1,102 @@
+import sys
+import types
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from logic.redis_client import get_redis
+
+
+def _eventstream_stub() -> dict:
+    """
+    Модули django_eventstream, которые использует хранилище, если пакет
+    не установлен: базовый класс хранилища, исключение и событие
+    """
+    class StorageBase:
+        pass
+
+    class EventDoesNotExist(Exception):
+        def __init__(self, message, current_id):
+            super().__init__(message)
+            self.current_id = current_id
+
+    class Event:
+        def __init__(self, channel, type, data, id=None):
+            self.channel = channel
+            self.type = type
+            self.data = data
+            self.id = id
+
+    package = types.ModuleType('django_eventstream')
+    storage = types.ModuleType('django_eventstream.storage')
+    storage.StorageBase, storage.EventDoesNotExist = StorageBase, EventDoesNotExist
+    event = types.ModuleType('django_eventstream.event')
+    event.Event = Event
+    package.storage, package.event = storage, event
+    return {'django_eventstream': package,
+            'django_eventstream.storage': storage,
+            'django_eventstream.event': event}
+
+
+try:
+    from sse import storage as sse_storage
+except ImportError:
+    with mock.patch.dict(sys.modules, _eventstream_stub()):
+        from sse import storage as sse_storage
+
+CHANNEL = 'test-storage'
+
+
+class RedisStorageTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = get_redis(sse_storage.SSE_REDIS_DB)
+        self.keys = (sse_storage.RedisStorage._id_key(CHANNEL), sse_storage.RedisStorage._stream_key(CHANNEL))
+        self.redis.delete(*self.keys)
+        self.addCleanup(self.redis.delete, *self.keys)
+        self.storage = sse_storage.RedisStorage()
+
+    def append(self, count: int) -> list:
+        return [self.storage.append_event(CHANNEL, 'message', {'n': i}) for i in range(count)]
+
+    def test_append_and_get_events(self):
+        events = self.append(3)
+        self.assertEqual([event.id for event in events], [1, 2, 3])
+        self.assertEqual(self.storage.get_current_id(CHANNEL), 3)
+
+        # события после последнего полученного клиентом
+        events = self.storage.get_events(CHANNEL, 1)
+        self.assertEqual([(event.id, event.type, event.data) for event in events],
+                         [(2, 'message', {'n': 1}), (3, 'message', {'n': 2})])
+        self.assertEqual(self.storage.get_events(CHANNEL, 3), [])
+
+    def test_ids_continue_counter(self):
+        """Номера продолжают счетчик канала, в том числе после удаления потока"""
+        self.redis.set(self.keys[0], 10)
+        self.assertEqual([event.id for event in self.append(2)], [11, 12])
+
+        self.redis.delete(self.keys[1])
+        self.assertEqual(self.append(1)[0].id, 13)
+        with self.assertRaises(sse_storage.EventDoesNotExist) as error:
+            self.storage.get_events(CHANNEL, 12)
+        self.assertEqual(error.exception.current_id, 13)
+
+    def test_limit(self):
+        """Читается limit + 1 запись: последнее полученное событие и limit следующих"""
+        self.append(5)
+        events = self.storage.get_events(CHANNEL, 1, limit=2)
+        self.assertEqual([event.id for event in events], [2, 3])
+        events = self.storage.get_events(CHANNEL, 1, limit=4)
+        self.assertEqual([event.id for event in events], [2, 3, 4, 5])
+
+    @override_settings(EVENTSTREAM_RETENTION={'MAX_EVENTS': 10})
+    def test_trimmed_events(self):
+        """Клиент, отставший больше чем на MAX_EVENTS событий, получает EventDoesNotExist"""
+        self.storage = sse_storage.RedisStorage()
+        # MAXLEN приблизительный: поток обрезается целыми узлами (по 100 записей)
+        self.append(300)
+        self.assertLess(self.redis.xlen(self.keys[1]), 300)
+
+        with self.assertRaises(sse_storage.EventDoesNotExist) as error:
+            self.storage.get_events(CHANNEL, 1)
+        self.assertEqual(error.exception.current_id, 300)
+        self.assertEqual([event.id for event in self.storage.get_events(CHANNEL, 299)], [300])
@@ -1,7 +1,7 @@
 import re
 from typing import Union
 
-from workspaces.models import Task, Column, Board
+from logic.ancestry import ancestry
 
 
 def get_board_id(path: str) -> Union[int, None]:
@@ -16,10 +16,8 @@ def get_board_id(path: str) -> Union[int, None]:
 
     if child == 'comments':
         return
-    elif parent == 'task':
-        board_id = Task.objects.get(pk=parent_id).column.board_id
-    elif parent == 'column':
-        board_id = Column.objects.get(pk=parent_id).board_id
+    elif parent in ('task', 'column'):
+        board_id = ancestry.board_id(parent, int(parent_id))
     elif parent == 'boards':
         board_id = parent_id
     elif parent == 'workspace':
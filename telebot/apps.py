@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TelebotConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'telebot'
+
+    def ready(self):
+        from . import signals
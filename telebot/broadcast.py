@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import uuid
+from typing import Dict, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+from redis.exceptions import RedisError
+
+from logic.redis_client import get_async_redis
+from telebot.delivery import TelegramDelivery
+from telebot.models import TeleBotID
+from telebot.notify_queue import NOTIFY_REDIS_DB
+
+logger = logging.getLogger(__name__)
+
+# id незавершенных рассылок
+ACTIVE_KEY = 'broadcast:active'
+
+# рассылки, запущенные в этом процессе: id - задача
+_running: Dict[int, asyncio.Task] = {}
+
+# продление и снятие блокировки, только если ее значение - токен этого процесса:
+# истекшую блокировку мог взять другой процесс
+EXTEND_LOCK_LUA = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+"""
+RELEASE_LOCK_LUA = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+"""
+
+
+class Broadcast:
+    """
+    Рассылка сообщения всем пользователям из TeleBotID в фоне.
+    Получатели читаются из БД пачками по batch_size в порядке id,
+    пачка отправляется одновременно через TelegramDelivery (с его
+    ограничениями частоты). После каждой пачки в Redis сохраняется
+    id последнего получателя и счетчики, а автору рассылки
+    обновляется сообщение с ходом рассылки.
+    Незавершенные рассылки продолжаются с сохраненного места
+    (resume_broadcasts): повторно сообщение может получить только
+    пачка, которая отправлялась в момент остановки.
+    Рассылку выполняет один процесс бота - тот, что взял блокировку
+    на lock_timeout. Блокировка продлевается после каждой пачки и в фоне
+    каждые lock_timeout / 3 (отправка пачки с паузами retry_after может
+    быть дольше lock_timeout). Если блокировку взял другой процесс,
+    рассылка останавливается, не сохраняя отправленную пачку.
+    """
+    batch_size = 200
+    lock_timeout = 60
+    # сколько хранится отчет о завершенной рассылке (сек.)
+    finished_timeout = 60 * 60 * 24
+
+    def __init__(self, job_id: int, text: str, chat_id: int, message_id: Optional[int] = None,
+                 last_id: int = 0, total: int = 0, sent: int = 0, failed: int = 0):
+        self.job_id = job_id
+        self.text = text
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.last_id = last_id
+        self.total = total
+        self.sent = sent
+        self.failed = failed
+
+    @staticmethod
+    def _key(job_id) -> str:
+        return f'broadcast:{job_id}'
+
+    @staticmethod
+    def _lock_key(job_id) -> str:
+        return f'broadcast:{job_id}:lock'
+
+    @classmethod
+    async def create(cls, text: str, chat_id: int, message_id: Optional[int] = None) -> 'Broadcast':
+        redis = get_async_redis(NOTIFY_REDIS_DB)
+        job = cls(
+            job_id=await redis.incr('broadcast:id'),
+            text=text,
+            chat_id=chat_id,
+            message_id=message_id,
+            total=await TeleBotID.objects.acount(),
+        )
+        await job.save()
+        await redis.sadd(ACTIVE_KEY, job.job_id)
+        return job
+
+    @classmethod
+    async def load(cls, job_id) -> Optional['Broadcast']:
+        data = await get_async_redis(NOTIFY_REDIS_DB).hgetall(cls._key(int(job_id)))
+        if not data:
+            return None
+        data = {key.decode(): value.decode() for key, value in data.items()}
+        return cls(
+            job_id=int(job_id),
+            text=data['text'],
+            chat_id=int(data['chat_id']),
+            message_id=int(data['message_id']) if data.get('message_id') else None,
+            **{field: int(data[field]) for field in ('last_id', 'total', 'sent', 'failed')},
+        )
+
+    @classmethod
+    async def active(cls) -> List['Broadcast']:
+        """Незавершенные рассылки"""
+        redis = get_async_redis(NOTIFY_REDIS_DB)
+        jobs = []
+        for job_id in await redis.smembers(ACTIVE_KEY):
+            job = await cls.load(job_id)
+            if job is None:
+                await redis.srem(ACTIVE_KEY, job_id)
+            else:
+                jobs.append(job)
+        return sorted(jobs, key=lambda job: job.job_id)
+
+    async def save(self) -> None:
+        """Сохранение текста, места остановки и счетчиков рассылки"""
+        await get_async_redis(NOTIFY_REDIS_DB).hset(self._key(self.job_id), mapping={
+            'text': self.text,
+            'chat_id': self.chat_id,
+            'message_id': self.message_id or '',
+            'last_id': self.last_id,
+            'total': self.total,
+            'sent': self.sent,
+            'failed': self.failed,
+        })
+
+    async def recipients(self):
+        """Получатели пачками: (id записи, id чата), начиная после last_id"""
+        while True:
+            batch = [
+                row async for row in TeleBotID.objects
+                .filter(pk__gt=self.last_id)
+                .order_by('pk')
+                .values_list('pk', 'telegram_id')[:self.batch_size]
+            ]
+            if not batch:
+                return
+            yield batch
+            if len(batch) < self.batch_size:
+                return
+
+    async def _extend_lock(self, token: str) -> bool:
+        """Продление блокировки, False - ее взял другой процесс"""
+        return bool(await get_async_redis(NOTIFY_REDIS_DB).eval(
+            EXTEND_LOCK_LUA, 1, self._lock_key(self.job_id), token, int(self.lock_timeout * 1000),
+        ))
+
+    async def _keep_lock(self, token: str) -> None:
+        """Продление блокировки в фоне, завершается, если она потеряна"""
+        while True:
+            await asyncio.sleep(self.lock_timeout / 3)
+            try:
+                if not await self._extend_lock(token):
+                    return
+            except RedisError:
+                logger.exception(f'Рассылка {self.job_id}: ошибка продления блокировки')
+
+    async def run(self, bot: Bot, delivery: TelegramDelivery) -> bool:
+        """Рассылка, False - ее выполняет другой процесс"""
+        redis = get_async_redis(NOTIFY_REDIS_DB)
+        lock_key = self._lock_key(self.job_id)
+        token = uuid.uuid4().hex
+        if not await redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+            return False
+
+        keeper = asyncio.create_task(self._keep_lock(token))
+        try:
+            logger.info(f'Рассылка {self.job_id}: начало с id {self.last_id}, '
+                        f'отправлено {self.sent} из {self.total}')
+            async for batch in self.recipients():
+                # текст рассылки отправляется как есть, без HTML разметки
+                report = await delivery.send_batch([chat_id for _, chat_id in batch], self.text,
+                                                   parse_mode=None)
+                if keeper.done() or not await self._extend_lock(token):
+                    # рассылку продолжает другой процесс с последнего сохраненного места
+                    logger.warning(f'Рассылка {self.job_id}: блокировка потеряна, рассылка остановлена')
+                    return False
+                self.last_id = batch[-1][0]
+                self.sent += report.sent
+                self.failed += len(report.failed)
+                # число получателей могло вырасти с начала рассылки
+                self.total = max(self.total, self.sent + self.failed)
+                await self.save()
+                await self.report(bot)
+
+            await redis.srem(ACTIVE_KEY, self.job_id)
+            await redis.expire(self._key(self.job_id), self.finished_timeout)
+        finally:
+            keeper.cancel()
+            await redis.eval(RELEASE_LOCK_LUA, 1, lock_key, token)
+
+        logger.info(f'Рассылка {self.job_id} завершена: отправлено {self.sent}, ошибок {self.failed}')
+        await self.report(bot, finished=True)
+        return True
+
+    def progress_text(self, finished: bool = False) -> str:
+        if finished:
+            return f'Рассылка завершена! Отправлено: {self.sent}, не доставлено: {self.failed}'
+        return (f'Рассылка ... {self.sent + self.failed} из {self.total} '
+                f'(не доставлено: {self.failed})')
+
+    async def report(self, bot: Bot, finished: bool = False) -> None:
+        """Ход рассылки в сообщении автору (сообщение обновляется)"""
+        text = self.progress_text(finished)
+        try:
+            if self.message_id is not None:
+                await bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id)
+            else:
+                await bot.send_message(self.chat_id, text)
+        except TelegramAPIError as e:
+            logger.info(f'Не удалось обновить ход рассылки {self.job_id}: {e}')
+
+
+def start_broadcast(job: Broadcast, bot: Bot, delivery: TelegramDelivery) -> asyncio.Task:
+    """Запуск рассылки в фоне, обработка апдейтов бота не останавливается"""
+    task = _running.get(job.job_id)
+    if task is None:
+        task = _running[job.job_id] = asyncio.create_task(job.run(bot, delivery))
+        task.add_done_callback(lambda _: _running.pop(job.job_id, None))
+    return task
+
+
+async def resume_broadcasts(bot: Bot, delivery: TelegramDelivery) -> None:
+    """
+    Продолжение рассылок, прерванных остановкой бота.
+    Проверяется раз в lock_timeout: рассылку процесса, который
+    остановился, продолжит любой работающий процесс бота.
+    """
+    while True:
+        try:
+            for job in await Broadcast.active():
+                start_broadcast(job, bot, delivery)
+        except Exception:
+            logger.exception('Ошибка при продолжении рассылок')
+        await asyncio.sleep(Broadcast.lock_timeout)
@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +9,8 @@ load_dotenv()
 @dataclass
 class TgBot:
     token: str  # Токен для доступа к телеграм-боту
+    webhook_url: Optional[str] = None  # Адрес сервера для вебхука (https://host)
+    webhook_secret: Optional[str] = None  # Секрет в заголовке запросов Telegram к вебхуку
 
 
 @dataclass
@@ -16,4 +19,8 @@ class Config:
 
 
 def load_config() -> Config:
-    return Config(tg_bot=TgBot(token=os.getenv('BOT_TOKEN')))
+    return Config(tg_bot=TgBot(
+        token=os.getenv('BOT_TOKEN'),
+        webhook_url=os.getenv('WEBHOOK_URL'),
+        webhook_secret=os.getenv('WEBHOOK_SECRET'),
+    ))
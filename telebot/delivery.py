@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramNetworkError, TelegramRetryAfter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Ограничение частоты: rate отправок в секунду, не больше capacity подряд.
+    pause останавливает выдачу (ответ Telegram с retry_after).
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # ожидающие получают токены по очереди
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        return not self._lock.locked() and (
+            self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+        )
+
+
+@dataclass
+class DeliveryReport:
+    total: int
+    sent: int = 0
+    failed: List[int] = field(default_factory=list)
+    # из failed: чаты, в которые не удалось отправить после всех повторов
+    # (сеть, 429, неизвестные ошибки) - отправку можно повторить позже
+    retryable: List[int] = field(default_factory=list)
+    retries: int = 0
+    # время доставки пачки и самого долгого сообщения в ней (сек.)
+    latency: float = 0.0
+    max_latency: float = 0.0
+
+
+class TelegramDelivery:
+    """
+    Рассылка сообщений в телеграм через один бот (и его HTTP сессию).
+    Сообщения пачки отправляются одновременно, не больше CONCURRENCY сразу,
+    с учетом ограничений Telegram: GLOBAL_RATE сообщений в секунду на бота
+    и CHAT_RATE в секунду в один чат. При ответе 429 (retry_after) отправки
+    останавливаются на указанное время и сообщение отправляется повторно,
+    не больше MAX_RETRIES раз. Настройки - settings.TELEGRAM_DELIVERY.
+    """
+    max_chat_buckets = 10000
+
+    def __init__(self, bot: Bot, **options):
+        conf = {**getattr(settings, 'TELEGRAM_DELIVERY', {}), **options}
+        self.bot = bot
+        self.concurrency = conf.get('CONCURRENCY', 10)
+        self.chat_rate = conf.get('CHAT_RATE', 1)
+        self.max_retries = conf.get('MAX_RETRIES', 3)
+
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._global_bucket = TokenBucket(conf.get('GLOBAL_RATE', 30))
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_chat_buckets:
+                # ограничения чатов, в которые давно не писали, уже не действуют
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.is_idle()
+                }
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1)
+        return bucket
+
+    async def send(self, chat_id: int, text: str, report: DeliveryReport,
+                   parse_mode: Optional[str] = 'HTML') -> None:
+        start = time.monotonic()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._chat_bucket(chat_id).acquire()
+                await self._global_bucket.acquire()
+                try:
+                    await self.bot.send_message(chat_id, text, parse_mode=parse_mode)
+                    report.sent += 1
+                    break
+                except TelegramRetryAfter as e:
+                    # flood control действует на весь бот
+                    logger.warning(f'Telegram ограничил отправку на {e.retry_after} сек.')
+                    self._global_bucket.pause(e.retry_after)
+                except TelegramNetworkError as e:
+                    logger.warning(f'Ошибка сети при отправке в чат {chat_id}: {e}')
+                    await asyncio.sleep(attempt + 1)
+                except TelegramAPIError as e:
+                    # бот заблокирован, чат не найден и т.п. - повтор не поможет
+                    logger.info(f'Сообщение в чат {chat_id} не доставлено: {e}')
+                    report.failed.append(chat_id)
+                    break
+                except Exception:
+                    logger.exception(f'Сообщение в чат {chat_id} не доставлено')
+                    report.failed.append(chat_id)
+                    report.retryable.append(chat_id)
+                    break
+                if attempt < self.max_retries:
+                    report.retries += 1
+            else:
+                report.failed.append(chat_id)
+                report.retryable.append(chat_id)
+
+        report.max_latency = max(report.max_latency, time.monotonic() - start)
+
+    async def send_batch(self, chat_ids: Iterable[int], text: str,
+                         parse_mode: Optional[str] = 'HTML') -> DeliveryReport:
+        """Отправка сообщения в несколько чатов, возвращает отчет о доставке"""
+        chat_ids = list(dict.fromkeys(chat_ids))
+        report = DeliveryReport(total=len(chat_ids))
+
+        start = time.monotonic()
+        await asyncio.gather(*(self.send(chat_id, text, report, parse_mode) for chat_id in chat_ids))
+        report.latency = time.monotonic() - start
+
+        logger.info(
+            f'Доставка в телеграм: {report.sent}/{report.total}, ошибок {len(report.failed)}, '
+            f'повторов {report.retries}, {report.latency * 1000:.0f} мс '
+            f'(самое долгое сообщение {report.max_latency * 1000:.0f} мс)'
+        )
+        return report
@@ -1,10 +1,7 @@
-import os
-import re
-
-import aiohttp
-from aiogram import Router, Bot
+from aiogram import Router
 from aiogram.types import Message
 
+from telebot.delivery import TelegramDelivery, DeliveryReport
 from telebot.utils import get_ru_msk_date, formatted_date
 from telebot.lexicon.lexicon import LEXICON_RU
 from aiogram.utils.markdown import hlink as telegram_link
@@ -14,8 +11,6 @@ from telebot.models import TeleBotID
 # Инициализируем роутер уровня модуля
 router = Router()
 
-bot = Bot(token=os.getenv('BOT_TOKEN'))
-
 
 # Этот хэндлер будет срабатывать на любые ваши сообщения,
 # кроме команд "/start" и "/help"
@@ -25,13 +20,8 @@ async def send_echo(message: Message):
     await message.delete()
 
 
-async def send_notification(users: list[int], message: str):
+async def send_notification(delivery: TelegramDelivery, users: list[int], message: str) -> DeliveryReport:
     # парсим дату время из сообщения
     message = await formatted_date(message)
-
-    for user in users:
-        # отправка сообщений внутри контекстного менеджера,
-        # для корректного закрытия соединения после отправки сообщения
-        async with aiohttp.ClientSession():
-            await bot.send_message(user, message, parse_mode="HTML")
+    return await delivery.send_batch(users, message)
 
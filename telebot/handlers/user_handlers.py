@@ -1,5 +1,4 @@
 import logging
-import time
 import sentry_sdk
 
 from aiogram import Router, F
@@ -7,9 +6,10 @@ from aiogram.filters import Command, CommandStart, CommandObject
 from aiogram.types import Message, CallbackQuery
 from aiogram.utils.deep_linking import decode_payload
 
-from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
 
+from telebot.broadcast import Broadcast, start_broadcast
+from telebot.delivery import TelegramDelivery
 from telebot.keyboards.main_menu import create_menu_keyboard
 from telebot.lexicon.lexicon import LEXICON_RU
 from telebot.models import TeleBotID
@@ -154,16 +154,18 @@ async def _delete_telegram_id_off(message):
 
 
 @router.message(Command(commands='sendall'))
-async def send_all(message: Message):
+async def send_all(message: Message, command: CommandObject, delivery: TelegramDelivery):
     """
-    Этот хэндлер срабатывает на команду sendall и рассылает сообщение
-    идущее после команды всем пользователям из таблицы TeleBotID.
+    Этот хэндлер срабатывает на команду sendall и запускает в фоне рассылку
+    сообщения, идущего после команды, всем пользователям из таблицы TeleBotID.
+    Ход рассылки обновляется в ответном сообщении.
     """
-    await message.answer('Начало рассылки ...')
-    async for telegram_id in await _give_telebot_id_all():
-        await message.bot.send_message(telegram_id['telegram_id'], message.text[message.text.find(' '):])
-        time.sleep(0.1)
-    await message.answer('Рассылка прошла успешно!')
+    if not command.args:
+        await message.answer('Укажите текст рассылки после команды')
+        return
+    progress = await message.answer('Начало рассылки ...')
+    job = await Broadcast.create(command.args, message.chat.id, progress.message_id)
+    start_broadcast(job, message.bot, delivery)
 
 
 @router.message(Command(commands='sendid'))
@@ -176,8 +178,3 @@ async def send_id(message: Message):
     await message.bot.send_message(message.text.split()[1], message.text[message.text.find(message.text.split()[2]):])
     await message.answer('Рассылка прошла успешно!')
 
-
-@sync_to_async
-def _give_telebot_id_all():
-    """ Возвращает список всех telegram_id из таблицы TeleBotID."""
-    return TeleBotID.objects.values('telegram_id')
@@ -0,0 +1,110 @@
+import asyncio
+import mmap
+import os
+import time
+from typing import AsyncIterator, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+
+def logs_conf() -> dict:
+    return {
+        'PATH': os.path.join(settings.BASE_DIR, 'telegram_bot.log'),
+        'PAGE_LINES': 200,
+        'MAX_PAGE_LINES': 1000,
+        'FOLLOW_INTERVAL': 1,
+        'FOLLOW_TIMEOUT': 60 * 5,
+        'WSGI_FOLLOW_TIMEOUT': 5,
+        **getattr(settings, 'TELEGRAM_LOGS', {}),
+    }
+
+
+def read_tail(path: str, lines: int, before: Optional[int] = None) -> Tuple[List[str], int, int]:
+    """
+    Последние lines строк файла, заканчивающиеся перед смещением before
+    (по умолчанию - конец файла). Файл отображается в память (mmap)
+    и просматривается с конца до нужного числа переносов строк, поэтому
+    читается только страница, а не весь файл.
+    Возвращает строки, смещение первой строки (before для предыдущей
+    страницы) и размер файла.
+    """
+    with open(path, 'rb') as log_file:
+        size = os.fstat(log_file.fileno()).st_size
+        end = size if before is None else min(max(before, 0), size)
+        if end == 0:
+            return [], 0, size
+
+        with mmap.mmap(log_file.fileno(), size, access=mmap.ACCESS_READ) as log_map:
+            # перенос в конце последней строки не начинает новую строку
+            start = end if log_map[end - 1:end] == b'\n' else end + 1
+            for _ in range(lines):
+                if start <= 0:
+                    break
+                start = log_map.rfind(b'\n', 0, start - 1) + 1
+            data = log_map[start:end]
+
+    return data.decode(errors='replace').splitlines(), start, size
+
+
+def _read_from(path: str, offset: int, limit: int) -> Tuple[bytes, int]:
+    """До limit байт с offset и текущий размер файла"""
+    with open(path, 'rb') as log_file:
+        size = os.fstat(log_file.fileno()).st_size
+        if size < offset:
+            return b'', size
+        log_file.seek(offset)
+        return log_file.read(min(size - offset, limit)), size
+
+
+def _next_chunk(path: str, offset: int, chunk_size: int) -> Tuple[Optional[str], int]:
+    """
+    Законченные строки, дописанные после offset, и новое смещение.
+    None - новых строк нет. Если файл стал короче (пересоздан),
+    чтение начинается с начала.
+    """
+    data, size = _read_from(path, offset, chunk_size)
+    if size < offset:
+        return None, 0
+
+    complete = data.rfind(b'\n') + 1
+    if complete == 0 and len(data) == chunk_size:
+        # строка длиннее chunk_size отдается частями
+        complete = len(data)
+    if not complete:
+        return None, offset
+    return data[:complete].decode(errors='replace'), offset + complete
+
+
+def follow_sync(path: str, offset: int, interval: float, timeout: float,
+                chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Новые строки файла после offset по мере их записи (как tail -f).
+    Читается только дописанная часть файла, незаконченная строка
+    ждет переноса. Через timeout сек. поток завершается.
+    Для WSGI: ожидание занимает поток воркера.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        text, new_offset = _next_chunk(path, offset, chunk_size)
+        if text is not None:
+            offset = new_offset
+            yield text
+        elif new_offset != offset:
+            offset = new_offset
+        else:
+            time.sleep(interval)
+
+
+async def follow(path: str, offset: int, interval: float, timeout: float,
+                 chunk_size: int = 64 * 1024) -> AsyncIterator[str]:
+    """follow_sync для ASGI: ожидание не занимает поток"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        text, new_offset = await asyncio.to_thread(_next_chunk, path, offset, chunk_size)
+        if text is not None:
+            offset = new_offset
+            yield text
+        elif new_offset != offset:
+            offset = new_offset
+        else:
+            await asyncio.sleep(interval)
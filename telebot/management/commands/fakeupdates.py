@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+from aiohttp import ClientSession
+from django.core.management.base import BaseCommand
+
+from telebot.config_data.config import load_config
+from telebot.webhook import webhook_conf
+
+
+class Command(BaseCommand):
+    help = ('Отправка поддельных апдейтов Telegram на вебхук бота (startbot --webhook) '
+            'для проверки и замера обработки без Telegram.')
+
+    def add_arguments(self, parser):
+        conf = webhook_conf()
+        parser.add_argument('--url', default=f'http://127.0.0.1:{conf["PORT"]}{conf["PATH"]}',
+                            help='Адрес вебхука')
+        parser.add_argument('--updates', type=int, default=100, help='Количество апдейтов')
+        parser.add_argument('--concurrency', type=int, default=conf['MAX_CONNECTIONS'],
+                            help='Одновременных запросов (как max_connections у Telegram)')
+        parser.add_argument('--text', default='/start', help='Текст сообщений')
+        parser.add_argument('--chats', type=int, default=10, help='Количество разных чатов')
+
+    def handle(self, *args, **options):
+        secret = load_config().tg_bot.webhook_secret
+        total, timings, statuses = asyncio.run(self.post_all(secret, **options))
+
+        timings.sort()
+        self.stdout.write(
+            f'апдейтов: {len(timings)}, {total:.3f} сек., {len(timings) / total:.1f} в сек., '
+            f'p50 {timings[len(timings) // 2] * 1000:.1f} мс, '
+            f'p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.1f} мс'
+        )
+        self.stdout.write(f'ответы: {dict(sorted(statuses.items()))}')
+
+    @staticmethod
+    def fake_update(update_id: int, chat_id: int, text: str) -> dict:
+        user = {'id': chat_id, 'is_bot': False, 'first_name': f'Fake {chat_id}'}
+        message = {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': user['first_name']},
+            'from': user,
+            'text': text,
+        }
+        if text.startswith('/'):
+            message['entities'] = [
+                {'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}
+            ]
+        return {'update_id': update_id, 'message': message}
+
+    async def post_all(self, secret, url, updates, concurrency, text, chats, **kwargs):
+        headers = {'X-Telegram-Bot-Api-Secret-Token': secret} if secret else {}
+        semaphore = asyncio.Semaphore(concurrency)
+        timings, statuses = [], {}
+
+        async def post(session, update_id):
+            update = self.fake_update(update_id, 10 ** 9 + update_id % chats, text)
+            async with semaphore:
+                start = time.perf_counter()
+                async with session.post(url, json=update, headers=headers) as response:
+                    await response.read()
+                timings.append(time.perf_counter() - start)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+
+        start = time.perf_counter()
+        async with ClientSession() as session:
+            await asyncio.gather(*(post(session, i) for i in range(1, updates + 1)))
+        return time.perf_counter() - start, timings, statuses
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from aiogram import Bot
+
+from telebot.config_data.config import Config, load_config
+from telebot.delivery import TelegramDelivery
+from telebot.handlers.other_handlers import send_notification
+from telebot.notify_queue import NotifyQueueWorker
+
+logger = logging.getLogger(__name__)
+
+logging.basicConfig(level=logging.INFO)
+
+
+class Command(BaseCommand):
+    help = ('Рассылка уведомлений из очереди Redis без обработки апдейтов бота. '
+            'Дополнительные процессы к startbot при большом потоке уведомлений.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', default=None,
+                            help='Имя процесса в группе очереди (по умолчанию хост-pid)')
+
+    def handle(self, *args, **options):
+        config: Config = load_config()
+
+        async def main():
+            bot = Bot(token=config.tg_bot.token)
+            try:
+                delivery = TelegramDelivery(bot)
+                worker = NotifyQueueWorker(partial(send_notification, delivery),
+                                           consumer=options['consumer'])
+                await worker.run()
+            finally:
+                await bot.session.close()
+
+        asyncio.run(main())
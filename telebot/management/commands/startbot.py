@@ -1,18 +1,21 @@
 import asyncio
 import json
 import logging
+from functools import partial
 
-from redis import asyncio as aioredis
-
-from django.core.management.base import BaseCommand
-from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
 from aiogram import Bot, Dispatcher
 
 from telebot.config_data.config import Config, load_config
+from telebot.broadcast import resume_broadcasts
+from telebot.delivery import TelegramDelivery
 from telebot.handlers import other_handlers, user_handlers
 from telebot.handlers.other_handlers import send_notification
 from telebot.keyboards.main_menu import set_main_menu
+from telebot.notify_queue import NOTIFY_REDIS_DB, NotifyQueueWorker, publish_notifications
+from telebot.webhook import run_webhook
+from logic.redis_client import get_async_redis
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +26,26 @@ logging.basicConfig(level=logging.INFO)
 class Command(BaseCommand):
     help = 'Just a command for launching a Telegram bot.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--webhook', action='store_true',
+                            help='Получать апдейты через вебхук (WEBHOOK_URL) вместо polling')
+
     def handle(self, *args, **kwargs):
-        async def main():
-            # Загружаем конфиг в переменную config
-            config: Config = load_config()
+        # Загружаем конфиг в переменную config
+        config: Config = load_config()
+        if kwargs['webhook'] and not config.tg_bot.webhook_url:
+            raise CommandError('Для запуска с вебхуком укажите WEBHOOK_URL')
+        if kwargs['webhook'] and not config.tg_bot.webhook_secret:
+            # без секрета апдейты на url вебхука может отправить кто угодно
+            raise CommandError('Для запуска с вебхуком укажите WEBHOOK_SECRET')
+        # один бот (и одна HTTP сессия) для обработки апдейтов и рассылки уведомлений
+        bot = Bot(token=config.tg_bot.token)
+        # уведомления и рассылки отправляются параллельно, ограничения частоты общие
+        delivery = TelegramDelivery(bot)
 
-            # Инициализируем бот и диспетчер
-            bot = Bot(token=config.tg_bot.token)
-            dp = Dispatcher()
+        async def main():
+            # Инициализируем диспетчер, delivery доступен в хэндлерах
+            dp = Dispatcher(delivery=delivery)
 
             # Регистриуем роутеры в диспетчере
             dp.include_router(user_handlers.router)
@@ -39,34 +54,48 @@ class Command(BaseCommand):
             # Настраиваем главное меню бота
             await set_main_menu(bot)
 
+            if kwargs['webhook']:
+                logger.info('Запуск телеграм бота (вебхук)')
+                await run_webhook(dp, bot, config.tg_bot.webhook_url, config.tg_bot.webhook_secret)
+                return
+
             # Пропускаем накопившиеся апдейты и запускаем polling
             await bot.delete_webhook(drop_pending_updates=True)
             logger.info('Запуск телеграм бота')
             await dp.start_polling(bot)
 
+        async def notify_queue():
+            """Рассылка уведомлений из очереди Redis"""
+            worker = NotifyQueueWorker(partial(send_notification, delivery))
+            await worker.run()
+
         async def redis_pubsub():
-            """Подписка на PubSub Redis для отслеживания уведомлений"""
-            redis = await aioredis.Redis.from_url(
-                (f'redis://{settings.REDIS_USER}:'
-                 f'{settings.REDIS_PASS}@'
-                 f'{settings.REDIS_HOST}:'
-                 f'{settings.REDIS_PORT}/3')
-            )
+            """
+            Уведомления, опубликованные в PubSub (канал notify) процессами
+            предыдущей версии, переносятся в очередь, чтобы не потерять их при обновлении
+            """
+            redis = get_async_redis(NOTIFY_REDIS_DB)
             pub = redis.pubsub()
             await pub.subscribe('notify')
             logger.info('Подписался на PubSub Redis')
+
             async for msg in pub.listen():
                 data = msg.get('data', None)
                 if type(data) is bytes:  # при первичном подключении в data будет число
                     data_dict = json.loads(data.decode())
-                    message = data_dict.get('message')
-                    users = data_dict.get('users')
-                    logger.debug(f'Получено уведомление для отправки в '
-                                 f'телеграм: {message=} | {users=}')
-                    await send_notification(users, message)
+                    await asyncio.to_thread(
+                        publish_notifications, [(data_dict.get('message'), data_dict.get('users'))]
+                    )
+
+        # бот, очередь, рассылки (/sendall), прерванные остановкой бота,
+        # и подписка на pubsub являются блокирующими процессами,
+        # поэтому запускаем все через asyncio.gather
+        tasks = [main(), notify_queue(), resume_broadcasts(bot, delivery)]
+        if not kwargs['webhook']:
+            # с вебхуком процессов бота может быть несколько,
+            # а сообщение из pubsub должно попасть в очередь один раз
+            tasks.append(redis_pubsub())
 
         loop = asyncio.get_event_loop()
-        # и бот и подписка на pubsub являются блокирующими
-        # процессами, поэтому запускаем оба через asyncio.gather
-        loop.run_until_complete(asyncio.gather(main(), redis_pubsub()))
+        loop.run_until_complete(asyncio.gather(*tasks))
         loop.close()
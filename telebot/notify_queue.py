@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from redis.exceptions import ResponseError
+
+from logic.redis_client import get_redis, get_async_redis
+from telebot.delivery import DeliveryReport
+
+logger = logging.getLogger(__name__)
+
+# база Redis для уведомлений телеграм бота
+NOTIFY_REDIS_DB = 3
+
+STREAM = 'notify:stream'
+DEAD_STREAM = 'notify:dead'
+GROUP = 'telebot'
+
+# чаты записи, в которые уведомление уже доставлено (при повторе не отправляется)
+DELIVERED_KEY = 'notify:delivered:{}'
+DELIVERED_TIMEOUT = 60 * 60 * 24
+
+Entry = Tuple[bytes, dict]
+Handler = Callable[[List[int], str], Awaitable[DeliveryReport]]
+
+
+class DeliveryIncomplete(Exception):
+    """Уведомление доставлено не во все чаты, запись остается неподтвержденной"""
+
+
+def _conf() -> dict:
+    return getattr(settings, 'TELEGRAM_QUEUE', {})
+
+
+def publish_notifications(messages: Iterable[Tuple[str, List[int]]]) -> None:
+    """
+    Запись уведомлений в очередь (поток Redis) одним конвейером.
+    messages - строка сообщения и id телеграм чатов пользователей.
+    """
+    maxlen = _conf().get('MAXLEN', 100000)
+    pipe = get_redis(NOTIFY_REDIS_DB).pipeline(transaction=False)
+    for message, users in messages:
+        if not users:
+            continue
+        pipe.xadd(STREAM, {'message': message, 'users': json.dumps(users)},
+                  maxlen=maxlen, approximate=True)
+    pipe.execute()
+
+
+class NotifyQueueWorker:
+    """
+    Обработчик очереди уведомлений (Redis Streams, группа GROUP).
+    Несколько процессов бота читают очередь одной группой, каждое
+    уведомление получает один из них. Записи читаются пачками
+    до BATCH_SIZE, обрабатываются одновременно и подтверждаются (XACK)
+    после рассылки, поэтому при перезапуске бота они не теряются:
+    неподтвержденные записи через CLAIM_IDLE_MS забирает себе любой
+    работающий процесс. Запись подтверждается, только если уведомление
+    доставлено во все чаты (кроме тех, где повтор не поможет: бот
+    заблокирован и т.п.); при повторе оно отправляется только в чаты,
+    куда еще не доставлено. Запись, которую не удалось обработать
+    MAX_DELIVERIES раз, переносится в DEAD_STREAM с недоставленными чатами.
+    Процессы, остановленные без неподтвержденных записей, удаляются
+    из группы через CLAIM_IDLE_MS.
+    Настройки - settings.TELEGRAM_QUEUE.
+    """
+
+    def __init__(self, handler: Handler, consumer: Optional[str] = None, **options):
+        conf = {**_conf(), **options}
+        self.handler = handler
+        self.consumer = consumer or f'{socket.gethostname()}-{os.getpid()}'
+        self.batch_size = conf.get('BATCH_SIZE', 50)
+        self.block_ms = conf.get('BLOCK_MS', 5000)
+        self.claim_idle_ms = conf.get('CLAIM_IDLE_MS', 60000)
+        self.max_deliveries = conf.get('MAX_DELIVERIES', 5)
+        self.dead_maxlen = conf.get('DEAD_MAXLEN', 10000)
+        self._next_claim = 0.0
+
+    @property
+    def redis(self):
+        return get_async_redis(NOTIFY_REDIS_DB)
+
+    async def ensure_group(self) -> None:
+        """Группа создается с начала потока: записи, добавленные до запуска, тоже будут отправлены"""
+        try:
+            await self.redis.xgroup_create(STREAM, GROUP, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+    async def run(self) -> None:
+        await self.ensure_group()
+        logger.info(f'Чтение очереди уведомлений {STREAM} ({self.consumer})')
+        while True:
+            try:
+                await self.claim_stale()
+                await self.read_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception('Ошибка чтения очереди уведомлений')
+                await asyncio.sleep(1)
+
+    async def read_batch(self) -> int:
+        """Чтение и обработка новых записей, возвращает их количество"""
+        response = await self.redis.xreadgroup(
+            GROUP, self.consumer, {STREAM: '>'}, count=self.batch_size, block=self.block_ms,
+        )
+        entries = response[0][1] if response else []
+        await self.process(entries)
+        return len(entries)
+
+    async def claim_stale(self, force: bool = False) -> int:
+        """
+        Перехват записей, которые давно не подтверждены (процесс упал
+        или рассылка завершилась ошибкой). Выполняется не чаще раза
+        в CLAIM_IDLE_MS / 2, возвращает количество перехваченных записей.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_claim:
+            return 0
+        self._next_claim = now + self.claim_idle_ms / 2000
+
+        claimed = 0
+        start_id = '0-0'
+        while True:
+            response = await self.redis.xautoclaim(
+                STREAM, GROUP, self.consumer, self.claim_idle_ms,
+                start_id=start_id, count=self.batch_size,
+            )
+            start_id, entries = response[0], response[1]
+            # записи, удаленные из потока (MAXLEN), возвращаются без данных
+            entries = [entry for entry in entries if entry[1]]
+            claimed += len(entries)
+            await self.process(await self.drop_dead(entries))
+            if start_id in (b'0-0', '0-0'):
+                break
+
+        await self.prune_consumers()
+        return claimed
+
+    async def drop_dead(self, entries: List[Entry]) -> List[Entry]:
+        """Перенос записей, превысивших MAX_DELIVERIES, в DEAD_STREAM"""
+        if not entries:
+            return entries
+
+        # XAUTOCLAIM только что передал записи этому процессу: записи других
+        # процессов из того же диапазона id не должны вытеснить их из ответа
+        pending = await self.redis.xpending_range(
+            STREAM, GROUP, min=entries[0][0], max=entries[-1][0], count=len(entries),
+            consumername=self.consumer,
+        )
+        deliveries = {item['message_id']: item['times_delivered'] for item in pending}
+
+        alive, dead = [], []
+        for entry in entries:
+            (dead if deliveries.get(entry[0], 0) > self.max_deliveries else alive).append(entry)
+
+        if dead:
+            remaining = [await self.remaining_users(entry_id, fields) for entry_id, fields in dead]
+            pipe = self.redis.pipeline(transaction=True)
+            for (entry_id, fields), users in zip(dead, remaining):
+                pipe.xadd(DEAD_STREAM, {**fields, 'users': json.dumps(users), 'entry_id': entry_id},
+                          maxlen=self.dead_maxlen, approximate=True)
+                pipe.delete(DELIVERED_KEY.format(entry_id.decode()))
+            pipe.xack(STREAM, GROUP, *(entry_id for entry_id, _ in dead))
+            await pipe.execute()
+            logger.error(f'Уведомления перенесены в {DEAD_STREAM}: {len(dead)}')
+        return alive
+
+    async def prune_consumers(self) -> int:
+        """
+        Удаление из группы процессов без неподтвержденных записей,
+        которые не читали очередь дольше CLAIM_IDLE_MS (остановлены:
+        имя процесса содержит pid и после перезапуска меняется)
+        """
+        pruned = 0
+        for consumer in await self.redis.xinfo_consumers(STREAM, GROUP):
+            name = consumer['name']
+            name = name.decode() if isinstance(name, bytes) else name
+            if name != self.consumer and not consumer['pending'] and consumer['idle'] > self.claim_idle_ms:
+                await self.redis.xgroup_delconsumer(STREAM, GROUP, name)
+                pruned += 1
+        return pruned
+
+    async def process(self, entries: List[Entry]) -> None:
+        """Одновременная обработка записей, подтверждаются успешно обработанные"""
+        if not entries:
+            return
+
+        results = await asyncio.gather(
+            *(self.handle(entry_id, fields) for entry_id, fields in entries), return_exceptions=True,
+        )
+        done = []
+        for (entry_id, _), result in zip(entries, results):
+            if isinstance(result, BaseException):
+                logger.error(f'Уведомление {entry_id} не обработано: {result!r}')
+            else:
+                done.append(entry_id)
+        if done:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.xack(STREAM, GROUP, *done)
+            pipe.delete(*(DELIVERED_KEY.format(entry_id.decode()) for entry_id in done))
+            await pipe.execute()
+
+    async def remaining_users(self, entry_id: bytes, fields: dict) -> List[int]:
+        """Чаты записи, в которые уведомление еще не доставлено"""
+        users = json.loads(fields[b'users'])
+        delivered = {int(chat_id) for chat_id in
+                     await self.redis.smembers(DELIVERED_KEY.format(entry_id.decode()))}
+        return [chat_id for chat_id in users if chat_id not in delivered]
+
+    async def handle(self, entry_id: bytes, fields: dict) -> DeliveryReport:
+        message = fields[b'message'].decode()
+        users = await self.remaining_users(entry_id, fields)
+        logger.debug(f'Получено уведомление для отправки в телеграм: {message=} | {users=}')
+        report = await self.handler(users, message)
+
+        if report.retryable:
+            # доставленные чаты запоминаются, чтобы при повторе не отправить дважды
+            delivered = set(users) - set(report.retryable)
+            if delivered:
+                key = DELIVERED_KEY.format(entry_id.decode())
+                pipe = self.redis.pipeline(transaction=True)
+                pipe.sadd(key, *delivered)
+                pipe.expire(key, DELIVERED_TIMEOUT)
+                await pipe.execute()
+            raise DeliveryIncomplete(f'не доставлено в чаты: {report.retryable}')
+        return report
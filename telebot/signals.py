@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from logic.telegram_chats import telegram_chats
+from telebot.models import TeleBotID
+
+
+@receiver(post_save, sender=TeleBotID)
+def update_telegram_chat(sender, instance, **kwargs):
+    telegram_chats.update(instance.user_id, instance.telegram_id)
+
+
+@receiver(post_delete, sender=TeleBotID)
+def forget_telegram_chat(sender, instance, **kwargs):
+    telegram_chats.update(instance.user_id, None)
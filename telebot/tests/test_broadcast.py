@@ -0,0 +1,119 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from logic.redis_client import get_redis
+from telebot.broadcast import ACTIVE_KEY, Broadcast
+from telebot.delivery import TelegramDelivery
+from telebot.models import TeleBotID
+from telebot.notify_queue import NOTIFY_REDIS_DB
+from telebot.tests.test_delivery import FakeBot
+
+User = get_user_model()
+
+
+class ProgressBot(FakeBot):
+    """Бот, записывающий и обновления хода рассылки"""
+
+    def __init__(self, **kwargs):
+        super().__init__(delay=0, **kwargs)
+        self.progress = []
+
+    async def edit_message_text(self, text, chat_id, message_id, **kwargs):
+        self.progress.append(text)
+
+
+class TakeoverBot(ProgressBot):
+    """Бот, при отправке которого блокировку рассылки берет другой процесс"""
+
+    def __init__(self, redis, lock_key, **kwargs):
+        super().__init__(**kwargs)
+        self.redis = redis
+        self.lock_key = lock_key
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.redis.set(self.lock_key, 'other', ex=10)
+        await super().send_message(chat_id, text, **kwargs)
+
+
+class BroadcastTestCase(TestCase):
+    def setUp(self):
+        self.redis = get_redis(NOTIFY_REDIS_DB)
+        for i in range(5):
+            user = User.objects.create_user(email=f'broadcast{i}@example.com', password='Pass!1234')
+            TeleBotID.objects.create(user=user, telegram_id=1000 + i, name=f'user{i}')
+        self.bot = ProgressBot()
+        self.delivery = TelegramDelivery(self.bot, GLOBAL_RATE=1000)
+
+    def create(self) -> Broadcast:
+        job = async_to_sync(Broadcast.create)('всем привет', chat_id=1, message_id=10)
+        job.batch_size = 2
+        self.addCleanup(self.redis.delete, Broadcast._key(job.job_id))
+        self.addCleanup(self.redis.srem, ACTIVE_KEY, job.job_id)
+        return job
+
+    def sent_chats(self):
+        return sorted(chat_id for chat_id, _ in self.bot.sent)
+
+    def test_broadcast(self):
+        job = self.create()
+        self.assertIn(str(job.job_id).encode(), self.redis.smembers(ACTIVE_KEY))
+
+        async_to_sync(job.run)(self.bot, self.delivery)
+
+        self.assertEqual(self.sent_chats(), [1000, 1001, 1002, 1003, 1004])
+        self.assertEqual((job.total, job.sent, job.failed), (5, 5, 0))
+        # ход рассылки после каждой пачки и итог
+        self.assertEqual(len(self.bot.progress), 4)
+        self.assertTrue(self.bot.progress[-1].startswith('Рассылка завершена'))
+        self.assertNotIn(str(job.job_id).encode(), self.redis.smembers(ACTIVE_KEY))
+
+    def test_resume_from_checkpoint(self):
+        """После остановки рассылка продолжается с сохраненного места"""
+        job = self.create()
+        ids = list(TeleBotID.objects.order_by('pk').values_list('pk', flat=True))
+        job.last_id, job.sent = ids[2], 3
+        async_to_sync(job.save)()
+
+        jobs = async_to_sync(Broadcast.active)()
+        resumed = next(item for item in jobs if item.job_id == job.job_id)
+        self.assertEqual((resumed.last_id, resumed.sent, resumed.text), (ids[2], 3, 'всем привет'))
+
+        resumed.batch_size = 2
+        async_to_sync(resumed.run)(self.bot, self.delivery)
+        self.assertEqual(self.sent_chats(), [1003, 1004])
+        self.assertEqual(resumed.sent, 5)
+
+    def test_single_runner(self):
+        """Рассылку выполняет только процесс, взявший блокировку"""
+        job = self.create()
+        self.redis.set(Broadcast._lock_key(job.job_id), 1, ex=10)
+        self.addCleanup(self.redis.delete, Broadcast._lock_key(job.job_id))
+
+        self.assertFalse(async_to_sync(job.run)(self.bot, self.delivery))
+        self.assertEqual(self.bot.sent, [])
+        self.assertIn(str(job.job_id).encode(), self.redis.smembers(ACTIVE_KEY))
+
+    def test_lock_lost(self):
+        """Рассылка останавливается, если блокировку взял другой процесс"""
+        job = self.create()
+        lock_key = Broadcast._lock_key(job.job_id)
+        self.addCleanup(self.redis.delete, lock_key)
+        bot = TakeoverBot(self.redis, lock_key)
+
+        self.assertFalse(async_to_sync(job.run)(bot, TelegramDelivery(bot, GLOBAL_RATE=1000)))
+        # отправленная пачка не сохранена, чужая блокировка не снята
+        self.assertEqual((job.last_id, job.sent), (0, 0))
+        self.assertEqual(async_to_sync(Broadcast.load)(job.job_id).last_id, 0)
+        self.assertEqual(self.redis.get(lock_key), b'other')
+        self.assertIn(str(job.job_id).encode(), self.redis.smembers(ACTIVE_KEY))
+
+    def test_lock_kept_during_long_batch(self):
+        """Пока пачка отправляется дольше lock_timeout, блокировка продлевается в фоне"""
+        job = self.create()
+        job.lock_timeout = 0.2
+        self.bot.delay = 0.3
+
+        self.assertTrue(async_to_sync(job.run)(self.bot, self.delivery))
+        self.assertEqual(job.sent, 5)
+        self.assertIsNone(self.redis.get(Broadcast._lock_key(job.job_id)))
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from telebot.delivery import TelegramDelivery, TokenBucket
+
+
+class FakeBot:
+    """Бот, записывающий отправленные сообщения"""
+
+    def __init__(self, errors=None, delay=0.01):
+        self.errors = errors or {}
+        self.delay = delay
+        self.sent = []
+        self.active = 0
+        self.max_active = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            error = self.errors.get(chat_id)
+            if error:
+                raise error.pop(0)
+            self.sent.append((chat_id, time.monotonic()))
+        finally:
+            self.active -= 1
+
+
+class TelegramDeliveryTestCase(SimpleTestCase):
+    def test_concurrent_send(self):
+        bot = FakeBot()
+        delivery = TelegramDelivery(bot, CONCURRENCY=5, GLOBAL_RATE=1000)
+        report = async_to_sync(delivery.send_batch)(range(30), 'text')
+
+        self.assertEquals((30, 30, []), (report.total, report.sent, report.failed))
+        self.assertEquals(5, bot.max_active)
+        # отправка параллельная: быстрее 30 последовательных запросов
+        self.assertLess(report.latency, 30 * bot.delay)
+
+    def test_retry_after(self):
+        method = SendMessage(chat_id=1, text='text')
+        bot = FakeBot(errors={
+            1: [TelegramRetryAfter(method=method, message='Flood control', retry_after=0)],
+            2: [TelegramForbiddenError(method=method, message='Forbidden: bot was blocked by the user')],
+        })
+        report = async_to_sync(TelegramDelivery(bot, CHAT_RATE=100).send_batch)([1, 2, 3], 'text')
+
+        self.assertEquals(2, report.sent)
+        self.assertEquals(1, report.retries)
+        self.assertEquals([2], report.failed)
+
+    def test_chat_rate(self):
+        bot = FakeBot(delay=0)
+        delivery = TelegramDelivery(bot, CHAT_RATE=10, GLOBAL_RATE=1000)
+
+        async def send_twice():
+            await delivery.send_batch([1], 'first')
+            await delivery.send_batch([1], 'second')
+
+        async_to_sync(send_twice)()
+        # второе сообщение в тот же чат не раньше, чем через 1 / CHAT_RATE
+        self.assertGreaterEqual(bot.sent[1][1] - bot.sent[0][1], 0.09)
+
+    def test_token_bucket_pause(self):
+        async def acquire_after_pause():
+            bucket = TokenBucket(rate=1000)
+            bucket.pause(0.05)
+            start = time.monotonic()
+            await bucket.acquire()
+            return time.monotonic() - start
+
+        self.assertGreaterEqual(async_to_sync(acquire_after_pause)(), 0.04)
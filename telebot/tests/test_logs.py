@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+
+from telebot.logs import follow, follow_sync, read_tail
+
+User = get_user_model()
+
+
+def write_log() -> str:
+    log_file = tempfile.NamedTemporaryFile('w', suffix='.log', delete=False)
+    log_file.write(''.join(f'line {i}\n' for i in range(1, 11)))
+    log_file.close()
+    return log_file.name
+
+
+class LogTailTestCase(SimpleTestCase):
+    def setUp(self):
+        self.path = write_log()
+        self.addCleanup(os.remove, self.path)
+
+    def test_read_tail(self):
+        lines, start, size = read_tail(self.path, 3)
+        self.assertEqual(lines, ['line 8', 'line 9', 'line 10'])
+        self.assertEqual(size, os.path.getsize(self.path))
+
+        # предыдущие страницы до начала файла
+        lines, start, _ = read_tail(self.path, 3, before=start)
+        self.assertEqual(lines, ['line 5', 'line 6', 'line 7'])
+        lines, start, _ = read_tail(self.path, 10, before=start)
+        self.assertEqual(lines, ['line 1', 'line 2', 'line 3', 'line 4'])
+        self.assertEqual(start, 0)
+
+    def test_last_line_without_newline(self):
+        with open(self.path, 'a') as log_file:
+            log_file.write('partial')
+        lines, _, _ = read_tail(self.path, 2)
+        self.assertEqual(lines, ['line 10', 'partial'])
+
+    def test_empty_file(self):
+        open(self.path, 'w').close()
+        self.assertEqual(read_tail(self.path, 5), ([], 0, 0))
+
+    def test_follow(self):
+        offset = os.path.getsize(self.path)
+        with open(self.path, 'a') as log_file:
+            log_file.write('new 1\nnew 2\nnot finished')
+
+        async def collect():
+            return [chunk async for chunk in follow(self.path, offset, interval=0.01, timeout=0.1)]
+
+        self.assertEqual(''.join(async_to_sync(collect)()), 'new 1\nnew 2\n')
+        self.assertEqual(''.join(follow_sync(self.path, offset, interval=0.01, timeout=0.1)),
+                         'new 1\nnew 2\n')
+
+
+class LogViewTestCase(TestCase):
+    def setUp(self):
+        self.path = write_log()
+        self.addCleanup(os.remove, self.path)
+        self.staff = User.objects.create_user(email='staff@example.com', password='Pass!234',
+                                              is_active=True, is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_view(self):
+        with override_settings(TELEGRAM_LOGS={'PATH': self.path, 'PAGE_LINES': 2}):
+            response = self.client.get('/log/telebot/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['log_lines'], ['line 9', 'line 10'])
+
+            response = self.client.get('/log/telebot/', {'before': response.context['start']})
+            self.assertEqual(response.context['log_lines'], ['line 7', 'line 8'])
+
+            self.assertEqual(self.client.get('/log/telebot/', {'lines': 'all'}).status_code, 400)
+
+        with override_settings(TELEGRAM_LOGS={'PATH': self.path + '.missing'}):
+            self.assertEqual(self.client.get('/log/telebot/').status_code, 404)
+
+    def test_view_follow(self):
+        client = AsyncClient()
+        client.force_login(self.staff)
+
+        async def get():
+            response = await client.get('/log/telebot/', {'follow': 1, 'after': 0})
+            return response, b''.join([chunk async for chunk in response])
+
+        conf = {'PATH': self.path, 'FOLLOW_INTERVAL': 0.01, 'FOLLOW_TIMEOUT': 0.1}
+        with override_settings(TELEGRAM_LOGS=conf):
+            response, content = async_to_sync(get)()
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(content.decode().splitlines(), [f'line {i}' for i in range(1, 11)])
+
+    def test_view_follow_wsgi(self):
+        """Под WSGI строки отдаются синхронным генератором по мере чтения"""
+        conf = {'PATH': self.path, 'FOLLOW_INTERVAL': 0.01, 'FOLLOW_TIMEOUT': 0.1}
+        with override_settings(TELEGRAM_LOGS=conf):
+            response = self.client.get('/log/telebot/', {'follow': 1, 'after': 0})
+            self.assertFalse(response.is_async)
+            # первая порция приходит сразу, не дожидаясь FOLLOW_TIMEOUT
+            first = next(iter(response.streaming_content))
+        self.assertEqual(first.decode().splitlines(), [f'line {i}' for i in range(1, 11)])
+
+    def test_view_follow_wsgi_timeout(self):
+        """Под WSGI поток закрывается через WSGI_FOLLOW_TIMEOUT, а не FOLLOW_TIMEOUT"""
+        conf = {'PATH': self.path, 'FOLLOW_INTERVAL': 0.01, 'FOLLOW_TIMEOUT': 300, 'WSGI_FOLLOW_TIMEOUT': 0.1}
+        with override_settings(TELEGRAM_LOGS=conf):
+            started = time.monotonic()
+            response = self.client.get('/log/telebot/', {'follow': 1})
+            self.assertEqual(b''.join(response.streaming_content), b'')
+        self.assertLess(time.monotonic() - started, 5)
+
+    def test_view_staff_only(self):
+        user = User.objects.create_user(email='user@example.com', password='Pass!234', is_active=True)
+        with override_settings(TELEGRAM_LOGS={'PATH': self.path}):
+            self.client.logout()
+            self.assertEqual(self.client.get('/log/telebot/', {'follow': 1}).status_code, 302)
+            self.client.force_login(user)
+            self.assertEqual(self.client.get('/log/telebot/').status_code, 302)
@@ -0,0 +1,151 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from logic.redis_client import get_redis
+from telebot.delivery import DeliveryReport
+from telebot.notify_queue import (
+    DEAD_STREAM, DELIVERED_KEY, GROUP, NOTIFY_REDIS_DB, STREAM, NotifyQueueWorker,
+    publish_notifications,
+)
+
+
+class NotifyQueueTestCase(SimpleTestCase):
+    def setUp(self):
+        self.redis = get_redis(NOTIFY_REDIS_DB)
+        self.redis.delete(STREAM, DEAD_STREAM)
+        self.addCleanup(self.redis.delete, STREAM, DEAD_STREAM)
+        self.received = []
+
+    async def handler(self, users, message):
+        self.received.append((message, users))
+        return DeliveryReport(total=len(users), sent=len(users))
+
+    async def failing_handler(self, users, message):
+        raise RuntimeError('telegram недоступен')
+
+    def worker(self, handler=None, consumer='test', **options):
+        options.setdefault('BLOCK_MS', 10)
+        return NotifyQueueWorker(handler or self.handler, consumer=consumer, **options)
+
+    def pending(self) -> int:
+        return self.redis.xpending(STREAM, GROUP)['pending']
+
+    def test_publish_and_ack(self):
+        worker = self.worker(BATCH_SIZE=2)
+        async_to_sync(worker.ensure_group)()
+        publish_notifications([('первое', [1, 2]), ('пустое', []), ('второе', [3]), ('третье', [4])])
+
+        self.assertEqual(self.redis.xlen(STREAM), 3)
+        self.assertEqual(async_to_sync(worker.read_batch)(), 2)
+        self.assertEqual(async_to_sync(worker.read_batch)(), 1)
+        self.assertEqual(async_to_sync(worker.read_batch)(), 0)
+        self.assertEqual(self.received, [('первое', [1, 2]), ('второе', [3]), ('третье', [4])])
+        self.assertEqual(self.pending(), 0)
+
+    def test_published_before_start(self):
+        """Уведомления, записанные до запуска бота, не теряются"""
+        publish_notifications([('до запуска', [1])])
+        worker = self.worker()
+        async_to_sync(worker.ensure_group)()
+        async_to_sync(worker.read_batch)()
+        self.assertEqual(self.received, [('до запуска', [1])])
+
+    def test_consumers_share_group(self):
+        first, second = self.worker(consumer='first', BATCH_SIZE=1), self.worker(consumer='second')
+        async_to_sync(first.ensure_group)()
+        async_to_sync(second.ensure_group)()
+        publish_notifications([(str(i), [i]) for i in range(5)])
+
+        self.assertEqual(async_to_sync(first.read_batch)(), 1)
+        self.assertEqual(async_to_sync(second.read_batch)(), 4)
+        self.assertEqual(sorted(message for message, _ in self.received), ['0', '1', '2', '3', '4'])
+
+    def test_failed_entry_reclaimed(self):
+        """Неподтвержденная запись забирается другим процессом"""
+        crashed = self.worker(self.failing_handler, consumer='crashed')
+        async_to_sync(crashed.ensure_group)()
+        publish_notifications([('повтор', [1])])
+        async_to_sync(crashed.read_batch)()
+        self.assertEqual(self.pending(), 1)
+
+        worker = self.worker(CLAIM_IDLE_MS=0)
+        self.assertEqual(async_to_sync(worker.claim_stale)(force=True), 1)
+        self.assertEqual(self.received, [('повтор', [1])])
+        self.assertEqual(self.pending(), 0)
+
+    def test_dead_letter(self):
+        worker = self.worker(self.failing_handler, CLAIM_IDLE_MS=0, MAX_DELIVERIES=2)
+        async_to_sync(worker.ensure_group)()
+        publish_notifications([('ошибка', [1])])
+        async_to_sync(worker.read_batch)()
+        for _ in range(3):
+            async_to_sync(worker.claim_stale)(force=True)
+
+        self.assertEqual(self.pending(), 0)
+        dead = self.redis.xrange(DEAD_STREAM)
+        self.assertEqual(len(dead), 1)
+        self.assertEqual(dead[0][1][b'message'].decode(), 'ошибка')
+
+    def test_dead_letter_other_consumers_pending(self):
+        """Неподтвержденные записи других процессов не мешают подсчету повторов"""
+        crashed = self.worker(self.failing_handler, consumer='crashed')
+        async_to_sync(crashed.ensure_group)()
+        publish_notifications([(str(i), [1]) for i in range(3)])
+        async_to_sync(crashed.read_batch)()
+        time.sleep(0.1)
+        # средняя запись недавно передана другому работающему процессу
+        middle = self.redis.xrange(STREAM)[1][0]
+        self.redis.xclaim(STREAM, GROUP, 'other', 0, [middle])
+
+        worker = self.worker(self.failing_handler, CLAIM_IDLE_MS=50, MAX_DELIVERIES=1)
+        self.assertEqual(async_to_sync(worker.claim_stale)(force=True), 2)
+        dead = self.redis.xrange(DEAD_STREAM)
+        self.assertEqual(sorted(fields[b'message'] for _, fields in dead), [b'0', b'2'])
+
+    def test_partial_delivery_retried(self):
+        """Запись с недоставленными чатами не подтверждается, повтор - только в эти чаты"""
+        unreachable = {2}
+
+        async def handler(users, message):
+            self.received.append((message, users))
+            failed = [chat_id for chat_id in users if chat_id in unreachable]
+            return DeliveryReport(total=len(users), sent=len(users) - len(failed),
+                                  failed=failed, retryable=failed)
+
+        worker = self.worker(handler, CLAIM_IDLE_MS=0, MAX_DELIVERIES=2)
+        async_to_sync(worker.ensure_group)()
+        publish_notifications([('частично', [1, 2, 3])])
+        async_to_sync(worker.read_batch)()
+        self.assertEqual(self.pending(), 1)
+
+        async_to_sync(worker.claim_stale)(force=True)
+        self.assertEqual(self.received, [('частично', [1, 2, 3]), ('частично', [2])])
+        self.assertEqual(self.pending(), 1)
+
+        # после MAX_DELIVERIES запись уходит в notify:dead с недоставленными чатами
+        async_to_sync(worker.claim_stale)(force=True)
+        self.assertEqual(self.pending(), 0)
+        dead = self.redis.xrange(DEAD_STREAM)
+        self.assertEqual(dead[0][1][b'users'], b'[2]')
+        self.assertEqual(self.redis.keys(DELIVERED_KEY.format('*')), [])
+
+        unreachable.clear()
+        publish_notifications([('снова', [2])])
+        async_to_sync(worker.read_batch)()
+        self.assertEqual(self.pending(), 0)
+
+    def test_stopped_consumers_pruned(self):
+        stopped = self.worker(consumer='stopped')
+        async_to_sync(stopped.ensure_group)()
+        publish_notifications([('одно', [1])])
+        async_to_sync(stopped.read_batch)()
+
+        worker = self.worker(CLAIM_IDLE_MS=0)
+        publish_notifications([('второе', [2])])
+        async_to_sync(worker.read_batch)()
+        # у остановленного процесса нет неподтвержденных записей, он удаляется из группы
+        async_to_sync(worker.claim_stale)(force=True)
+        names = [consumer['name'] for consumer in self.redis.xinfo_consumers(STREAM, GROUP)]
+        self.assertEqual(names, [b'test'])
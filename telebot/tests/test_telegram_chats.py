@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from logic.telegram_chats import CHATS_KEY, telegram_chats
+from notification.create_notify.utils import get_telegram_id
+from telebot.models import TeleBotID
+
+User = get_user_model()
+
+
+class TelegramChatCacheTestCase(TestCase):
+    def setUp(self):
+        telegram_chats.redis.delete(CHATS_KEY)
+        telegram_chats._local.clear()
+        self.addCleanup(telegram_chats.redis.delete, CHATS_KEY)
+        self.users = [
+            User.objects.create_user(email=f'chats{i}@example.com', password='Pass!1234')
+            for i in range(3)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            TeleBotID.objects.create(user=self.users[0], telegram_id=100, name='first')
+        self.ids = [user.id for user in self.users]
+
+    def test_no_queries_when_cached(self):
+        self.assertEqual(get_telegram_id(self.ids), {self.ids[0]: 100})
+
+        # пользователи без телеграма тоже в кэше
+        telegram_chats._local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_telegram_id(self.ids), {self.ids[0]: 100})
+        self.assertGreater(telegram_chats.redis.ttl(CHATS_KEY), 0)
+
+    def test_connect_and_disconnect(self):
+        get_telegram_id(self.ids)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TeleBotID.objects.create(user=self.users[1], telegram_id=200, name='second')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_telegram_id(self.ids), {self.ids[0]: 100, self.ids[1]: 200})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TeleBotID.objects.filter(user=self.users[0]).delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_telegram_id(self.ids), {self.ids[1]: 200})
+
+    def test_uncommitted_change_read_from_db(self):
+        """До фиксации транзакции запись сброшена и читается из БД"""
+        get_telegram_id(self.ids)
+        TeleBotID.objects.create(user=self.users[2], telegram_id=300, name='third')
+        self.assertEqual(get_telegram_id([self.ids[2]]), {self.ids[2]: 300})
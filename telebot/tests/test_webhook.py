@@ -0,0 +1,63 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from telebot.management.commands.fakeupdates import Command as FakeUpdates
+from telebot.webhook import create_webhook_app
+
+PATH = '/telegram/webhook/'
+SECRET = 'webhook-secret'
+
+
+class WebhookTestCase(SimpleTestCase):
+    def setUp(self):
+        self.received = []
+        self.active = 0
+        self.max_active = 0
+
+        router = Router()
+
+        @router.message()
+        async def handler(message: Message):
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            await asyncio.sleep(0.02)
+            self.received.append((message.chat.id, message.text))
+            self.active -= 1
+
+        self.dp = Dispatcher()
+        self.dp.include_router(router)
+        self.bot = Bot(token='42:TEST')
+
+    def post(self, updates, secret=SECRET, concurrency=2):
+        async def run():
+            app = create_webhook_app(self.dp, self.bot, SECRET, PATH=PATH, CONCURRENCY=concurrency)
+            async with TestClient(TestServer(app)) as client:
+                responses = await asyncio.gather(*(
+                    client.post(PATH, json=update, headers={'X-Telegram-Bot-Api-Secret-Token': secret})
+                    for update in updates
+                ))
+                return [response.status for response in responses]
+
+        return async_to_sync(run)()
+
+    def test_updates_dispatched(self):
+        updates = [FakeUpdates.fake_update(i, 100 + i, f'text {i}') for i in range(1, 6)]
+        self.assertEqual(self.post(updates), [200] * 5)
+        self.assertEqual(sorted(self.received), [(100 + i, f'text {i}') for i in range(1, 6)])
+        # апдейты обрабатываются одновременно, но не больше CONCURRENCY
+        self.assertEqual(self.max_active, 2)
+
+    def test_wrong_secret(self):
+        statuses = self.post([FakeUpdates.fake_update(1, 100, 'text')], secret='wrong')
+        self.assertEqual(statuses, [401])
+        self.assertEqual(self.received, [])
+
+    def test_secret_required(self):
+        for secret in (None, ''):
+            with self.assertRaises(ValueError):
+                create_webhook_app(self.dp, self.bot, secret, PATH=PATH)
@@ -1,9 +1,62 @@
+import os
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render
 
+from telebot.logs import follow, follow_sync, logs_conf, read_tail
+
+
+def _int_param(request, name: str, default=None):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        return default
+    return int(value)
+
 
+@staff_member_required
 def view_logs(request):
-    # Чтение содержимого файла логов
-    with open('telegram_bot.log', 'r') as log_file:
-        log_lines = log_file.readlines()
-    # Передача содержимого файла логов в шаблон
-    return render(request, 'logs.html', {'log_lines': log_lines})
+    """
+    Последние строки лога бота (только для персонала).
+    ?lines=N - количество строк, ?before=<смещение> - строки перед смещением
+    (предыдущая страница), ?follow=1&after=<смещение> - новые строки лога
+    потоком по мере записи (с конца файла, если смещение не указано).
+    Под ASGI поток - асинхронный генератор на FOLLOW_TIMEOUT, под WSGI -
+    синхронный, он занимает воркер и закрывается через WSGI_FOLLOW_TIMEOUT.
+    """
+    conf = logs_conf()
+    path = conf['PATH']
+    if not os.path.exists(path):
+        raise Http404('Файл логов не найден')
+
+    try:
+        lines = min(_int_param(request, 'lines', conf['PAGE_LINES']), conf['MAX_PAGE_LINES'])
+        before = _int_param(request, 'before')
+        after = _int_param(request, 'after')
+    except ValueError:
+        return HttpResponseBadRequest('Параметры lines, before и after должны быть числами')
+
+    if request.GET.get('follow'):
+        if after is None:
+            after = os.path.getsize(path)
+        # WSGI собирает асинхронный итератор целиком, прежде чем отправить
+        if isinstance(request, ASGIRequest):
+            stream, timeout = follow, conf['FOLLOW_TIMEOUT']
+        else:
+            stream, timeout = follow_sync, min(conf['FOLLOW_TIMEOUT'], conf['WSGI_FOLLOW_TIMEOUT'])
+        response = StreamingHttpResponse(
+            stream(path, after, conf['FOLLOW_INTERVAL'], timeout),
+            content_type='text/plain; charset=utf-8',
+        )
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    # Передача страницы лога в шаблон
+    log_lines, start, size = read_tail(path, max(lines, 1), before)
+    return render(request, 'logs.html', {
+        'log_lines': log_lines,
+        'lines': lines,
+        'start': start,
+        'size': size,
+    })
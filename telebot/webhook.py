@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.types import TelegramObject
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """Не больше limit апдейтов обрабатываются процессом одновременно"""
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self.semaphore:
+            return await handler(event, data)
+
+
+def webhook_conf() -> dict:
+    return {
+        'PATH': '/telegram/webhook/',
+        'HOST': '0.0.0.0',
+        'PORT': 8081,
+        'CONCURRENCY': 20,
+        'MAX_CONNECTIONS': 40,
+        **getattr(settings, 'TELEGRAM_WEBHOOK', {}),
+    }
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, secret: str, **options) -> web.Application:
+    """
+    Приложение aiohttp, передающее апдейты из вебхука в диспетчер.
+    Ответ Telegram отправляется после обработки апдейта: если процесс
+    упадет, не ответив, Telegram отправит апдейт повторно.
+    Запросы без секрета (заголовок X-Telegram-Bot-Api-Secret-Token)
+    отклоняются: иначе любой, кто знает url, мог бы отправить апдейт
+    от имени администратора (например, /sendall).
+    """
+    if not secret:
+        raise ValueError('Для вебхука обязателен секрет (WEBHOOK_SECRET)')
+    conf = {**webhook_conf(), **options}
+    dp.update.outer_middleware(ConcurrencyLimitMiddleware(conf['CONCURRENCY']))
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp, bot=bot, handle_in_background=False, secret_token=secret,
+    ).register(app, path=conf['PATH'])
+    app.router.add_get('/health/', health)
+    return app
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.Response(text='ok')
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, url: str, secret: str, **options) -> None:
+    """
+    Запуск сервера вебхука и регистрация url в Telegram.
+    Процессов с вебхуком может быть несколько за балансировщиком:
+    Telegram отправляет на url до MAX_CONNECTIONS запросов одновременно,
+    каждый процесс обрабатывает до CONCURRENCY апдейтов.
+    Настройки - settings.TELEGRAM_WEBHOOK.
+    """
+    conf = {**webhook_conf(), **options}
+    app = create_webhook_app(dp, bot, secret, **conf)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=conf['HOST'], port=conf['PORT'])
+    await site.start()
+    logger.info(f'Вебхук телеграм бота: {conf["HOST"]}:{conf["PORT"]}{conf["PATH"]}')
+
+    try:
+        await bot.set_webhook(
+            url=url.rstrip('/') + conf['PATH'],
+            secret_token=secret,
+            max_connections=conf['MAX_CONNECTIONS'],
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        # сервер работает, пока процесс не остановят
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
@@ -1,5 +1,6 @@
 from django.db.models import Prefetch
 
+from logic.indexing import index_recalculation
 from workspaces.models import Column, Task, Sticker, Comment
 
 
@@ -8,11 +9,11 @@ def get_board(queryset):
                 .prefetch_related('members')
                 .prefetch_related(
                     Prefetch('column_board',
-                             queryset=Column.objects.order_by('index'),
+                             queryset=Column.objects.order_by(*index_recalculation().ordering),
                              ))
                 .prefetch_related(
                     Prefetch('column_board__task',
-                             queryset=Task.objects.order_by('index'),
+                             queryset=Task.objects.order_by(*index_recalculation().ordering),
                              ))
                 .prefetch_related('column_board__task__responsible')
                 .prefetch_related(
@@ -0,0 +1,54 @@
+import time
+
+from channels_redis.core import RedisChannelLayer
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from logic.redis_layer import CustomRedisChannelLayer
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает подготовку сообщения группы к отправке: исходный слой '
+            '(сериализация и шифрование на каждого получателя) и текущий '
+            '(один раз на сообщение). Redis не используется.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', nargs='+', type=int, default=[1, 10, 100, 1000],
+                            help='Количество получателей в группе')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Количество рассылок на каждый размер группы')
+        parser.add_argument('--no-encryption', action='store_true',
+                            help='Без symmetric_encryption_keys')
+
+    def handle(self, *args, **options):
+        keys = None if options['no_encryption'] else [settings.SECRET_KEY]
+        layers = (
+            ('stock', RedisChannelLayer(symmetric_encryption_keys=keys)),
+            ('custom', CustomRedisChannelLayer(symmetric_encryption_keys=keys)),
+        )
+        # сообщение размером с рассылку доски
+        message = {
+            'type': 'message_send',
+            'data': {'event': 'board_changes', 'version': 1,
+                     'changes': [{'type': 'task_updated', 'task': {'id': i, 'name': f'task{i}'}}
+                                 for i in range(20)]},
+        }
+
+        self.stdout.write(f'{"subscribers":>12} {"layer":>8} {"ms/send":>10} {"us/recipient":>14}')
+        for size in options['subscribers']:
+            # каналы разных процессов - у каждого свой ключ в Redis
+            channel_names = [f'worker{i}.channel' for i in range(size)]
+            for name, layer in layers:
+                elapsed = self.run_case(layer, channel_names, message, options['repeat'])
+                self.stdout.write(
+                    f'{size:>12} {name:>8} {elapsed * 1000:>10.3f} {elapsed / size * 10 ** 6:>14.2f}'
+                )
+
+    @staticmethod
+    def run_case(layer, channel_names, message, repeat):
+        # прогрев: создание шифровальщика и кэшей msgpack в замер не входят
+        layer._map_channel_keys_to_connection(channel_names, message)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            layer._map_channel_keys_to_connection(channel_names, message)
+        return (time.perf_counter() - start) / repeat
@@ -0,0 +1,89 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from logic.indexing import ShiftObjects
+from workspaces.models import WorkSpace, Board, Column, Task
+
+User = get_user_model()
+
+
+class LegacyShiftObjects:
+    """
+    Прежний алгоритм пересчета: срез обьектов загружается в память,
+    номера меняются в python и записываются через bulk_update.
+    Оставлен только для сравнения в бенчмарке.
+    """
+    def shift(self, objects, instance, new_index):
+        if new_index > instance.index:
+            slice_objects = list(objects[instance.index: new_index + 1])
+            delta = -1
+        else:
+            slice_objects = list(objects[new_index: instance.index + 1])
+            delta = 1
+
+        for obj in slice_objects:
+            if obj == instance:
+                obj.index = instance.index = new_index
+                continue
+            obj.index += delta
+
+        Task.objects.bulk_update(slice_objects, ['index'])
+        return instance
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пересчет порядковых номеров задач при перемещении: '
+            'прежний (bulk_update) и текущий (UPDATE index ± 1). '
+            'Данные создаются во временной транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 10000],
+                            help='Количество задач в колонке')
+        parser.add_argument('--moves', type=int, default=20,
+                            help='Количество перемещений на каждый размер')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"tasks":>8} {"engine":>8} {"ms/move":>10} {"queries/move":>14}')
+
+        for size in options['sizes']:
+            for name, engine in (('legacy', LegacyShiftObjects()), ('sql', ShiftObjects())):
+                elapsed, queries = self.run_case(engine, size, options['moves'])
+                self.stdout.write(f'{size:>8} {name:>8} {elapsed * 1000:>10.2f} {queries:>14.1f}')
+
+    def run_case(self, engine, size, moves):
+        with transaction.atomic():
+            column = self.create_column(size)
+            elapsed = 0.0
+
+            with CaptureQueriesContext(connection) as context:
+                for i in range(moves):
+                    # перемещаем крайнюю задачу через всю колонку и обратно
+                    old_index, new_index = (0, size - 1) if i % 2 == 0 else (size - 1, 0)
+                    instance = Task.objects.get(column=column, index=old_index)
+                    objects = Task.objects.filter(column=column).order_by('index')
+
+                    start = time.perf_counter()
+                    instance = engine.shift(objects, instance, new_index)
+                    instance.save(update_fields=['index'])
+                    elapsed += time.perf_counter() - start
+
+            # без фиксации: таблицы возвращаются в исходное состояние
+            transaction.set_rollback(True)
+
+        # запрос получения задачи перед перемещением в результат не входит
+        return elapsed / moves, len(context.captured_queries) / moves - 1
+
+    @staticmethod
+    def create_column(size):
+        user = User.objects.create_user(email='bench-indexing@example.com', password=None)
+        workspace = WorkSpace.objects.create(owner=user, name='bench')
+        board = Board.objects.create(workspace=workspace, name='bench')
+        column = Column.objects.create(board=board, name='bench', index=Column.objects.filter(board=board).count())
+        Task.objects.bulk_create(
+            Task(column=column, name=f'task{i}', index=i) for i in range(size)
+        )
+        return column
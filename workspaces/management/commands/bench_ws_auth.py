@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+
+from logic.ws_auth import ws_auth_cache
+
+User = get_user_model()
+
+EMAIL_TEMPLATE = 'bench-ws-auth-{}@example.invalid'
+
+
+class Command(BaseCommand):
+    help = ('Замер авторизации подключений к вебсокетам при массовом переподключении: '
+            'без кэша (JWT + запрос пользователя на каждое подключение), с пустым '
+            'и с заполненным кэшем. Создает временных пользователей и удаляет их.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=10000,
+                            help='Количество подключений')
+        parser.add_argument('--users', type=int, default=500,
+                            help='Количество пользователей (токенов)')
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help='Одновременных подключений')
+
+    def handle(self, *args, **options):
+        users = [
+            User.objects.create_user(email=EMAIL_TEMPLATE.format(i), password=None, is_active=True)
+            for i in range(options['users'])
+        ]
+        try:
+            tokens = [str(RefreshToken.for_user(user).access_token) for user in users]
+            self.run(tokens, options['connections'], options['concurrency'])
+        finally:
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+    def run(self, tokens, connections, concurrency):
+        stream = [tokens[i % len(tokens)] for i in range(connections)]
+
+        async def uncached(token):
+            payload = UntypedToken(token).payload
+            await database_sync_to_async(ws_auth_cache._token_loader(payload['jti']))()
+            await database_sync_to_async(ws_auth_cache._user_loader(payload['user_id']))()
+
+        self.stdout.write(f'{"case":>10} {"total s":>10} {"us/conn":>10} {"p99 ms":>10} {"db loads":>10}')
+        self.report('uncached', asyncio.run(self.storm(uncached, stream, concurrency)), len(stream))
+
+        self.clear_cache(tokens)
+        ws_auth_cache.stats.update(db=0)
+        self.report('cold', asyncio.run(self.storm(ws_auth_cache.get_user, stream, concurrency)),
+                    ws_auth_cache.stats['db'])
+
+        ws_auth_cache.stats.update(db=0)
+        self.report('warm', asyncio.run(self.storm(ws_auth_cache.get_user, stream, concurrency)),
+                    ws_auth_cache.stats['db'])
+
+        # другие процессы: кэш в памяти пуст, записи есть в Redis
+        ws_auth_cache._local.clear()
+        ws_auth_cache.stats.update(db=0)
+        self.report('redis', asyncio.run(self.storm(ws_auth_cache.get_user, stream, concurrency)),
+                    ws_auth_cache.stats['db'])
+        self.clear_cache(tokens)
+
+    @staticmethod
+    async def storm(check, stream, concurrency):
+        """Подключения пачками по concurrency, возвращает время каждого"""
+        timings = []
+
+        async def connect(token):
+            start = time.perf_counter()
+            await check(token)
+            timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, len(stream), concurrency):
+            await asyncio.gather(*(connect(token) for token in stream[i:i + concurrency]))
+        return time.perf_counter() - start, timings
+
+    def report(self, case, result, db_loads):
+        total, timings = result
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        self.stdout.write(
+            f'{case:>10} {total:>10.3f} {total / len(timings) * 10 ** 6:>10.1f} '
+            f'{p99 * 1000:>10.3f} {db_loads:>10}'
+        )
+
+    @staticmethod
+    def clear_cache(tokens):
+        ws_auth_cache._local.clear()
+        for token in tokens:
+            payload = UntypedToken(token).payload
+            ws_auth_cache.redis.delete(ws_auth_cache._token_key(payload['jti']),
+                                       ws_auth_cache._user_key(payload['user_id']))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from logic.indexing import RankShiftObjects
+from workspaces.models import Board, Column, Task
+
+
+class Command(BaseCommand):
+    help = ('Перераспределяет ключи сортировки (rank) и плотные index '
+            'всех колонок и задач. Нужно запустить при переключении '
+            "WORKSAPCES['INDEXING_ENGINE'].")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            choices=['shift', 'rank'],
+            default='shift',
+            help='Какой порядок считать актуальным: по index (shift) или по rank (rank)',
+        )
+
+    def handle(self, *args, **options):
+        engine = RankShiftObjects()
+        ordering = ('index', 'id') if options['source'] == 'shift' else engine.ordering
+
+        with transaction.atomic():
+            for board_id in Board.objects.values_list('id', flat=True).iterator():
+                engine.rebalance(Column, ordering=ordering, board_id=board_id)
+
+            for column_id in Column.objects.values_list('id', flat=True).iterator():
+                engine.rebalance(Task, ordering=ordering, column_id=column_id)
+
+        self.stdout.write(self.style.SUCCESS('Порядковые номера пересчитаны'))
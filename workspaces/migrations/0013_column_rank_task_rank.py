@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspaces', '0012_rename_work_space_board_workspace'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='column',
+            name='rank',
+            field=models.BigIntegerField(default=0, verbose_name='Ключ сортировки'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.BigIntegerField(default=0, verbose_name='Ключ сортировки'),
+        ),
+        migrations.AddIndex(
+            model_name='column',
+            index=models.Index(fields=['board', 'rank'], name='column_board_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['column', 'rank'], name='task_column_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workspaces', '0013_column_rank_task_rank'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invitedusers',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
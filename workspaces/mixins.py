@@ -10,6 +10,7 @@ from rest_framework.exceptions import ValidationError
 from djangochannelsrestframework.observer.generics import action
 
 from logic.email import InviteUserEmail
+from logic.indexing import index_recalculation
 from .models import WorkSpace, InvitedUsers, Board, Column, Task
 
 User = get_user_model()
@@ -152,16 +153,16 @@ class IndexValidateMixin:
             # условие применяется для задач, если задачу перемещают между колонками,
             # список объектов нужно получить из другой колонки
             # для корректной перестановки индексов объекты должны быть отсортированы
-            objects = new_col.task.all().order_by('index')
+            objects = new_col.task.all().order_by(*index_recalculation().ordering)
             max_length += 1
         else:
             model_class = self.instance.__class__
             filter_kwargs = self.get_filter_kwargs(model_class)
             objects = model_class.objects.filter(
                 **filter_kwargs
-            ).order_by('index')
+            ).order_by(*index_recalculation().ordering)
 
-        max_length += len(objects)
+        max_length += objects.count()
         if new_index >= max_length or new_index < 0:
             raise ValidationError(
                 {"index": f'Порядковый номер должен соответсвовать количеству обьектов: '
@@ -180,23 +181,42 @@ class IndexValidateMixin:
 
 
 class ConsumerMixin:
+    # одновременных подписок канала: в отдельном соединении одна,
+    # в мультиплексированном (MultiplexConsumer) - больше
+    max_subscriptions = 1
+
+    @property
+    def subscriptions(self) -> list:
+        return self.__dict__.setdefault('_subscriptions', [])
+
     @action()
     async def subscribe(self, pk, **kwargs):
         """
         Добавление канала в группу для отслеживания сообщений.
-        Одновременно может быть подписка только на одну задачу,
-        если канал уже был добавлен в группу, сперва его удаляем.
+        Если подписок больше max_subscriptions, самая старая удаляется
+        (в отдельном соединении подписка только на один обьект).
         """
-        if hasattr(self, 'group_name'):
-            await self.remove_group(self.group_name)
+        group_name = f'{self.__class__.__name__}-{pk}'
+        if group_name in self.subscriptions:
+            return
+
+        while len(self.subscriptions) >= self.max_subscriptions:
+            await self.remove_group(self.subscriptions.pop(0))
 
-        self.group_name = f'{self.__class__.__name__}-{pk}'
-        await self.add_group(self.group_name)
+        self.subscriptions.append(group_name)
+        await self.add_group(group_name)
+
+    @action()
+    async def unsubscribe(self, pk, **kwargs):
+        group_name = f'{self.__class__.__name__}-{pk}'
+        if group_name in self.subscriptions:
+            self.subscriptions.remove(group_name)
+            await self.remove_group(group_name)
 
     async def disconnect(self, code):
-        """При закрытии соединения удаляем канал из группы"""
-        if hasattr(self, 'group_name'):
-            await self.remove_group(self.group_name)
+        """При закрытии соединения удаляем канал из групп"""
+        while self.subscriptions:
+            await self.remove_group(self.subscriptions.pop())
 
     async def message_send(self, event):
         """
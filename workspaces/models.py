@@ -28,13 +28,19 @@ class InvitedUsers(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='invitations', on_delete=models.CASCADE)
     token = models.CharField(max_length=32)
     workspace = models.ForeignKey(WorkSpace, related_name='workspace_invitations', on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
 
 class Column(models.Model):
     name = models.CharField('Колонка', max_length=50)
     board = models.ForeignKey(Board, related_name='column_board', on_delete=models.CASCADE)
     index = models.PositiveIntegerField('Порядковый номер')
+    rank = models.BigIntegerField('Ключ сортировки', default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['board', 'rank'], name='column_board_rank_idx'),
+        ]
 
     def __repr__(self):
         return f'{self.name}'
@@ -56,6 +62,12 @@ class Task(models.Model):
     file = models.FileField(upload_to='task_attach/', null=True)
     priority = models.IntegerField('Флаг приоритета', choices=PRIORITY, null=True)
     created_at = models.DateTimeField('Время создания задачи', auto_now_add=True)
+    rank = models.BigIntegerField('Ключ сортировки', default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['column', 'rank'], name='task_column_rank_idx'),
+        ]
 
 
 class Sticker(models.Model):
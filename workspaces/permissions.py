@@ -1,80 +1,44 @@
 from rest_framework.permissions import BasePermission
 
-from workspaces.models import Board, Column, Task
+from logic.acl import access_cache
 
 
-class UserInWorkSpaceUsers(BasePermission):
-    """Настройка прав для досок, пользователь является участником РП"""
+class ObjectInUserWorkSpace(BasePermission):
+    """
+    Пользователь является участником РП обьекта из url (view.kwargs[url_kwarg]).
+    Проверка идет по кэшу прав (logic.acl), без запросов к БД в обычном случае.
+    """
+    kind = None
+    url_kwarg = None
 
     def has_permission(self, request, view):
-        workspace_id = int(view.kwargs.get('workspace_id', None))
-
-        if request.user.joined_workspaces.filter(id=workspace_id).exists():
-            # print(f'\nEND PERM\n')
-            return True
-        # print(f'\nEND PERM\n')
-        return False
-
-
-class UserIsBoardMember(BasePermission):
-    """Настройка прав для колонок, пользователь является участником РП"""
-
-    def has_permission(self, request, view):
-        board_id = int(view.kwargs.get('board_id', None))
-
         try:
-            board = Board.objects.only('workspace_id').get(pk=board_id)
-            if request.user.joined_workspaces.filter(id=board.workspace_id).exists():
-                # print(f'\nEND PERM\n')
-                return True
-        except Board.DoesNotExist:
-            # print(f'\nEND PERM\n')
+            obj_id = int(view.kwargs.get(self.url_kwarg))
+        except (TypeError, ValueError):
             return False
-        # print(f'\nEND PERM\n')
-        return False
-
-
-class UserHasAccessTasks(BasePermission):
-    """Только участники РП имеют доступ к задачам"""
 
-    def has_permission(self, request, view):
-        column_id = int(view.kwargs.get('column_id', None))
+        return access_cache.has_access(request.user.id, self.kind, obj_id)
 
-        try:
-            ws = (Column.objects
-                  .select_related('board')
-                  .only('board__workspace_id')
-                  .get(pk=column_id)
-                  .board.workspace_id)
 
-            if request.user.joined_workspaces.filter(id=ws).exists():
-                # print(f'\nEND PERM\n')
-                return True
+class UserInWorkSpaceUsers(ObjectInUserWorkSpace):
+    """Настройка прав для досок, пользователь является участником РП"""
+    kind = 'workspace'
+    url_kwarg = 'workspace_id'
 
-        except Column.DoesNotExist:
-            # print(f'\nEND PERM\n')
-            return False
-        # print(f'\nEND PERM\n')
-        return False
 
+class UserIsBoardMember(ObjectInUserWorkSpace):
+    """Настройка прав для колонок, пользователь является участником РП"""
+    kind = 'board'
+    url_kwarg = 'board_id'
 
-class UserHasAccessStickers(BasePermission):
-    """Только участники РП имеют доступ к стикерам задач"""
 
-    def has_permission(self, request, view):
-        task_id = int(view.kwargs.get('task_id', None))
-        user = request.user.id
+class UserHasAccessTasks(ObjectInUserWorkSpace):
+    """Только участники РП имеют доступ к задачам"""
+    kind = 'column'
+    url_kwarg = 'column_id'
 
-        try:
-            task = (Task.objects.select_related('column__board__workspace')
-                    .only('column__board__workspace__users')
-                    .get(pk=task_id))
-            if (user,) in task.column.board.workspace.users.all().values_list('id'):
-                # print(f'\nEND PERM\n')
-                return True
 
-        except Column.DoesNotExist:
-            # print(f'\nEND PERM\n')
-            return False
-        # print(f'\nEND PERM\n')
-        return False
+class UserHasAccessStickers(ObjectInUserWorkSpace):
+    """Только участники РП имеют доступ к стикерам задач"""
+    kind = 'task'
+    url_kwarg = 'task_id'
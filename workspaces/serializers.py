@@ -2,7 +2,7 @@ from datetime import timedelta
 
 from django.utils.timezone import now
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.db import models, transaction
 
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
@@ -16,6 +16,43 @@ from .models import *
 User = get_user_model()
 
 
+class IndexedListSerializer(serializers.ListSerializer):
+    """
+    Список задач или колонок одного родителя в порядке сортировки.
+    Порядковый номер index в ответе всегда плотный (0, 1, 2...),
+    даже если в БД используются разреженные ключи сортировки.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        engine = index_recalculation()
+        representation = []
+
+        for item, position in engine.positions(iterable):
+            item_data = self.child.to_representation(item)
+            item_data['index'] = position
+            representation.append(item_data)
+
+        return representation
+
+
+class PositionedListSerializer(serializers.ListSerializer):
+    """
+    Список задач или колонок из разных родителей (или не всех обьектов
+    родителя). Плотные порядковые номера считаются для всего списка сразу.
+    """
+    def to_representation(self, data):
+        iterable = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        positions = index_recalculation().positions_map(iterable)
+        representation = []
+
+        for item in iterable:
+            item_data = self.child.to_representation(item)
+            item_data['index'] = positions.get(item.id, item.index)
+            representation.append(item_data)
+
+        return representation
+
+
 class CreateWorkSpaceSerializer(serializers.ModelSerializer):
     """Сериализотор создания РП"""
     # поле owner скрыто для редактирования и автоматически заполняется текущим пользователем
@@ -329,10 +366,9 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         )
 
     def create(self, validated_data):
-        number_of_tasks = self.context["view"].get_queryset().count()
         column_id = self.context['view'].kwargs['column_id']
 
-        validated_data['index'] = number_of_tasks
+        validated_data.update(index_recalculation().next_position(Task, column_id=column_id))
         validated_data['column_id'] = column_id
 
         instance = Task.objects.create(**validated_data)
@@ -349,6 +385,7 @@ class TaskListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
+        list_serializer_class = IndexedListSerializer
         fields = (
             'id',
             'name',
@@ -427,6 +464,7 @@ class TaskSerializer(
 
     class Meta:
         model = Task
+        list_serializer_class = PositionedListSerializer
         fields = (
             'id',
             'name',
@@ -453,7 +491,7 @@ class TaskSerializer(
                     {"column": 'Задачи можно перемещать только между колонками внутри доски'},
                     'invalid_column'
                 )
-            self.objects = new_col.task.all().order_by('index')
+            self.objects = new_col.task.all().order_by(*index_recalculation().ordering)
         else:
             new_col = None
 
@@ -462,9 +500,17 @@ class TaskSerializer(
 
         return attrs
 
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        # внутри списка порядковый номер проставляет PositionedListSerializer
+        if self.parent is None:
+            representation['index'] = index_recalculation().position(instance)
+        return representation
+
     def update(self, instance, validated_data):
         """При перемещении задач их порядковые номера нужно пересчитать"""
-        new_index = validated_data.get('index', None)
+        # номер, исправленный при перемещении (shift), не перезаписывается присланным
+        new_index = validated_data.pop('index', None)
         new_col = validated_data.pop('column', None)
         users = validated_data.pop('responsible', None)
 
@@ -489,10 +535,9 @@ class CreateColumnSerializer(serializers.ModelSerializer):
         )
 
     def create(self, validated_data):
-        number_of_columns = self.context["view"].get_queryset().count()
         board_pk = self.context['view'].kwargs['board_id']
 
-        validated_data['index'] = number_of_columns
+        validated_data.update(index_recalculation().next_position(Column, board_id=board_pk))
         validated_data['board_id'] = board_pk
         instance = Column.objects.create(**validated_data)
         return instance
@@ -507,6 +552,7 @@ class ColumnSerializer(
 
     class Meta:
         model = Column
+        list_serializer_class = IndexedListSerializer
         read_only_fields = ['board']
         fields = (
             'id',
@@ -518,7 +564,9 @@ class ColumnSerializer(
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['tasks'] = sorted(representation['tasks'], key=lambda x: x['index'])
+        # внутри списка порядковый номер проставляет IndexedListSerializer
+        if self.parent is None:
+            representation['index'] = index_recalculation().position(instance)
         return representation
 
     def validate(self, attrs):
@@ -558,7 +606,6 @@ class BoardSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['columns'] = sorted(representation['columns'], key=lambda x: x['index'])
         users = instance.workspace.users.all()
         # удалить после реализации добавления участников доски
         representation['members'] = CurrentUserSerializer(users, many=True).data
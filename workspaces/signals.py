@@ -1,14 +1,16 @@
-import json
-import zoneinfo
-import datetime
-
-from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from django_celery_beat.models import CrontabSchedule, PeriodicTask
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
 
-from workspaces.models import Board, Column, Task, Sticker, InvitedUsers
+from logic.acl import access_cache
+from logic.ancestry import ancestry
+from logic.ws_auth import ws_auth_cache
+from workspaces.models import WorkSpace, Board, Column, Task, Sticker, Comment
+from workspaces.serializers import CommentSerializer
+from workspaces.websocket.snapshot import board_snapshot
+from workspaces.websocket.utils import schedule_board_update, send_board_deleted
 
 User = get_user_model()
 
@@ -16,6 +18,10 @@ User = get_user_model()
 @receiver(post_save, sender=Board)
 def create_board(sender, instance, created, **kwargs):
     if created:
+        # сразу, а не после фиксации транзакции:
+        # id удаленной доски может быть использован повторно
+        board_snapshot.reset(instance.id)
+
         col = Column.objects.create(name='Надо сделать', board=instance, index=0)
         Column.objects.create(name='В работе', board=instance, index=1)
         Column.objects.create(name='Готово', board=instance, index=2)
@@ -30,34 +36,169 @@ def create_board(sender, instance, created, **kwargs):
         Sticker.objects.create(name='Стикер', color='#7033ff', task=task)
 
 
-@receiver(post_save, sender=InvitedUsers)
-def delete_invitation(sender, instance, created, **kwargs):
+def get_task_board_id(task_id):
+    return ancestry.board_id('task', task_id)
+
+
+def get_column_board_id(column_id):
+    return ancestry.board_id('column', column_id)
+
+
+@receiver(post_save, sender=Board)
+def update_board_snapshot_name(sender, instance, created, **kwargs):
+    if not created:
+        schedule_board_update(instance.id, name=instance.name)
+
+
+@receiver(pre_delete, sender=Board)
+def delete_board_snapshot(sender, instance, **kwargs):
+    board_id = instance.id
+    transaction.on_commit(lambda: send_board_deleted(board_id))
+
+
+def is_cascade_delete(instance, origin=None, **kwargs):
+    """
+    Обьект удаляется вместе с родителем (доской, колонкой или задачей),
+    слепок обновит обработчик удаления родителя
+    """
+    return isinstance(origin, (Board, Column, Task)) and origin is not instance
+
+
+@receiver(post_save, sender=Column)
+@receiver(pre_delete, sender=Column)
+def update_board_snapshot_column(sender, instance, **kwargs):
+    if is_cascade_delete(instance, **kwargs):
+        return
+    schedule_board_update(instance.board_id, column_id=instance.id)
+
+
+@receiver(post_save, sender=Task)
+@receiver(pre_delete, sender=Task)
+def update_board_snapshot_task(sender, instance, **kwargs):
+    """
+    Слепок доски обновляется после фиксации транзакции.
+    Для удаляемых обьектов доска определяется до удаления.
+    """
+    if is_cascade_delete(instance, **kwargs):
+        return
+    schedule_board_update(get_column_board_id(instance.column_id), task_id=instance.id)
+
+
+@receiver(post_save, sender=Sticker)
+@receiver(pre_delete, sender=Sticker)
+def update_board_snapshot_sticker(sender, instance, **kwargs):
+    if is_cascade_delete(instance, **kwargs):
+        return
+    schedule_board_update(get_task_board_id(instance.task_id), task_id=instance.task_id)
+
+
+@receiver(m2m_changed, sender=Task.responsible.through)
+def update_board_snapshot_responsible(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    task_ids = (pk_set or ()) if reverse else [instance.id]
+    for task_id in task_ids:
+        schedule_board_update(get_task_board_id(task_id), task_id=task_id)
+
+
+@receiver(m2m_changed, sender=Board.members.through)
+def update_board_snapshot_members(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    board_ids = (pk_set or ()) if reverse else [instance.id]
+    for board_id in board_ids:
+        schedule_board_update(board_id, invalidate=True)
+
+
+@receiver(post_save, sender=User)
+def update_board_snapshot_user(sender, instance, created, update_fields, **kwargs):
+    """Имя и аватар пользователя входят в слепки досок, где он участник или ответственный"""
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+
+    board_ids = (Board.objects
+                 .filter(workspace__in=WorkSpace.objects.filter(users=instance))
+                 .values_list('id', flat=True))
+    for board_id in board_ids:
+        schedule_board_update(board_id, invalidate=True)
+
+
+@receiver(post_save, sender=Comment)
+def send_comment_added(sender, instance, created, **kwargs):
+    """Комментарии не входят в слепок доски, изменения получают только подписчики задачи"""
+    if not created:
+        return
+
+    change = {'type': 'comment_added', 'task_id': int(instance.task_id),
+              'comment': CommentSerializer(instance).data}
+    schedule_board_update(get_task_board_id(instance.task_id), task_event=change)
+
+
+@receiver(pre_delete, sender=Comment)
+def send_comment_deleted(sender, instance, **kwargs):
+    if is_cascade_delete(instance, **kwargs):
+        return
+
+    change = {'type': 'comment_deleted', 'task_id': int(instance.task_id), 'comment_id': instance.id}
+    schedule_board_update(get_task_board_id(instance.task_id), task_event=change)
+
+
+@receiver(m2m_changed, sender=WorkSpace.users.through)
+def invalidate_acl_members(sender, instance, action, reverse, pk_set, **kwargs):
+    """Состав участников РП изменился, кэш прав участников сбрасывается"""
+    if action in ('post_add', 'post_remove'):
+        user_ids = [instance.id] if reverse else pk_set
+    elif action == 'pre_clear':
+        user_ids = [instance.id] if reverse else list(instance.users.values_list('id', flat=True))
+    else:
+        return
+
+    access_cache.invalidate_users(user_ids)
+
+
+@receiver(pre_delete, sender=WorkSpace)
+def invalidate_acl_workspace(sender, instance, **kwargs):
+    access_cache.invalidate_users(instance.users.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_acl_user(sender, instance, created, **kwargs):
+    # id удаленного пользователя может быть использован повторно
     if created:
-        """
-        Запускает задачу по удалению связанного приглашения
-        """
-        time_now = datetime.datetime.now()
-        token_timeout = settings.WORKSAPCES.get('INVITE_TOKEN_TIMEOUT')
-
-        if token_timeout:
-            delta = token_timeout
-        else:
-            delta = 3600
-
-        run_time = time_now + datetime.timedelta(seconds=delta)
-
-        schedule, _ = CrontabSchedule.objects.get_or_create(
-            minute=run_time.minute,
-            hour=run_time.hour,
-            day_of_week='*',
-            day_of_month=run_time.day,
-            month_of_year=run_time.month,
-            timezone=zoneinfo.ZoneInfo('UTC')
-        )
+        access_cache.invalidate_users([instance.id])
 
-        PeriodicTask.objects.create(
-            crontab=schedule,
-            name=f'delete_invitation-{instance.id}',
-            task='workspaces.tasks.delete_invitation_to_ws',
-            args=json.dumps([instance.id])
-        )
+
+@receiver(post_save, sender=Board)
+@receiver(post_save, sender=Column)
+@receiver(post_save, sender=Task)
+def forget_ancestry_saved(sender, instance, created, update_fields, **kwargs):
+    """
+    Родители обьекта сбрасываются при создании (id может быть использован
+    повторно) и при сохранении, которое может сменить родителя
+    """
+    parent_field = {Board: 'workspace', Column: 'board', Task: 'column'}[sender]
+    if created or update_fields is None or parent_field in update_fields:
+        ancestry.forget(sender.__name__.lower(), instance.id)
+
+
+@receiver(post_delete, sender=Board)
+@receiver(post_delete, sender=Column)
+@receiver(post_delete, sender=Task)
+def forget_ancestry_deleted(sender, instance, **kwargs):
+    ancestry.forget(sender.__name__.lower(), instance.id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_ws_auth_user(sender, instance, **kwargs):
+    """Вебсокеты получают актуальные данные и статус пользователя"""
+    if kwargs.get('created'):
+        return
+    ws_auth_cache.forget_user(instance.id)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def forget_ws_auth_token(sender, instance, **kwargs):
+    ws_auth_cache.forget_token(instance.token.jti)
@@ -1,7 +1,12 @@
 from celery import shared_task
+from django.db import transaction
 from django_celery_beat.models import PeriodicTask
 
-from .models import InvitedUsers
+from logic.indexing import RankShiftObjects
+from logic.timers import fire_due_timers
+
+from .models import Column, InvitedUsers, Task
+from .websocket.utils import flush_board_updates
 
 
 @shared_task
@@ -9,8 +14,33 @@ def delete_invitation_to_ws(invitation_id):
     invitation = InvitedUsers.objects.filter(id=invitation_id).first()
 
     if invitation:
-        task = PeriodicTask.objects.get(name=f'delete_invitation-{invitation_id}')
         invitation.delete()
-        task.delete()
+    # отложенная задача celery-beat, созданная до перехода на таймеры
+    PeriodicTask.objects.filter(name=f'delete_invitation-{invitation_id}').delete()
+
 
+@shared_task
+def fire_timers():
+    """Запуск обработчиков наступивших таймеров (см. logic.timers)"""
+    return fire_due_timers()
 
+
+@shared_task
+def rebalance_indexes(model_name, parent_id):
+    """
+    Фоновое перераспределение ключей сортировки задач колонки
+    (model_name='task') или колонок доски (model_name='column')
+    """
+    model_class, parent = {
+        'task': (Task, 'column_id'),
+        'column': (Column, 'board_id'),
+    }[model_name]
+
+    with transaction.atomic():
+        RankShiftObjects().rebalance(model_class, **{parent: parent_id})
+
+
+@shared_task
+def send_board_updates(board_id):
+    """Рассылка по вебсокету изменений доски, накопленных за окно BROADCAST_WINDOW"""
+    flush_board_updates(board_id)
@@ -0,0 +1,107 @@
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from logic.acl import access_cache
+from logic.ancestry import ancestry, Ancestry
+from workspaces.models import WorkSpace, Board, Column, Task
+
+User = get_user_model()
+
+
+class AccessCacheTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        self.user2 = User.objects.create_user(email='user2@example.com', password='Pass!234', is_active=True)
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+        self.ws.users.add(self.user)
+        self.board = Board.objects.create(workspace=self.ws, name='Board1')
+        self.column = Column.objects.filter(board=self.board).first()
+        self.task = Task.objects.get(column__board=self.board)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {RefreshToken.for_user(self.user2).access_token}')
+
+    def test_cached_checks_without_queries(self):
+        for kind, obj_id in (('workspace', self.ws.id), ('board', self.board.id),
+                             ('column', self.column.id), ('task', self.task.id)):
+            self.assertTrue(access_cache.has_access(self.user.id, kind, obj_id))
+            self.assertFalse(access_cache.has_access(self.user2.id, kind, obj_id))
+
+            with self.assertNumQueries(0):
+                self.assertTrue(access_cache.has_access(self.user.id, kind, obj_id))
+                self.assertFalse(access_cache.has_access(self.user2.id, kind, obj_id))
+
+    def test_cache_shared_between_processes(self):
+        access_cache.has_access(self.user.id, 'task', self.task.id)
+        # память другого процесса пуста, данные берутся из Redis
+        access_cache._local.clear()
+        ancestry._local.clear()
+        with self.assertNumQueries(0):
+            self.assertTrue(access_cache.has_access(self.user.id, 'task', self.task.id))
+
+    def test_missing_object(self):
+        self.assertFalse(access_cache.has_access(self.user.id, 'task', self.task.id + 1000))
+
+    def test_membership_change(self):
+        url = reverse('task-list', kwargs={'column_id': self.column.id})
+        self.assertEquals(status.HTTP_403_FORBIDDEN, self.client.get(url).status_code)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ws.users.add(self.user2)
+        self.assertEquals(status.HTTP_200_OK, self.client.get(url).status_code)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user2.joined_workspaces.remove(self.ws)
+        self.assertEquals(status.HTTP_403_FORBIDDEN, self.client.get(url).status_code)
+
+    def test_workspace_clear(self):
+        self.assertTrue(access_cache.has_access(self.user.id, 'board', self.board.id))
+        self.ws.users.clear()
+        self.assertFalse(access_cache.has_access(self.user.id, 'board', self.board.id))
+
+    def test_stale_value_not_cached(self):
+        """Значение, прочитанное из БД до инвалидации, не попадает в кэш"""
+        key = access_cache._user_key(self.user.id)
+
+        def invalidate_during_load():
+            access_cache.invalidate_users([self.user.id])
+            return str(self.ws.id)
+
+        access_cache.invalidate_users([self.user.id])
+        access_cache.get(key, invalidate_during_load)
+        self.assertIsNone(access_cache.redis.get(key))
+
+
+class AncestryTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+        self.board = Board.objects.create(workspace=self.ws, name='Board1')
+        self.column1, self.column2 = Column.objects.filter(board=self.board)[:2]
+        self.task = Task.objects.get(column__board=self.board)
+
+    def test_resolve(self):
+        expected = Ancestry(self.ws.id, self.board.id, self.column1.id)
+        self.assertEquals(expected, ancestry.resolve('task', self.task.id))
+        ancestry.resolve('column', self.column1.id)
+        ancestry.resolve('board', self.board.id)
+        with self.assertNumQueries(0):
+            self.assertEquals(expected, ancestry.resolve('task', self.task.id))
+            self.assertEquals(self.board.id, ancestry.board_id('column', self.column1.id))
+            self.assertEquals(self.ws.id, ancestry.workspace_id('board', self.board.id))
+
+    def test_move_and_delete(self):
+        ancestry.resolve('task', self.task.id)
+
+        self.task.column = self.column2
+        self.task.save()
+        self.assertEquals(self.column2.id, ancestry.resolve('task', self.task.id).column_id)
+
+        task_id = self.task.id
+        self.board.delete()
+        self.assertIsNone(ancestry.resolve('task', task_id))
@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.conf import settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from logic.indexing import RankShiftObjects
+from workspaces.models import WorkSpace, Board, Column, Task
+from workspaces.serializers import TaskSerializer
+
+User = get_user_model()
+
+
+@override_settings(WORKSAPCES={**settings.WORKSAPCES, 'INDEXING_ENGINE': 'rank'})
+class RankIndexTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        user_token = RefreshToken.for_user(self.user).access_token
+
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+        self.ws.users.add(self.user)
+        self.board = Board.objects.create(workspace=self.ws, name='Board1')
+        self.column1 = Column.objects.create(name='Column1', board=self.board, index=0)
+        self.column2 = Column.objects.create(name='Column2', board=self.board, index=1)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {user_token}')
+
+        for i in range(4):
+            self.client.post(reverse('task-list', kwargs={'column_id': self.column1.id}), {'name': f'task{i}'})
+        self.tasks = list(Task.objects.filter(column=self.column1).order_by('id'))
+
+    def get_task_names(self, column):
+        response = self.client.get(reverse('task-list', kwargs={'column_id': column.id}))
+        self.assertEquals(status.HTTP_200_OK, response.status_code)
+        self.assertEquals(list(range(len(response.data))), [task['index'] for task in response.data])
+        return [task['name'] for task in response.data]
+
+    def test_create_task_rank(self):
+        ranks = [task.rank for task in self.tasks]
+        self.assertEquals(ranks, sorted(ranks))
+        self.assertEquals(4, len(set(ranks)))
+
+    def test_move_task_writes_one_row(self):
+        task = self.tasks[0]
+        other_ranks = [t.rank for t in self.tasks[1:]]
+
+        response = self.client.patch(
+            reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': task.id}),
+            {'index': 2, 'column': self.column1.id}
+        )
+        self.assertEquals(status.HTTP_200_OK, response.status_code)
+        self.assertEquals(2, response.data['index'])
+        self.assertEquals(['task1', 'task2', 'task0', 'task3'], self.get_task_names(self.column1))
+
+        for t, rank in zip(self.tasks[1:], other_ranks):
+            t.refresh_from_db()
+            self.assertEquals(rank, t.rank)
+
+    def test_move_task_to_other_column(self):
+        response = self.client.patch(
+            reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': self.tasks[3].id}),
+            {'index': 0, 'column': self.column2.id}
+        )
+        self.assertEquals(status.HTTP_200_OK, response.status_code)
+        self.assertEquals(['task0', 'task1', 'task2'], self.get_task_names(self.column1))
+        self.assertEquals(['task3'], self.get_task_names(self.column2))
+
+    def test_move_past_end_after_delete(self):
+        """Если соседа удалили после проверки номера, обьект встает последним, а не первым"""
+        task = Task.objects.get(pk=self.tasks[0].id)
+        Task.objects.filter(pk=self.tasks[3].id).delete()
+
+        RankShiftObjects().shift(None, task, 3).save()
+        self.assertEquals(2, task.index)
+        self.assertEquals(['task1', 'task2', 'task0'], self.get_task_names(self.column1))
+
+    def test_delete_task_keeps_dense_index(self):
+        response = self.client.delete(
+            reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': self.tasks[1].id})
+        )
+        self.assertEquals(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertEquals(['task0', 'task2', 'task3'], self.get_task_names(self.column1))
+
+    def test_gap_exhausted_rebalance(self):
+        Task.objects.filter(column=self.column1).update(rank=1)
+
+        with mock.patch('workspaces.tasks.rebalance_indexes.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(
+                    reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': self.tasks[3].id}),
+                    {'index': 1, 'column': self.column1.id}
+                )
+        self.assertEquals(status.HTTP_200_OK, response.status_code)
+        delay.assert_not_called()
+        self.assertEquals(['task0', 'task3', 'task1', 'task2'], self.get_task_names(self.column1))
+
+    def test_narrow_gap_schedules_rebalance(self):
+        Task.objects.filter(pk=self.tasks[1].pk).update(rank=self.tasks[0].rank + 2)
+
+        with mock.patch('workspaces.tasks.rebalance_indexes.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.patch(
+                    reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': self.tasks[3].id}),
+                    {'index': 1, 'column': self.column1.id}
+                )
+        delay.assert_called_once_with('task', self.column1.id)
+
+    def test_rebalance(self):
+        Task.objects.filter(column=self.column1).update(rank=0)
+        RankShiftObjects().rebalance(Task, column_id=self.column1.id)
+
+        tasks = Task.objects.filter(column=self.column1).order_by('rank')
+        self.assertEquals([0, 1, 2, 3], [t.index for t in tasks])
+        self.assertEquals([RankShiftObjects.step * i for i in range(1, 5)], [t.rank for t in tasks])
+
+    def test_serialize_many_tasks_positions(self):
+        """Порядковые номера списка задач считаются одним запросом, а не COUNT на задачу"""
+        self.client.patch(
+            reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': self.tasks[3].id}),
+            {'index': 0, 'column': self.column1.id}
+        )
+        other = Task.objects.create(name='other', column=self.column2,
+                                    **RankShiftObjects().next_position(Task, column_id=self.column2.id))
+        tasks = list(Task.objects.filter(pk__in=[self.tasks[0].id, self.tasks[3].id, other.id])
+                     .prefetch_related('responsible', 'comments', 'sticker'))
+
+        with self.assertNumQueries(1):
+            data = TaskSerializer(tasks, many=True).data
+        self.assertEquals({self.tasks[3].id: 0, self.tasks[0].id: 1, other.id: 0},
+                          {task['id']: task['index'] for task in data})
@@ -1,12 +1,15 @@
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from logic.indexing import ShiftObjects
 from workspaces.models import WorkSpace, Board, Column, Task
+from workspaces.serializers import TaskSerializer
 
 User = get_user_model()
 
@@ -146,6 +149,58 @@ class TaskTestCase(APITestCase):
         self.assertEquals(2, task3.index)
         self.assertEquals(3, task4.index)
 
+    def test_shift_stale_instance(self):
+        """Номер обьекта перечитывается под блокировкой, а не берется из устаревшего экземпляра"""
+        tasks = [self.task1] + [
+            Task.objects.create(name=f'task{i}', index=i, column=self.column1) for i in range(1, 4)
+        ]
+        stale = Task.objects.get(pk=tasks[3].id)
+        # другое перемещение успело переставить задачу в начало
+        ShiftObjects().shift(None, Task.objects.get(pk=tasks[3].id), 0).save()
+
+        with transaction.atomic():
+            ShiftObjects().shift(None, stale, 2)
+            stale.save()
+
+        self.assertEqual(
+            sorted(Task.objects.filter(column=self.column1).values_list('index', flat=True)),
+            [0, 1, 2, 3],
+        )
+        self.assertEqual(Task.objects.get(pk=tasks[3].id).index, 2)
+
+    def test_update_index_clamped(self):
+        """Номер, исправленный под блокировкой, не перезаписывается присланным клиентом"""
+        tasks = [self.task1] + [
+            Task.objects.create(name=f'task{i}', index=i, column=self.column1) for i in range(1, 3)
+        ]
+        serializer = TaskSerializer(Task.objects.get(pk=tasks[0].id), data={'index': 2}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        # задачу удалили после проверки номера
+        ShiftObjects().delete_shift_index(tasks[1])
+        tasks[1].delete()
+
+        serializer.save()
+        self.assertEqual(Task.objects.get(pk=tasks[0].id).index, 1)
+        self.assertEqual(
+            sorted(Task.objects.filter(column=self.column1).values_list('index', flat=True)), [0, 1],
+        )
+
+    def test_delete_shift_stale_instance(self):
+        tasks = [self.task1] + [
+            Task.objects.create(name=f'task{i}', index=i, column=self.column1) for i in range(1, 3)
+        ]
+        stale = Task.objects.get(pk=tasks[0].id)
+        ShiftObjects().shift(None, Task.objects.get(pk=tasks[0].id), 2).save()
+
+        with transaction.atomic():
+            ShiftObjects().delete_shift_index(stale)
+            stale.delete()
+
+        self.assertEqual(
+            sorted(Task.objects.filter(column=self.column1).values_list('index', flat=True)),
+            [0, 1],
+        )
+
     def test_patch_task_invalid_index(self):
         data = {'index': -256}
         response = self.client.patch(
@@ -209,6 +264,22 @@ class TaskTestCase(APITestCase):
         self.assertEquals('Changed name', self.task1.name)
         self.assertEquals(1, self.task1.index)
         self.assertEquals(0, task2.index)
+
+    def test_patch_task_other_column_indexes(self):
+        task2 = Task.objects.create(name='task2', index=1, column=self.column1)
+        task3 = Task.objects.create(name='task3', index=0, column=self.column2)
+        task4 = Task.objects.create(name='task4', index=1, column=self.column2)
+        data = {'index': 1, 'column': self.column2.id}
+        response = self.client.patch(
+            reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': self.task1.id}),
+            data
+        )
+        self.assertEquals(status.HTTP_200_OK, response.status_code)
+
+        col1_indexes = list(Task.objects.filter(column=self.column1).order_by('index').values_list('name', 'index'))
+        col2_indexes = list(Task.objects.filter(column=self.column2).order_by('index').values_list('name', 'index'))
+        self.assertEquals([('task2', 0)], col1_indexes)
+        self.assertEquals([('task3', 0), ('task1', 1), ('task4', 2)], col2_indexes)
     #
     # def test_delete_task(self):
     #     task2 = Task.objects.create(name='task2', index=1, column=self.column1)
@@ -0,0 +1,183 @@
+from unittest import mock
+
+from kombu.exceptions import OperationalError
+from django.conf import settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from rest_framework.test import APITestCase, APIClient
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from workspaces.models import WorkSpace, Board, Column, Task, Sticker
+from workspaces.websocket.snapshot import board_snapshot
+from workspaces.websocket.utils import flush_board_updates, schedule_board_update
+
+User = get_user_model()
+
+
+@override_settings(WORKSAPCES={**settings.WORKSAPCES, 'BROADCAST_WINDOW': 0})
+class BoardDeltaTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        user_token = RefreshToken.for_user(self.user).access_token
+
+        # изменения из setUp фиксируются и рассылаются до начала теста,
+        # их рассылка не должна попасть в проверки теста
+        self.capture_messages(self.create_board)
+        self.column1, self.column2, _ = Column.objects.filter(board=self.board).order_by('index')
+        self.task = Task.objects.get(column=self.column1)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {user_token}')
+
+        board_snapshot.get(self.board.id)
+
+    def create_board(self):
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+        self.ws.users.add(self.user)
+        self.board = Board.objects.create(workspace=self.ws, name='Board1')
+
+    def capture_messages(self, func):
+        """Сообщения, разосланные по группам после фиксации транзакции"""
+        with mock.patch('workspaces.websocket.utils.group_send_data') as group_send:
+            with self.captureOnCommitCallbacks(execute=True):
+                func()
+        return {call.args[1]: call.args[2] for call in group_send.call_args_list}
+
+    def test_changes_in_transaction_coalesced(self):
+        """Изменения доски в одной транзакции рассылаются одним сообщением одной версии"""
+        version = board_snapshot.version(self.board.id)
+        Column.objects.filter(pk=self.column2.pk).update(name='Renamed column')
+        Task.objects.filter(pk=self.task.pk).update(name='Renamed task')
+
+        def schedule():
+            schedule_board_update(self.board.id, column_id=self.column2.id)
+            schedule_board_update(self.board.id, task_id=self.task.id)
+
+        messages = self.capture_messages(schedule)
+        board_message = messages[f'BoardConsumer-{self.board.id}']
+        self.assertEquals(version + 1, board_message['version'])
+        self.assertCountEqual(
+            [{'type': 'column_updated', 'column': {'id': self.column2.id, 'name': 'Renamed column'}},
+             {'type': 'task_updated', 'task': {'id': self.task.id, 'name': 'Renamed task'}}],
+            board_message['changes']
+        )
+
+    def test_task_moved(self):
+        version = board_snapshot.version(self.board.id)
+
+        messages = self.capture_messages(lambda: self.client.patch(
+            reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': self.task.id}),
+            {'index': 0, 'column': self.column2.id, 'name': 'Renamed'}
+        ))
+
+        board_message = messages[f'BoardConsumer-{self.board.id}']
+        self.assertEquals('board_changes', board_message['event'])
+        self.assertEquals(version + 1, board_message['version'])
+        self.assertEquals(
+            [{'type': 'task_moved', 'task_id': self.task.id, 'column': self.column2.id, 'index': 0},
+             {'type': 'task_updated', 'task': {'id': self.task.id, 'name': 'Renamed'}}],
+            board_message['changes']
+        )
+        task_message = messages[f'TaskConsumer-{self.task.id}']
+        self.assertEquals('task_changes', task_message['event'])
+        self.assertEquals(board_message['changes'], task_message['changes'])
+
+    def test_sticker_added_and_deleted(self):
+        messages = self.capture_messages(
+            lambda: Sticker.objects.create(name='New', color='#000000', task=self.task)
+        )
+        change, = messages[f'BoardConsumer-{self.board.id}']['changes']
+        self.assertEquals('sticker_added', change['type'])
+        self.assertEquals('New', change['sticker']['name'])
+
+        sticker = Sticker.objects.get(name='New')
+        sticker_id = sticker.id
+        messages = self.capture_messages(sticker.delete)
+        self.assertEquals(
+            [{'type': 'sticker_deleted', 'task_id': self.task.id, 'sticker_id': sticker_id}],
+            messages[f'BoardConsumer-{self.board.id}']['changes']
+        )
+
+    def test_task_deleted(self):
+        messages = self.capture_messages(lambda: self.client.delete(
+            reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': self.task.id})
+        ))
+        self.assertEquals(
+            [{'type': 'task_deleted', 'task_id': self.task.id, 'column': self.column1.id}],
+            messages[f'BoardConsumer-{self.board.id}']['changes']
+        )
+
+    def test_comment_added(self):
+        messages = self.capture_messages(lambda: self.client.post(
+            reverse('comment-list', kwargs={'task_id': self.task.id}), {'message': 'Hello'}
+        ))
+        self.assertNotIn(f'BoardConsumer-{self.board.id}', messages)
+        change, = messages[f'TaskConsumer-{self.task.id}']['changes']
+        self.assertEquals('comment_added', change['type'])
+        self.assertEquals('Hello', change['comment']['message'])
+
+    def test_full_snapshot_without_cache(self):
+        board_snapshot.reset(self.board.id)
+
+        messages = self.capture_messages(lambda: self.client.patch(
+            reverse('column-detail', kwargs={'board_id': self.board.id, 'pk': self.column1.id}),
+            {'name': 'Renamed'}
+        ))
+        board_message = messages[f'BoardConsumer-{self.board.id}']
+        self.assertEquals('board_snapshot', board_message['event'])
+        self.assertEquals('Renamed', board_message['data']['columns'][0]['name'])
+
+
+@override_settings(WORKSAPCES={**settings.WORKSAPCES, 'BROADCAST_WINDOW': 0.05})
+class BroadcastWindowTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+
+        # изменения из setUp фиксируются и рассылаются до проверок теста,
+        # заодно очищаются изменения, оставшиеся в Redis от прошлых запусков
+        with mock.patch('workspaces.tasks.send_board_updates.apply_async'):
+            with mock.patch('workspaces.websocket.utils.group_send_data'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+                    self.board = Board.objects.create(workspace=self.ws, name='Board1')
+                flush_board_updates(self.board.id)
+        self.task = Task.objects.get(column__board=self.board)
+
+        board_snapshot.get(self.board.id)
+
+    def test_updates_coalesced(self):
+        with mock.patch('workspaces.tasks.send_board_updates.apply_async') as apply_async:
+            with mock.patch('workspaces.websocket.utils.group_send_data') as group_send:
+                for name in ('first', 'second', 'third'):
+                    with self.captureOnCommitCallbacks(execute=True):
+                        Task.objects.filter(pk=self.task.pk).update(name=name)
+                        Task.objects.get(pk=self.task.pk).save()
+
+                # до окончания окна ничего не разослано, рассылка запланирована один раз
+                group_send.assert_not_called()
+                apply_async.assert_called_once_with((self.board.id,), countdown=0.05)
+
+                flush_board_updates(self.board.id)
+
+        messages = {call.args[1]: call.args[2] for call in group_send.call_args_list}
+        self.assertEquals(
+            [{'type': 'task_updated', 'task': {'id': self.task.id, 'name': 'third'}}],
+            messages[f'BoardConsumer-{self.board.id}']['changes']
+        )
+        self.assertEquals(2, len(group_send.call_args_list))
+
+    def test_broker_unavailable(self):
+        """Недоступный брокер не ломает запрос, следующее изменение планирует рассылку снова"""
+        with mock.patch('workspaces.tasks.send_board_updates.apply_async') as apply_async:
+            apply_async.side_effect = OperationalError('broker unavailable')
+            with self.assertLogs('workspaces.websocket.utils', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Task.objects.get(pk=self.task.pk).save()
+
+            apply_async.side_effect = None
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.get(pk=self.task.pk).save()
+        self.assertEquals(2, apply_async.call_count)
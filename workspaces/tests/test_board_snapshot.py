@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.db import transaction
+
+from rest_framework.test import APITestCase, APIClient
+from rest_framework import status
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from logic.indexing import index_recalculation
+from workspaces.models import WorkSpace, Board, Column, Task, Sticker
+from workspaces.websocket.snapshot import board_snapshot
+from workspaces.websocket.utils import _pending
+
+User = get_user_model()
+
+
+@override_settings(WORKSAPCES={**settings.WORKSAPCES, 'BROADCAST_WINDOW': 0})
+class BoardSnapshotTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        user_token = RefreshToken.for_user(self.user).access_token
+
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+        self.ws.users.add(self.user)
+        # доска создается с тремя колонками и одной задачей
+        self.board = Board.objects.create(workspace=self.ws, name='Board1')
+        self.column1, self.column2, _ = Column.objects.filter(board=self.board).order_by('index')
+        for i in range(1, 4):
+            Task.objects.create(name=f'task{i}', index=i, column=self.column1)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'JWT {user_token}')
+
+        # изменения из setUp не фиксируются (транзакция теста),
+        # их рассылка не должна попасть в проверки теста
+        _pending.boards.clear()
+
+    def assertSnapshotActual(self):
+        """Слепок совпадает с доской, построенной из БД"""
+        _, data = board_snapshot.get(self.board.id)
+        self.assertEquals(board_snapshot._build(self.board.id), data)
+        return data
+
+    def test_snapshot_hit_without_queries(self):
+        version, data = board_snapshot.get(self.board.id)
+
+        with self.assertNumQueries(0):
+            cached_version, cached_data = board_snapshot.get(self.board.id)
+
+        self.assertEquals(version, cached_version)
+        self.assertEquals(data, cached_data)
+
+    def test_patch_task_move(self):
+        board_snapshot.get(self.board.id)
+        task = Task.objects.get(name='task1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('task-detail', kwargs={'column_id': self.column1.id, 'pk': task.id}),
+                {'index': 0, 'column': self.column2.id}
+            )
+        self.assertEquals(status.HTTP_200_OK, response.status_code)
+
+        data = self.assertSnapshotActual()
+        self.assertEquals(['task1'], [t['name'] for t in data['columns'][1]['tasks']])
+
+    def test_patch_task_delete_and_sticker(self):
+        board_snapshot.get(self.board.id)
+        task = Task.objects.get(name='task2')
+        version = board_snapshot.version(self.board.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Sticker.objects.create(name='Sticker', color='#7033ff', task=task)
+                task1 = Task.objects.get(name='task1')
+                index_recalculation().delete_shift_index(task1)
+                task1.delete()
+
+        # изменения одной транзакции применяются одной версией
+        self.assertEquals(version + 1, board_snapshot.version(self.board.id))
+        self.assertSnapshotActual()
+
+    def test_patch_column(self):
+        board_snapshot.get(self.board.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('column-detail', kwargs={'board_id': self.board.id, 'pk': self.column1.id}),
+                {'index': 2, 'name': 'Moved'}
+            )
+        self.assertEquals(status.HTTP_200_OK, response.status_code)
+        self.assertSnapshotActual()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                reverse('column-detail', kwargs={'board_id': self.board.id, 'pk': self.column2.id})
+            )
+        self.assertEquals(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertSnapshotActual()
+
+    def test_new_board_resets_snapshot(self):
+        board_snapshot.get(self.board.id)
+        board_id = self.board.id
+        Board.objects.filter(pk=board_id).delete()
+
+        board = Board.objects.create(id=board_id, workspace=self.ws, name='Board2')
+        _, data = board_snapshot.get(board.id)
+        self.assertEquals('Board2', data['name'])
@@ -0,0 +1,139 @@
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from rest_framework.test import APITestCase
+
+from logic.redis_layer import CustomRedisChannelLayer
+
+
+class ChannelLayerTestCase(APITestCase):
+    def setUp(self):
+        self.layer = CustomRedisChannelLayer(
+            **settings.CHANNEL_LAYERS['default']['CONFIG'],
+            prefix='test_asgi',
+        )
+        self.groups = [f'notification-{i}' for i in range(3)]
+        self.channels = []
+
+        async def subscribe():
+            for group in self.groups:
+                channel = await self.layer.new_channel()
+                await self.layer.group_add(group, channel)
+                self.channels.append(channel)
+            # канал в двух группах
+            await self.layer.group_add(self.groups[1], self.channels[0])
+
+        async_to_sync(subscribe)()
+
+    def tearDown(self):
+        async_to_sync(self.layer.flush)()
+
+    def receive_all(self, channels: list) -> dict:
+        async def receive():
+            return {channel: await self.layer.receive(channel) for channel in channels}
+
+        return async_to_sync(receive)()
+
+    def test_group_send_many(self):
+        message = {'type': 'message_send', 'data': {'id': 1}}
+
+        with mock.patch.object(CustomRedisChannelLayer, '_evalsha', wraps=self.layer._evalsha) as evalsha:
+            async_to_sync(self.layer.group_send_many)(self.groups, message)
+
+        # один вызов скрипта на шард каналов
+        self.assertEquals(1, evalsha.call_count)
+        received = self.receive_all(self.channels)
+        self.assertEquals([message] * 3, list(received.values()))
+
+        async def pending(channel):
+            return await self.layer.connection(0).zcard(self.layer.prefix + channel)
+
+        # канал из нескольких групп получает сообщение один раз
+        self.assertEquals(0, async_to_sync(pending)(self.channels[0]))
+
+    def test_exclude_channel(self):
+        message = {'type': 'message_send', 'data': {'id': 2}}
+        async_to_sync(self.layer.group_send)(self.groups[2], message, exclude_channel=self.channels[2])
+        async_to_sync(self.layer.group_send)(self.groups[1], message)
+
+        received = self.receive_all(self.channels[:2])
+        self.assertEquals(message, received[self.channels[1]])
+        self.assertEquals(message, received[self.channels[0]])
+
+        async def pending(channel):
+            return await self.layer.connection(0).zcard(self.layer.prefix + channel)
+
+        # исключенный канал сообщение не получил
+        self.assertEquals(0, async_to_sync(pending)(self.channels[2]))
+
+
+class GroupCacheTestCase(APITestCase):
+    def setUp(self):
+        self.layer = CustomRedisChannelLayer(
+            **settings.CHANNEL_LAYERS['default']['CONFIG'],
+            prefix='test_asgi',
+            group_cache_ttl=60,
+        )
+        self.message = {'type': 'message_send', 'data': {'id': 1}}
+
+    def tearDown(self):
+        async_to_sync(self.layer.flush)()
+
+    def test_group_cache(self):
+        async def scenario():
+            first = await self.layer.new_channel()
+            await self.layer.group_add('BoardConsumer-1', first)
+
+            await self.layer.group_send('BoardConsumer-1', self.message)
+            await self.layer.group_send('BoardConsumer-1', self.message)
+            hits = self.layer.group_cache_info()['hits']
+
+            # новый канал сбрасывает кэш группы и получает следующее сообщение
+            second = await self.layer.new_channel()
+            await self.layer.group_add('BoardConsumer-1', second)
+            await self.layer.group_send('BoardConsumer-1', self.message)
+            return hits, await self.layer.receive(second)
+
+        hits, received = async_to_sync(scenario)()
+
+        self.assertEquals(1, hits)
+        self.assertEquals(self.message, received)
+        self.assertEquals({'hits': 1, 'misses': 2, 'hit_rate': 1 / 3, 'groups': 1},
+                          self.layer.group_cache_info())
+
+
+class EncryptedGroupSendTestCase(APITestCase):
+    def setUp(self):
+        self.layer = CustomRedisChannelLayer(
+            **settings.CHANNEL_LAYERS['default']['CONFIG'],
+            prefix='test_asgi',
+            symmetric_encryption_keys=['secret'],
+        )
+
+    def tearDown(self):
+        async_to_sync(self.layer.flush)()
+
+    def test_encrypted_once(self):
+        message = {'type': 'message_send', 'data': {'id': 1, 'name': 'Задача'}}
+
+        async def scenario():
+            # каналы разных процессов хранятся под разными ключами
+            channels = [f'worker{i}.channel' for i in range(3)]
+            for channel in channels:
+                await self.layer.group_add('TaskConsumer-1', channel)
+
+            with mock.patch.object(self.layer.crypter, 'encrypt', wraps=self.layer.crypter.encrypt) as encrypt:
+                await self.layer.group_send('TaskConsumer-1', message)
+
+            # сообщение одиночному каналу использует прежний формат
+            await self.layer.send(channels[0], {'type': 'direct'})
+            received = [await self.layer.receive(channel) for channel in channels]
+            return encrypt.call_count, received, await self.layer.receive(channels[0])
+
+        encrypt_count, received, direct = async_to_sync(scenario)()
+
+        self.assertEquals(1, encrypt_count)
+        self.assertEquals([message] * 3, received)
+        self.assertEquals({'type': 'direct'}, direct)
@@ -0,0 +1,78 @@
+import json
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APITestCase
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from pulsewave.asgi import application
+from workspaces.models import WorkSpace, Board
+from workspaces.websocket.utils import agroup_send_data, group_message
+
+User = get_user_model()
+
+
+class MultiplexConsumerTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+        self.ws.users.add(self.user)
+        self.board1 = Board.objects.create(workspace=self.ws, name='Board1')
+        self.board2 = Board.objects.create(workspace=self.ws, name='Board2')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def test_group_message_stream(self):
+        self.assertEquals('board', group_message('BoardConsumer-1', None)['stream'])
+        self.assertEquals('task', group_message('TaskConsumer-1', None)['stream'])
+        self.assertEquals('notification', group_message('notification-1', None)['stream'])
+
+    def test_many_subscriptions(self):
+        async def run():
+            communicator = ApplicationCommunicator(application, {
+                'type': 'websocket',
+                'path': '/ws/',
+                'query_string': f'token={self.token}'.encode(),
+                'headers': [],
+            })
+            await communicator.send_input({'type': 'websocket.connect'})
+            self.assertEquals('websocket.accept', (await communicator.receive_output(5))['type'])
+
+            async def send(stream, payload):
+                await communicator.send_input({
+                    'type': 'websocket.receive',
+                    'text': json.dumps({'stream': stream, 'payload': payload}),
+                })
+
+            async def receive():
+                return json.loads((await communicator.receive_output(5))['text'])
+
+            await send('board', {'action': 'subscribe', 'pk': self.board1.id, 'request_id': 1})
+            await send('board', {'action': 'subscribe', 'pk': self.board2.id, 'request_id': 2})
+            await send('notification', {'action': 'unread_count', 'request_id': 3})
+            response = await receive()
+            self.assertEquals('notification', response['stream'])
+            self.assertEquals({'unread': 0}, response['payload']['data'])
+
+            # рассылки обеих досок и уведомлений приходят в одно соединение
+            channel_layer = get_channel_layer()
+            await agroup_send_data(channel_layer, f'BoardConsumer-{self.board1.id}', {'id': 1})
+            await agroup_send_data(channel_layer, f'BoardConsumer-{self.board2.id}', {'id': 2})
+            await agroup_send_data(channel_layer, f'notification-{self.user.id}', {'id': 3})
+            received = [await receive() for _ in range(3)]
+
+            await send('unknown', {})
+            error = await receive()
+
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(2)
+            return received, error
+
+        received, error = async_to_sync(run)()
+        self.assertEquals([{'stream': 'board', 'payload': {'id': 1}},
+                           {'stream': 'board', 'payload': {'id': 2}},
+                           {'stream': 'notification', 'payload': {'id': 3}}], received)
+        self.assertEquals(400, error['payload']['response_status'])
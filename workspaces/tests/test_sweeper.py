@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone, crypto
+
+from rest_framework.test import APITestCase
+
+from freezegun import freeze_time
+
+from logic.sweeper import sweep_expired
+from workspaces.models import WorkSpace, InvitedUsers
+
+User = get_user_model()
+
+
+class SweeperTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+
+    def create_invitation(self):
+        return InvitedUsers.objects.create(user=self.user, workspace=self.ws,
+                                           token=crypto.get_random_string(length=32))
+
+    def test_sweep_expired(self):
+        old = timezone.now() - timedelta(days=2)
+        with freeze_time(old):
+            expired = [self.create_invitation() for _ in range(3)]
+            inactive = User.objects.create_user(email='user2@example.com', password='Pass!234', is_active=False)
+            # пользователь входил в систему, затем был деактивирован
+            deactivated = User.objects.create_user(email='user3@example.com', password='Pass!234',
+                                                   is_active=False, last_login=old)
+        actual = self.create_invitation()
+        new_inactive = User.objects.create_user(email='user4@example.com', password='Pass!234', is_active=False)
+
+        result = sweep_expired()
+
+        self.assertEquals(3, result['invitations'])
+        self.assertEquals(1, result['users'])
+        self.assertIn('runtime', result)
+        self.assertEquals([actual.id], list(InvitedUsers.objects.values_list('id', flat=True)))
+        self.assertFalse(User.objects.filter(pk=inactive.pk).exists())
+        self.assertFalse(InvitedUsers.objects.filter(pk__in=[i.pk for i in expired]).exists())
+        self.assertEquals(3, User.objects.filter(pk__in=[deactivated.pk, new_inactive.pk, self.user.pk]).count())
+
+        # повторный запуск ничего не удаляет
+        result = sweep_expired()
+        self.assertEquals((0, 0), (result['invitations'], result['users']))
@@ -0,0 +1,100 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from logic.timers import timer_wheel, fire_due_timers
+from notification.create_notify.creator import DeadlineNotification
+from notification.create_notify.tasks import end_deadlines
+from notification.create_notify.utils import end_deadline_notify
+from notification.models import Notification
+from workspaces.models import WorkSpace, Board, Task
+
+User = get_user_model()
+
+
+class TimerWheelTestCase(APITestCase):
+    def setUp(self):
+        timer_wheel.redis.delete(timer_wheel.key)
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+        self.board = Board.objects.create(workspace=self.ws, name='Board1')
+        self.task = Task.objects.get(column__board=self.board)
+
+    def tearDown(self):
+        timer_wheel.redis.delete(timer_wheel.key)
+
+    def test_deadline_timer(self):
+        self.task.deadline = timezone.now() + timedelta(hours=1)
+        end_deadline_notify(self.task)
+        self.assertEquals(self.task.deadline.timestamp(), timer_wheel.pending('end_deadline', self.task.id))
+
+        # перенос дедлайна переносит таймер, а не создает второй
+        self.task.deadline += timedelta(hours=1)
+        end_deadline_notify(self.task)
+        self.assertEquals(1, timer_wheel.redis.zcard(timer_wheel.key))
+
+        self.task.deadline = None
+        end_deadline_notify(self.task)
+        self.assertIsNone(timer_wheel.pending('end_deadline', self.task.id))
+
+    def test_fire_due_timers(self):
+        timer_wheel.schedule('end_deadline', 1, time.time() - 10)
+        timer_wheel.schedule('end_deadline', 2, time.time() - 5)
+        timer_wheel.schedule('end_deadline', 3, time.time() + 3600)
+
+        with mock.patch('logic.timers.current_app.send_task') as send_task:
+            self.assertEquals({'end_deadline': 2}, fire_due_timers())
+            # сработавшие таймеры удалены и повторно не запускаются
+            self.assertEquals({}, fire_due_timers())
+
+        send_task.assert_called_once_with('notification.create_notify.tasks.end_deadlines', args=[[1, 2]])
+        self.assertEquals(1, timer_wheel.redis.zcard(timer_wheel.key))
+
+    def test_failed_send_restores_timers(self):
+        timer_wheel.schedule('end_deadline', 1, time.time() - 10)
+
+        with mock.patch('logic.timers.current_app.send_task', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                fire_due_timers()
+
+        self.assertIsNotNone(timer_wheel.pending('end_deadline', 1))
+
+    def test_end_deadlines(self):
+        self.task.responsible.add(self.user)
+        Task.objects.filter(pk=self.task.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+        with mock.patch('notification.create_notify.creator.sending_to_channels'):
+            with self.captureOnCommitCallbacks(execute=True):
+                end_deadlines([self.task.id])
+
+        self.assertEquals(1, Notification.objects.filter(recipients=self.user).count())
+
+    def test_end_deadlines_failed_restored(self):
+        """Ошибка одного уведомления не теряет остальные, таймер возвращается"""
+        task2 = Task.objects.create(name='task2', index=1, column=self.task.column,
+                                    deadline=timezone.now() - timedelta(minutes=1))
+        task2.responsible.add(self.user)
+        self.task.responsible.add(self.user)
+        Task.objects.filter(pk=self.task.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+
+        # таймеры извлечены из Redis
+        timer_wheel.redis.delete(timer_wheel.key)
+        original = DeadlineNotification.handler
+
+        def handler(notification):
+            if notification.obj.id == self.task.id:
+                raise RuntimeError
+            return original(notification)
+
+        with mock.patch.object(DeadlineNotification, 'handler', handler):
+            with mock.patch('notification.create_notify.creator.sending_to_channels'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    end_deadlines([self.task.id, task2.id])
+
+        self.assertEquals(1, Notification.objects.filter(recipients=self.user).count())
+        self.assertGreater(timer_wheel.pending('end_deadline', self.task.id), time.time())
+        self.assertIsNone(timer_wheel.pending('end_deadline', task2.id))
@@ -0,0 +1,93 @@
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+
+from rest_framework.test import APITestCase
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from logic.ws_auth import ws_auth_cache
+from workspaces.websocket.middleware import TokenAuthMiddleware
+
+User = get_user_model()
+
+
+class WebsocketAuthTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.token = str(self.refresh.access_token)
+        # id пользователей в тестовой БД повторяются, записи прошлых тестов остаются в Redis
+        ws_auth_cache.forget_user(self.user.id)
+
+    def get_user(self, token):
+        return async_to_sync(ws_auth_cache.get_user)(token)
+
+    def test_cached_user(self):
+        self.assertEquals(self.user, self.get_user(self.token))
+        with self.assertNumQueries(0):
+            self.assertEquals(self.user, self.get_user(self.token))
+
+            # память другого процесса пуста, данные берутся из Redis
+            ws_auth_cache._local.clear()
+            user = self.get_user(self.token)
+            self.assertEquals(self.user, user)
+            self.assertEquals((self.user.email, self.user.date_joined), (user.email, user.date_joined))
+
+    def test_cached_fields(self):
+        """В Redis хранятся поля пользователя в JSON, без пароля"""
+        self.get_user(self.token)
+        data = json.loads(ws_auth_cache.redis.get(ws_auth_cache._user_key(self.user.id)))
+        self.assertEquals(self.user.email, data['email'])
+        self.assertNotIn('password', data)
+
+    def test_blacklisted_during_load(self):
+        """Отметка, прочитанная до блокировки токена, не записывается поверх сброса"""
+        jti = self.refresh.access_token['jti']
+        load = ws_auth_cache._token_loader(jti)
+
+        def token_loader(_):
+            def racing_load():
+                value = load()
+                ws_auth_cache.forget_token(jti)
+                return value
+
+            return racing_load
+
+        with mock.patch.object(ws_auth_cache, '_token_loader', token_loader):
+            self.get_user(self.token)
+        self.assertIsNone(ws_auth_cache.redis.get(ws_auth_cache._token_key(jti)))
+
+    def test_invalid_token(self):
+        self.assertIsInstance(self.get_user(None), AnonymousUser)
+        self.assertIsInstance(self.get_user('invalid'), AnonymousUser)
+        self.assertIsInstance(self.get_user(self.token[:-2]), AnonymousUser)
+
+    def test_inactive_user(self):
+        self.get_user(self.token)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsInstance(self.get_user(self.token), AnonymousUser)
+
+    def test_blacklisted_token(self):
+        token = str(self.refresh)
+        self.assertEquals(self.user, self.get_user(token))
+        self.refresh.blacklist()
+        self.assertIsInstance(self.get_user(token), AnonymousUser)
+
+    def test_middleware_query_string(self):
+        scopes = []
+
+        async def inner(scope, receive, send):
+            scopes.append(scope)
+
+        middleware = TokenAuthMiddleware(inner)
+        for query_string in (f'token={self.token}', f'lang=ru&token={self.token}&debug'):
+            async_to_sync(middleware)({'type': 'websocket', 'query_string': query_string.encode()}, None, None)
+        async_to_sync(middleware)({'type': 'websocket', 'query_string': b'debug'}, None, None)
+
+        self.assertEquals([self.user, self.user], [scope['user'] for scope in scopes[:2]])
+        self.assertIsInstance(scopes[2]['user'], AnonymousUser)
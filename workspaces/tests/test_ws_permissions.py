@@ -0,0 +1,46 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APITestCase
+
+from workspaces.models import WorkSpace, Board, Column, Task
+from workspaces.websocket.permissions import ThisTaskInUserWorkspace, UserInWorkSpaceUsers
+
+User = get_user_model()
+
+
+class WebsocketPermissionsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user1@example.com', password='Pass!234', is_active=True)
+        self.user2 = User.objects.create_user(email='user2@example.com', password='Pass!234', is_active=True)
+        self.ws = WorkSpace.objects.create(owner=self.user, name='WorkSpace1')
+        self.ws.users.add(self.user)
+        self.board = Board.objects.create(workspace=self.ws, name='Board1')
+        self.column = Column.objects.filter(board=self.board).first()
+        self.task = Task.objects.get(column__board=self.board)
+
+    def has_permission(self, permission_class, user, action, **kwargs):
+        return async_to_sync(permission_class().has_permission)(
+            scope={'user': user}, consumer=None, action=action, **kwargs
+        )
+
+    def test_task_permissions(self):
+        for action, kwargs in (('patch', {'pk': self.task.id, 'data': {}}),
+                               ('subscribe', {'pk': str(self.task.id)}),
+                               ('create', {'data': {'column': self.column.id, 'name': 'task'}})):
+            self.assertTrue(self.has_permission(ThisTaskInUserWorkspace, self.user, action, **kwargs))
+            self.assertFalse(self.has_permission(ThisTaskInUserWorkspace, self.user2, action, **kwargs))
+
+        self.assertFalse(self.has_permission(ThisTaskInUserWorkspace, self.user, 'delete', pk=self.task.id + 1000))
+        self.assertFalse(self.has_permission(ThisTaskInUserWorkspace, self.user, 'create', data={}))
+
+    def test_board_permissions(self):
+        for action, kwargs in (('retrieve', {'pk': self.board.id}),
+                               ('create', {'data': {'workspace': self.ws.id, 'name': 'board'}})):
+            self.assertTrue(self.has_permission(UserInWorkSpaceUsers, self.user, action, **kwargs))
+            self.assertFalse(self.has_permission(UserInWorkSpaceUsers, self.user2, action, **kwargs))
+
+    def test_cached_check_without_queries(self):
+        self.has_permission(ThisTaskInUserWorkspace, self.user, 'patch', pk=self.task.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.has_permission(ThisTaskInUserWorkspace, self.user, 'patch', pk=self.task.id))
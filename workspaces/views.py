@@ -1,3 +1,4 @@
+from django.db import transaction
 from django.db.models import Prefetch
 from rest_framework import viewsets, permissions, status, generics
 from rest_framework.response import Response
@@ -18,7 +19,6 @@ from logic.ws_users import ws_users
 from logic.indexing import index_recalculation
 from notification.create_notify.decorators import (comment_notification,
                                                    workspace_notification)
-from .websocket.utils import send_task_group_consumers, send_board_group_consumers
 
 User = get_user_model()
 
@@ -222,7 +222,7 @@ class ColumnViewSet(viewsets.ModelViewSet):
         queryset = queryset.filter(board_id=board_id)
         if (self.action == 'partial_update'
                 or self.action == 'update'):
-            return queryset.order_by('index')
+            return queryset.order_by(*index_recalculation().ordering)
 
         queryset = (queryset
                     .prefetch_related('task')
@@ -230,7 +230,7 @@ class ColumnViewSet(viewsets.ModelViewSet):
                     .prefetch_related('task__sticker')
                     )
 
-        return queryset.order_by('index')
+        return queryset.order_by(*index_recalculation().ordering)
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -243,8 +243,9 @@ class ColumnViewSet(viewsets.ModelViewSet):
         При удалении колонки перезаписывает порядковые номера оставшихся колонок
         """
         instance = self.get_object()
-        index_recalculation().delete_shift_index(instance)
-        self.perform_destroy(instance)
+        with transaction.atomic():
+            index_recalculation().delete_shift_index(instance)
+            self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -299,7 +300,7 @@ class TaskViewSet(CreateModelMixin,
                                                queryset=Comment.objects.order_by('id')))
                     )
 
-        return queryset.order_by('index')
+        return queryset.order_by(*index_recalculation().ordering)
 
     def update(self, request, *args, **kwargs):
         # Из метода удалена джанговская инвалидация кэша,
@@ -318,8 +319,9 @@ class TaskViewSet(CreateModelMixin,
         При удалении задачи перезаписывает порядковые номера оставшихся задач
         """
         instance = self.get_object()
-        index_recalculation().delete_shift_index(instance)
-        self.perform_destroy(instance)
+        with transaction.atomic():
+            index_recalculation().delete_shift_index(instance)
+            self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -340,12 +342,10 @@ class CommentViewSet(ListModelMixin,
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        task_id = instance.task_id
 
         if request.user == instance.author:
+            # изменения рассылаются по вебсокетам из сигналов
             self.perform_destroy(instance)
-            # отправка сообщения по вебсокетам
-            send_task_group_consumers(task_id)
             return Response(status=status.HTTP_204_NO_CONTENT)
         else:
             return Response(data={'detail': 'Вы не являетесь автором комментария.'}, status=status.HTTP_403_FORBIDDEN)
@@ -355,14 +355,11 @@ class CommentViewSet(ListModelMixin,
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-
-        # отправка сообщения по вебсокетам
-        task_id = serializer.instance.task_id
-        send_task_group_consumers(task_id)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 class StickerViewSet(viewsets.ModelViewSet):
+    # изменения стикеров рассылаются по вебсокетам из сигналов
     serializer_class = serializers.StickerCreateSerializer
     queryset = Sticker.objects.all()
     permission_classes = [permissions.IsAuthenticated, UserHasAccessStickers, ]
@@ -374,37 +371,6 @@ class StickerViewSet(viewsets.ModelViewSet):
         queryset = queryset.filter(task_id=task_id)
         return queryset
 
-    def create(self, request, *args, **kwargs):
-        response = super().create(request, *args, **kwargs)
-        task = self.get_object()
-        board_id = task.column.board_id
-
-        # отправка сообщения по вебсокетам
-        send_task_group_consumers(task.id)
-        send_board_group_consumers(board_id)
-        return response
-
-    def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        task_id = instance.task_id
-        board_id = instance.column.board_id
-        self.perform_destroy(instance)
-
-        # отправка сообщения по вебсокетам
-        send_task_group_consumers(task_id)
-        send_board_group_consumers(board_id)
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-    def update(self, request, *args, **kwargs):
-        response = super().update(request, *args, **kwargs)
-        task = self.get_object()
-        board_id = task.column.board_id
-
-        # отправка сообщения по вебсокетам
-        send_task_group_consumers(task.id)
-        send_board_group_consumers(board_id)
-        return response
-
 
 class BoardUserList(generics.ListAPIView):
     """
@@ -1,6 +1,9 @@
 from typing import Tuple
 
+from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404
 
 from djangochannelsrestframework.generics import GenericAsyncAPIConsumer
 from djangochannelsrestframework import mixins
@@ -12,7 +15,7 @@ from logic.indexing import index_recalculation
 from notification.create_notify.decorators import task_notification
 from ..database import get_board, get_task
 from ..mixins import ConsumerMixin
-from .utils import group_send_data, send_board_group_consumers
+from .snapshot import board_snapshot
 from workspaces.websocket import serializers
 from workspaces.models import Task, Board
 from .permissions import IsAuthenticated, ThisTaskInUserWorkspace, UserInWorkSpaceUsers
@@ -43,17 +46,13 @@ class TaskConsumer(mixins.CreateModelMixin,
         queryset = get_task(
             super().get_queryset()
         )
-        return queryset.order_by('index')
+        return queryset.order_by(*index_recalculation().ordering)
 
     @action()
     def create(self, data: dict, **kwargs):
         serializer = self.get_serializer(data=data, action_kwargs=kwargs)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer, **kwargs)
-
-        board_id = serializer.instance.column.board_id
-        send_board_group_consumers(board_id)
-
         return serializer.data, status.HTTP_201_CREATED
 
     @action()
@@ -65,32 +64,31 @@ class TaskConsumer(mixins.CreateModelMixin,
         )
         serializer.is_valid(raise_exception=True)
         self.perform_patch(serializer, **kwargs)
-
-        board_id = instance.column.board_id
-        send_board_group_consumers(board_id)
-        group_send_data(self.channel_layer,
-                        self.group_name,
-                        serializer.data,
-                        self.channel_name)
-
         return serializer.data, status.HTTP_200_OK
 
     @action()
     @task_notification
     def delete(self, **kwargs) -> Tuple[None, int]:
         instance = self.get_object(**kwargs)
-        board_id = instance.column.board_id
-        index_recalculation().delete_shift_index(instance)
-        self.perform_delete(instance, **kwargs)
-
-        send_board_group_consumers(board_id)
-        group_send_data(self.channel_layer,
-                        self.group_name,
-                        None,
-                        self.channel_name)
+        with transaction.atomic():
+            index_recalculation().delete_shift_index(instance)
+            self.perform_delete(instance, **kwargs)
 
         return None, status.HTTP_204_NO_CONTENT
 
+    @action()
+    def retrieve(self, **kwargs) -> Tuple[dict, int]:
+        """
+        Задача целиком с версией. Нужна клиенту для повторной синхронизации,
+        если он пропустил номер версии в рассылке изменений.
+        """
+        # версия читается до задачи: изменение, сделанное между чтениями,
+        # клиент получит рассылкой и применит повторно
+        version = board_snapshot.task_version(kwargs.get('pk'))
+        instance = self.get_object(**kwargs)
+        serializer = self.get_serializer(instance=instance, action_kwargs=kwargs)
+        return {**serializer.data, 'version': version}, status.HTTP_200_OK
+
 
 class BoardConsumer(mixins.CreateModelMixin,
                     mixins.PatchModelMixin,
@@ -139,22 +137,23 @@ class BoardConsumer(mixins.CreateModelMixin,
         )
         serializer.is_valid(raise_exception=True)
         self.perform_patch(serializer, **kwargs)
-
-        group_send_data(self.channel_layer,
-                        self.group_name,
-                        serializer.data,
-                        self.channel_name)
-
         return serializer.data, status.HTTP_200_OK
 
     @action()
     def delete(self, **kwargs) -> Tuple[None, int]:
         instance = self.get_object(**kwargs)
         self.perform_delete(instance, **kwargs)
+        return None, status.HTTP_204_NO_CONTENT
 
-        group_send_data(self.channel_layer,
-                        self.group_name,
-                        None,
-                        self.channel_name)
+    @action()
+    async def retrieve(self, pk, **kwargs) -> Tuple[dict, int]:
+        """
+        Доска целиком с версией из слепка. Нужна клиенту для повторной
+        синхронизации, если он пропустил номер версии в рассылке изменений.
+        """
+        try:
+            version, data = await database_sync_to_async(board_snapshot.get)(pk)
+        except Board.DoesNotExist:
+            raise Http404
 
-        return None, status.HTTP_204_NO_CONTENT
+        return {**data, 'version': version}, status.HTTP_200_OK
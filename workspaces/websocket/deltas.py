@@ -0,0 +1,113 @@
+from typing import Dict, Iterable, List
+
+# поля задачи, изменения которых передаются отдельными событиями
+TASK_POSITION_FIELDS = ('column', 'index')
+TASK_STICKERS_FIELD = 'sticker'
+
+
+def diff_boards(old: dict,
+                new: dict,
+                column_ids: Iterable[int] = (),
+                task_ids: Iterable[int] = ()) -> List[dict]:
+    """
+    Список изменений между двумя слепками доски.
+    Сравниваются только переданные колонки и задачи (и название доски).
+
+    Перемещения передают только новую позицию обьекта, порядковые номера
+    соседей клиент пересчитывает сам: обьект убирается из старого места,
+    вставляется на позицию index и номера в колонке (на доске) идут подряд.
+    """
+    changes = []
+
+    if old['name'] != new['name']:
+        changes.append({'type': 'board_updated', 'name': new['name']})
+
+    old_columns = {c['id']: c for c in old['columns']}
+    new_columns = {c['id']: c for c in new['columns']}
+    for column_id in sorted(column_ids):
+        changes += _diff_column(old_columns.get(column_id), new_columns.get(column_id), column_id)
+
+    old_tasks = _tasks_by_id(old)
+    new_tasks = _tasks_by_id(new)
+    for task_id in sorted(task_ids):
+        changes += diff_tasks(old_tasks.get(task_id), new_tasks.get(task_id), task_id)
+
+    return changes
+
+
+def diff_tasks(old: dict | None, new: dict | None, task_id: int) -> List[dict]:
+    """Изменения одной задачи: перемещение, поля, стикеры"""
+    if old is None and new is None:
+        return []
+    if old is None:
+        return [{'type': 'task_created', 'task': new}]
+    if new is None:
+        return [{'type': 'task_deleted', 'task_id': task_id, 'column': old['column']}]
+
+    changes = []
+    if any(old[field] != new[field] for field in TASK_POSITION_FIELDS):
+        changes.append({
+            'type': 'task_moved',
+            'task_id': task_id,
+            'column': new['column'],
+            'index': new['index'],
+        })
+
+    fields = {
+        field: value for field, value in new.items()
+        if field not in TASK_POSITION_FIELDS
+        and field != TASK_STICKERS_FIELD
+        and old.get(field) != value
+    }
+    if fields:
+        changes.append({'type': 'task_updated', 'task': {'id': task_id, **fields}})
+
+    changes += _diff_stickers(old[TASK_STICKERS_FIELD], new[TASK_STICKERS_FIELD], task_id)
+    return changes
+
+
+def group_by_task(changes: List[dict]) -> Dict[int, List[dict]]:
+    """Изменения задач для рассылки подписчикам отдельных задач"""
+    result = {}
+    for change in changes:
+        if change['type'].startswith(('task_', 'sticker_', 'comment_')):
+            task_id = change.get('task_id') or change['task']['id']
+            result.setdefault(task_id, []).append(change)
+    return result
+
+
+def _diff_column(old: dict | None, new: dict | None, column_id: int) -> List[dict]:
+    if old is None and new is None:
+        return []
+    if old is None:
+        return [{'type': 'column_created', 'column': new}]
+    if new is None:
+        return [{'type': 'column_deleted', 'column_id': column_id}]
+
+    changes = []
+    if old['index'] != new['index']:
+        changes.append({'type': 'column_moved', 'column_id': column_id, 'index': new['index']})
+    if old['name'] != new['name']:
+        changes.append({'type': 'column_updated', 'column': {'id': column_id, 'name': new['name']}})
+    return changes
+
+
+def _diff_stickers(old: list, new: list, task_id: int) -> List[dict]:
+    old_stickers = {s['id']: s for s in old}
+    new_stickers = {s['id']: s for s in new}
+    changes = []
+
+    for sticker_id, sticker in new_stickers.items():
+        if sticker_id not in old_stickers:
+            changes.append({'type': 'sticker_added', 'task_id': task_id, 'sticker': sticker})
+        elif old_stickers[sticker_id] != sticker:
+            changes.append({'type': 'sticker_updated', 'task_id': task_id, 'sticker': sticker})
+
+    for sticker_id in old_stickers.keys() - new_stickers.keys():
+        changes.append({'type': 'sticker_deleted', 'task_id': task_id, 'sticker_id': sticker_id})
+
+    return changes
+
+
+def _tasks_by_id(board: dict) -> Dict[int, dict]:
+    return {t['id']: t for c in board['columns'] for t in c['tasks']}
@@ -1,50 +1,28 @@
 import os
-from datetime import datetime
 
 import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-import jwt
+from urllib.parse import parse_qs
 
-from django.conf import settings
-from django.contrib.auth.models import AnonymousUser
-from django.db import close_old_connections
-from django.contrib.auth import get_user_model
 from channels.middleware import BaseMiddleware
 
-User = get_user_model()
-
-ALGORITHM = "HS256"
+from logic.ws_auth import ws_auth_cache
 
 
 async def get_user(token):
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=ALGORITHM)
-    except:
-        return AnonymousUser()
-
-    token_exp = datetime.fromtimestamp(payload['exp'])
-    if token_exp < datetime.utcnow():
-        return AnonymousUser()
-
-    try:
-        user = await User.objects.aget(id=payload['user_id'])
-    except User.DoesNotExist:
-        return AnonymousUser()
-
-    return user
+    return await ws_auth_cache.get_user(token)
 
 
 class TokenAuthMiddleware(BaseMiddleware):
 
     async def __call__(self, scope, receive, send):
-        close_old_connections()
-        try:
-            token_key = (dict((x.split('=') for x in scope['query_string'].decode().split("&")))).get('token', None)
-        except ValueError:
-            token_key = None
+        # к БД обращается только ws_auth_cache через database_sync_to_async,
+        # который сам закрывает устаревшие соединения
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token_key = query.get('token', [None])[0]
 
         scope['user'] = await get_user(token_key)
         return await super().__call__(scope, receive, send)
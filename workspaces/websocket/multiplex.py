@@ -0,0 +1,90 @@
+import json
+from typing import Dict
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.contrib.auth import get_user_model
+
+from notification.consumers import NotificationConsumer
+from .consumers import BoardConsumer, TaskConsumer
+
+User = get_user_model()
+
+
+class MultiplexConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Одно соединение для досок, задач и уведомлений.
+    Клиент отправляет {"stream": "board", "payload": {"action": ..., "request_id": ...}},
+    ответы и рассылки приходят в том же формате: {"stream": ..., "payload": ...}.
+
+    Каждый поток обслуживает экземпляр обычного консьюмера (BoardConsumer и др.)
+    без своего соединения: он использует канал этого соединения, поэтому JWT
+    проверяется один раз, а рассылки групп приходят сюда и отправляются
+    клиенту с потоком из сообщения (см. websocket.utils.GROUP_STREAMS).
+    В каждом потоке может быть до max_subscriptions подписок.
+    """
+    streams = {
+        'board': BoardConsumer,
+        'task': TaskConsumer,
+        'notification': NotificationConsumer,
+    }
+    max_subscriptions = 50
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if type(user) is not User or not user.is_authenticated:
+            await self.close()
+            return
+
+        self.consumers: Dict[str, object] = {}
+        await self.accept()
+        # уведомления приходят без подписки, как в ws/notification/
+        await self.get_consumer('notification').connect()
+
+    def get_consumer(self, stream: str):
+        """Консьюмер потока создается при первом обращении"""
+        consumer = self.consumers.get(stream)
+        if consumer is None:
+            consumer = self.streams[stream]()
+            consumer.scope = self.scope
+            consumer.channel_layer = self.channel_layer
+            consumer.channel_name = self.channel_name
+            consumer.max_subscriptions = self.max_subscriptions
+            consumer.accept = self.noop
+
+            async def send_json(content, close=False):
+                await self.send_json({'stream': stream, 'payload': content}, close=close)
+
+            consumer.send_json = send_json
+            self.consumers[stream] = consumer
+        return consumer
+
+    @staticmethod
+    async def noop(*args, **kwargs):
+        pass
+
+    async def receive_json(self, content, **kwargs):
+        stream = content.get('stream') if isinstance(content, dict) else None
+        payload = content.get('payload') if isinstance(content, dict) else None
+
+        if stream not in self.streams or not isinstance(payload, dict):
+            await self.send_json({
+                'stream': stream,
+                'payload': {'errors': ['Неизвестный поток или неверный формат сообщения'],
+                            'data': None, 'response_status': 400},
+            })
+            return
+
+        await self.get_consumer(stream).receive_json(payload)
+
+    async def disconnect(self, code):
+        for consumer in getattr(self, 'consumers', {}).values():
+            await consumer.disconnect(code)
+
+    async def message_send(self, event):
+        """Рассылка группы отправляется клиенту с потоком группы"""
+        await self.send_json({'stream': event.get('stream'), 'payload': event['data']})
+
+    @classmethod
+    async def encode_json(cls, content):
+        """Убрано экранирование кириллицы"""
+        return json.dumps(content, ensure_ascii=False)
@@ -1,9 +1,9 @@
 from djangochannelsrestframework.permissions import BasePermission
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from channels.consumer import AsyncConsumer
 from django.contrib.auth import get_user_model
 
-from workspaces.models import Task
+from logic.acl import access_cache
 
 User = get_user_model()
 
@@ -29,34 +29,55 @@ class IsAuthenticated(BasePermission):
         return False
 
 
-class ThisTaskInUserWorkspace(BasePermission):
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ObjectInUserWorkSpace(BasePermission):
+    """
+    Пользователь является участником РП обьекта действия.
+    Обьект - pk (kind) или родитель из data (data_kind) для создания.
+    Проверка по кэшу прав (logic.acl) без пула потоков в обычном случае.
+    """
+    kind = None
+    data_field = None
+    data_kind = None
+
+    def get_target(self, **kwargs) -> Optional[Tuple[str, int]]:
+        pk = _to_int(kwargs.get('pk'))
+        if pk is not None:
+            return self.kind, pk
+
+        data = kwargs.get('data')
+        parent_id = _to_int(data.get(self.data_field)) if isinstance(data, dict) else None
+        if parent_id is not None:
+            return self.data_kind, parent_id
+
+        return None
+
     async def has_permission(
             self, scope: Dict[str, Any], consumer: AsyncConsumer, action: str, **kwargs
     ) -> bool:
         user = scope.get("user")
-        task_id = kwargs.get('pk')
+        target = self.get_target(**kwargs)
 
-        if task_id is not int:
-            return True
-        elif await Task.objects.filter(
-                column__board__workspace__users__in=[user.pk],
-                pk=task_id
-        ).aexists():
-            return True
+        if user is None or target is None:
+            return False
+        return await access_cache.ahas_access(user.pk, *target)
 
-        return False
 
-class UserInWorkSpaceUsers(BasePermission):
-    """Настройка прав для досок, пользователь является участником РП"""
-    async def has_permission(
-        self, scope: Dict[str, Any], consumer: AsyncConsumer, action: str, **kwargs
-    ) -> bool:
-        user = scope.get("user")
-        workspace_id = kwargs.get('workspace')
+class ThisTaskInUserWorkspace(ObjectInUserWorkSpace):
+    """Задача (или колонка создаваемой задачи) в РП пользователя"""
+    kind = 'task'
+    data_field = 'column'
+    data_kind = 'column'
 
-        if workspace_id is not int:
-            return True
-        elif await user.joined_workspaces.filter(id=workspace_id).aexists():
-            return True
 
-        return False
+class UserInWorkSpaceUsers(ObjectInUserWorkSpace):
+    """Настройка прав для досок, пользователь является участником РП"""
+    kind = 'board'
+    data_field = 'workspace'
+    data_kind = 'workspace'
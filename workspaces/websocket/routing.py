@@ -1,9 +1,11 @@
 from django.urls import path
 
-from workspaces.websocket import consumers
+from workspaces.websocket import consumers, multiplex
 
 websocket_urlpatterns = [
     # re_path(r'^ws/task/(?P<pk>\d+)/$', consumers.TaskConsumer.as_asgi()),
     path('ws/task/', consumers.TaskConsumer.as_asgi()),
     path('ws/board/', consumers.BoardConsumer.as_asgi()),
+    # доски, задачи и уведомления в одном соединении
+    path('ws/', multiplex.MultiplexConsumer.as_asgi()),
 ]
@@ -11,6 +11,7 @@ from workspaces.models import *
 from workspaces.serializers import (CommentSerializer,
                                     StickerListSerializer,
                                     ColumnSerializer,
+                                    PositionedListSerializer,
                                     )
 
 User = get_user_model()
@@ -38,9 +39,8 @@ class TaskCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         column_id = self.initial_data['column']
-        number_of_tasks = Task.objects.filter(column_id=column_id).count()
 
-        validated_data['index'] = number_of_tasks
+        validated_data.update(index_recalculation().next_position(Task, column_id=column_id))
         validated_data['column_id'] = column_id
 
         instance = Task.objects.create(**validated_data)
@@ -81,6 +81,7 @@ class TaskSerializer(
 
     class Meta:
         model = Task
+        list_serializer_class = PositionedListSerializer
         fields = (
             'id',
             'name',
@@ -107,7 +108,7 @@ class TaskSerializer(
                     {"column": 'Задачи можно перемещать только между колонками внутри доски'},
                     'invalid_column'
                 )
-            self.objects = new_col.task.all().order_by('index')
+            self.objects = new_col.task.all().order_by(*index_recalculation().ordering)
         else:
             new_col = None
 
@@ -116,9 +117,17 @@ class TaskSerializer(
 
         return attrs
 
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        # внутри списка порядковый номер проставляет PositionedListSerializer
+        if self.parent is None:
+            representation['index'] = index_recalculation().position(instance)
+        return representation
+
     def update(self, instance, validated_data):
         """При перемещении задач их порядковые номера нужно пересчитать"""
-        new_index = validated_data.get('index', None)
+        # номер, исправленный при перемещении (shift), не перезаписывается присланным
+        new_index = validated_data.pop('index', None)
         new_col = validated_data.pop('column', None)
         users = validated_data.pop('responsible', None)
 
@@ -0,0 +1,280 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import redis
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from logic.indexing import index_recalculation
+from logic.redis_client import get_redis
+from workspaces.database import get_board
+from workspaces.models import Board, Column, Task, Sticker
+from workspaces.serializers import ColumnSerializer, TaskListSerializer
+from workspaces.websocket.deltas import diff_boards
+from workspaces.websocket.serializers import BoardSerializer
+
+# база Redis для слепков досок
+SNAPSHOT_REDIS_DB = 5
+
+# запись слепка только если в Redis нет слепка более новой версии
+STORE_SNAPSHOT_LUA = """
+    local stored = tonumber(redis.call('HGET', KEYS[1], 'version') or '-1')
+    if stored <= tonumber(ARGV[1]) then
+        redis.call('HSET', KEYS[1], 'version', ARGV[1], 'data', ARGV[2])
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        return 1
+    end
+    return 0
+"""
+
+
+class BoardSnapshot:
+    """
+    Кэш сериализованных досок для рассылки по вебсокету.
+
+    Версия доски - счетчик в Redis, увеличивается при каждом изменении
+    доски, ее колонок, задач и стикеров. Слепок доски хранится в Redis
+    вместе с версией, по которой он построен, и дублируется в памяти
+    процесса. Если версия слепка совпадает с текущей, доска не читается
+    из БД и не сериализуется заново.
+
+    При изменении обьекта слепок не сбрасывается, а дополняется:
+    сериализуется заново только измененная задача или колонка.
+    Изменения, которые нельзя применить к слепку, сбрасывают его
+    (слепок будет построен из БД при следующем чтении).
+    """
+    max_local_boards = 256
+    # при большем количестве изменений слепок дешевле построить заново
+    max_patch_objects = 50
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._store_script = None
+
+    @property
+    def redis(self) -> redis.Redis:
+        return get_redis(SNAPSHOT_REDIS_DB)
+
+    @property
+    def timeout(self) -> int:
+        return settings.WORKSAPCES.get('BOARD_SNAPSHOT_TIMEOUT', 3600 * 24)
+
+    @staticmethod
+    def _version_key(board_id: int) -> str:
+        return f'board_snapshot:{board_id}:version'
+
+    @staticmethod
+    def _data_key(board_id: int) -> str:
+        return f'board_snapshot:{board_id}'
+
+    def get(self, board_id: int) -> Tuple[int, dict]:
+        """Актуальный слепок доски и его версия"""
+        version = int(self.redis.get(self._version_key(board_id)) or 0)
+
+        data = self._load(board_id, version)
+        if data is None:
+            data = self._build(board_id)
+            self._store(board_id, version, data)
+
+        return version, data
+
+    def version(self, board_id: int) -> int:
+        return int(self.redis.get(self._version_key(board_id)) or 0)
+
+    @staticmethod
+    def _task_version_key(task_id: int) -> str:
+        return f'task_snapshot:{task_id}:version'
+
+    def task_version(self, task_id: int) -> int:
+        """Версия задачи для подписчиков отдельной задачи"""
+        return int(self.redis.get(self._task_version_key(task_id)) or 0)
+
+    def next_task_versions(self, task_ids: Iterable[int]) -> Dict[int, int]:
+        """Новые версии задач, одним запросом к Redis"""
+        task_ids = list(task_ids)
+        pipe = self.redis.pipeline()
+        for task_id in task_ids:
+            pipe.incr(self._task_version_key(task_id))
+            pipe.expire(self._task_version_key(task_id), self.timeout * 2)
+        versions = pipe.execute()[::2]
+        return dict(zip(task_ids, versions))
+
+    def invalidate(self, board_id: int) -> int:
+        """Сброс слепка: новая версия без слепка"""
+        version, _, _ = self._patch(board_id, None)
+        return version
+
+    def reset(self, board_id: int) -> int:
+        """Удаление слепка, например при создании или удалении доски"""
+        with self._lock:
+            self._local.pop(board_id, None)
+        self.redis.delete(self._data_key(board_id))
+        return self.invalidate(board_id)
+
+    def update(self,
+               board_id: int,
+               column_ids: Iterable[int] = (),
+               task_ids: Iterable[int] = (),
+               name: Optional[str] = None) -> Tuple[int, Optional[list]]:
+        """
+        Применение изменений к слепку доски одной новой версией.
+        column_ids, task_ids: созданные, измененные, перемещенные или
+        удаленные колонки и задачи - их состояние читается из БД.
+        name: новое название доски
+        Возвращает новую версию и список изменений (см. deltas.diff_boards),
+        None - если изменения не удалось применить к слепку.
+        """
+        column_ids, task_ids = set(column_ids), set(task_ids)
+        if len(column_ids) + len(task_ids) > self.max_patch_objects:
+            return self.invalidate(board_id), None
+
+        columns = self._serialize_columns(column_ids)
+        tasks = self._serialize_tasks(task_ids)
+
+        def mutate(data):
+            # сначала убираем все измененные обьекты, затем вставляем
+            # существующие по возрастанию итоговых позиций
+            board_columns = [c for c in data['columns'] if c['id'] not in column_ids]
+            for position, column_data in columns:
+                board_columns.insert(position, column_data)
+
+            board_columns = [
+                {**c, 'tasks': [t for t in c['tasks'] if t['id'] not in task_ids]}
+                for c in board_columns
+            ]
+            columns_by_id = {c['id']: c for c in board_columns}
+            for position, task_data in tasks:
+                column = columns_by_id.get(task_data['column'])
+                if column is None:
+                    # колонки нет в слепке - применить изменение нельзя
+                    return None
+                column['tasks'].insert(position, task_data)
+
+            board_columns = [
+                {**c, 'tasks': self._renumber(c['tasks'])}
+                for c in self._renumber(board_columns)
+            ]
+            result = {**data, 'columns': board_columns}
+            if name is not None:
+                result['name'] = name
+            return result
+
+        version, old, new = self._patch(board_id, mutate)
+        if new is None:
+            return version, None
+
+        return version, diff_boards(old, new, column_ids, task_ids)
+
+    @staticmethod
+    def _serialize_tasks(task_ids: set) -> List[Tuple[int, dict]]:
+        """Существующие задачи с их плотными порядковыми номерами"""
+        engine = index_recalculation()
+        queryset = (Task.objects
+                    .filter(pk__in=task_ids)
+                    .prefetch_related('responsible')
+                    .prefetch_related(Prefetch('sticker', queryset=Sticker.objects.order_by('id'))))
+        queryset = list(queryset)
+        positions = engine.positions_map(queryset)
+        tasks = [
+            (positions[task.id], json.loads(json.dumps(TaskListSerializer(task).data)))
+            for task in queryset
+        ]
+        return sorted(tasks, key=lambda item: item[0])
+
+    @staticmethod
+    def _serialize_columns(column_ids: set) -> List[Tuple[int, dict]]:
+        """Существующие колонки с задачами и их плотными порядковыми номерами"""
+        queryset = (Column.objects
+                    .filter(pk__in=column_ids)
+                    .prefetch_related(Prefetch('task', queryset=Task.objects.order_by(*index_recalculation().ordering)))
+                    .prefetch_related('task__responsible')
+                    .prefetch_related(Prefetch('task__sticker', queryset=Sticker.objects.order_by('id'))))
+        # сериализатор одного обьекта сам вычисляет плотный порядковый номер
+        columns = [json.loads(json.dumps(ColumnSerializer(column).data)) for column in queryset]
+        return sorted(((c['index'], c) for c in columns), key=lambda item: item[0])
+
+    def _patch(self,
+               board_id: int,
+               mutate: Optional[Callable[[dict], Optional[dict]]]) -> Tuple[int, Optional[dict], Optional[dict]]:
+        """
+        Увеличивает версию доски и применяет изменение к слепку
+        предыдущей версии. Если такого слепка нет, его построят заново при чтении.
+        Возвращает новую версию, слепки до и после изменения.
+        """
+        pipe = self.redis.pipeline()
+        pipe.incr(self._version_key(board_id))
+        # счетчик живет дольше слепка, чтобы версии не начинались заново,
+        # пока в Redis остается слепок
+        pipe.expire(self._version_key(board_id), self.timeout * 2)
+        version, _ = pipe.execute()
+
+        if mutate is None:
+            return version, None, None
+
+        old = self._load(board_id, version - 1)
+        if old is None:
+            return version, None, None
+
+        new = mutate(old)
+        if new is not None:
+            self._store(board_id, version, new)
+
+        return version, old, new
+
+    def _load(self, board_id: int, version: int) -> Optional[dict]:
+        """Слепок указанной версии из памяти процесса или из Redis"""
+        with self._lock:
+            cached = self._local.get(board_id)
+            if cached is not None and cached[0] == version:
+                self._local.move_to_end(board_id)
+                return cached[1]
+
+        stored_version, raw = self.redis.hmget(self._data_key(board_id), 'version', 'data')
+        if raw is None or int(stored_version) != version:
+            return None
+
+        data = json.loads(raw)
+        self._remember(board_id, version, data)
+        return data
+
+    def _store(self, board_id: int, version: int, data: dict) -> None:
+        if self._store_script is None:
+            self._store_script = self.redis.register_script(STORE_SNAPSHOT_LUA)
+
+        self._store_script(
+            keys=[self._data_key(board_id)],
+            args=[version, json.dumps(data), self.timeout],
+        )
+        self._remember(board_id, version, data)
+
+    def _remember(self, board_id: int, version: int, data: dict) -> None:
+        with self._lock:
+            cached = self._local.get(board_id)
+            if cached is not None and cached[0] > version:
+                return
+
+            self._local[board_id] = (version, data)
+            self._local.move_to_end(board_id)
+            while len(self._local) > self.max_local_boards:
+                self._local.popitem(last=False)
+
+    @staticmethod
+    def _build(board_id: int) -> dict:
+        board = get_board(Board.objects.all()).get(pk=board_id)
+        # приведение к чистым dict/list, как после чтения из Redis
+        return json.loads(json.dumps(BoardSerializer(board).data))
+
+    @staticmethod
+    def _renumber(objects: list) -> list:
+        return [
+            obj if obj['index'] == i else {**obj, 'index': i}
+            for i, obj in enumerate(objects)
+        ]
+
+
+board_snapshot = BoardSnapshot()
+
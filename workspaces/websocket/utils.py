@@ -1,13 +1,51 @@
-from typing import Optional
+import json
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
 
+import redis
 from asgiref.sync import async_to_sync
+from kombu.exceptions import OperationalError
 
 from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
 
 from logic.redis_layer import CustomRedisChannelLayer
-from workspaces.database import get_board, get_task
+from workspaces.database import get_task
 from workspaces.models import Board, Task
-from workspaces.websocket.serializers import BoardSerializer, TaskSerializer
+from workspaces.websocket.deltas import group_by_task
+from workspaces.websocket.serializers import TaskSerializer
+from workspaces.websocket.snapshot import board_snapshot
+
+logger = logging.getLogger(__name__)
+
+# поток мультиплексированного соединения (MultiplexConsumer) по префиксу группы
+GROUP_STREAMS = {
+    'BoardConsumer': 'board',
+    'TaskConsumer': 'task',
+    'notification': 'notification',
+}
+
+
+def group_message(group_name: str, data: dict | None) -> dict:
+    return {
+        'type': 'message_send',
+        'stream': GROUP_STREAMS.get(group_name.split('-', 1)[0]),
+        'data': data,
+    }
+
+
+async def agroup_send_data(channel_layer: CustomRedisChannelLayer,
+                           group_name: str,
+                           data: dict | None,
+                           exclude_channel: Optional[str] = None) -> None:
+    """Рассылка сообщений всем каналам в группе из асинхронного кода (консьюмеров)"""
+    await channel_layer.group_send(
+        group_name,
+        group_message(group_name, data),
+        exclude_channel=exclude_channel,
+    )
 
 
 def group_send_data(channel_layer: CustomRedisChannelLayer,
@@ -15,36 +53,268 @@ def group_send_data(channel_layer: CustomRedisChannelLayer,
                     data: dict | None,
                     exclude_channel: Optional[str] = None) -> None:
     """Рассылка сообщений всем каналам в группе"""
-    async_to_sync(channel_layer.group_send)(
-        group_name,
-        {'type': 'message_send', 'data': data},
-        exclude_channel=exclude_channel,
+    async_to_sync(agroup_send_data)(channel_layer, group_name, data, exclude_channel)
+
+
+def group_send_data_many(channel_layer: CustomRedisChannelLayer,
+                         group_names: Iterable[str],
+                         data: dict | None) -> None:
+    """Рассылка одного сообщения всем каналам нескольких групп с общим префиксом"""
+    group_names = list(group_names)
+    if not group_names:
+        return
+    async_to_sync(channel_layer.group_send_many)(
+        group_names,
+        group_message(group_names[0], data),
     )
 
 
-def send_board_group_consumers(board_id: int) -> None:
-    channel_layer = get_channel_layer()
-    queryset = Board.objects.all()
-    queryset = get_board(queryset)
-    board = queryset.get(pk=board_id)
+def _board_snapshot_message(board_id: int) -> dict:
+    version, data = board_snapshot.get(board_id)
+    return {'event': 'board_snapshot', 'version': version, 'data': data}
+
 
-    data = BoardSerializer(board).data
+def send_board_group_consumers(board_id: int) -> None:
+    """
+    Рассылка доски целиком подписчикам. Доска берется из слепка,
+    который обновляется при изменении ее обьектов.
+    """
     group_send_data(
-        channel_layer,
+        get_channel_layer(),
         f'BoardConsumer-{board_id}',
-        data,
+        _board_snapshot_message(board_id),
     )
 
 
 def send_task_group_consumers(task_id: int) -> None:
+    """Рассылка задачи целиком подписчикам задачи"""
     channel_layer = get_channel_layer()
-    queryset = Task.objects.all()
-    queryset = get_task(queryset)
-    task = queryset.get(pk=task_id)
-    data = TaskSerializer(task).data
+    version = board_snapshot.next_task_versions([task_id])[task_id]
+    task = get_task(Task.objects.all()).filter(pk=task_id).first()
+    data = TaskSerializer(task).data if task is not None else None
 
     group_send_data(
         channel_layer,
         f'TaskConsumer-{task_id}',
-        data,
+        {'event': 'task_snapshot', 'version': version, 'data': data},
+    )
+
+
+def send_board_changes(board_id: int,
+                       version: int,
+                       changes: List[dict],
+                       task_events: Iterable[dict] = ()) -> None:
+    """
+    Рассылка изменений доски подписчикам доски и изменений задач
+    подписчикам задач. version - порядковый номер изменения:
+    если клиент пропустил номер, он запрашивает доску целиком (retrieve).
+    task_events: изменения, которые получают только подписчики задач
+    """
+    channel_layer = get_channel_layer()
+    group_send_data(
+        channel_layer,
+        f'BoardConsumer-{board_id}',
+        {'event': 'board_changes', 'version': version, 'changes': changes},
+    )
+    send_task_changes(group_by_task([*changes, *task_events]))
+
+
+def send_task_changes(task_changes: Dict[int, List[dict]]) -> None:
+    """Рассылка изменений подписчикам задач, у каждой задачи своя версия"""
+    if not task_changes:
+        return
+
+    channel_layer = get_channel_layer()
+    versions = board_snapshot.next_task_versions(task_changes.keys())
+    for task_id, changes in task_changes.items():
+        group_send_data(
+            channel_layer,
+            f'TaskConsumer-{task_id}',
+            {'event': 'task_changes', 'version': versions[task_id], 'changes': changes},
+        )
+
+
+class _PendingUpdates(threading.local):
+    def __init__(self):
+        self.boards = {}
+
+
+_pending = _PendingUpdates()
+
+# ключ блокировки живет дольше окна: если задача рассылки потеряется,
+# следующее изменение доски запланирует рассылку заново
+BROADCAST_LOCK_TIMEOUT = 10
+
+
+def schedule_board_update(board_id: Optional[int],
+                          column_id: Optional[int] = None,
+                          task_id: Optional[int] = None,
+                          name: Optional[str] = None,
+                          invalidate: bool = False,
+                          task_event: Optional[dict] = None) -> None:
+    """
+    Откладывает обновление слепка доски и рассылку изменений до фиксации
+    транзакции. Все изменения доски внутри одной транзакции
+    применяются одной версией и рассылаются одним сообщением.
+    task_event: изменение, которое получают только подписчики задачи (комментарии)
+    """
+    if board_id is None:
+        return
+
+    connection = transaction.get_connection()
+    changes = _pending.boards.get(board_id)
+    # накопленные изменения относятся к текущей транзакции, пока не
+    # сменился список ее обработчиков (фиксация или откат транзакции)
+    if changes is None or changes['committed'] or changes['hooks'] is not connection.run_on_commit:
+        changes = {
+            'column_ids': set(),
+            'task_ids': set(),
+            'name': None,
+            'invalidate': False,
+            'task_events': [],
+            'committed': False,
+            'hooks': connection.run_on_commit,
+        }
+        _pending.boards[board_id] = changes
+        transaction.on_commit(lambda: _commit_board_update(board_id, changes))
+
+    if column_id is not None:
+        changes['column_ids'].add(column_id)
+    if task_id is not None:
+        changes['task_ids'].add(task_id)
+    if name is not None:
+        changes['name'] = name
+    if task_event is not None:
+        changes['task_events'].append(task_event)
+    changes['invalidate'] |= invalidate
+
+
+def _commit_board_update(board_id: int, changes: dict) -> None:
+    changes['committed'] = True
+    if _pending.boards.get(board_id) is changes:
+        del _pending.boards[board_id]
+
+    changes = {key: value for key, value in changes.items() if key not in ('committed', 'hooks')}
+    window = settings.WORKSAPCES.get('BROADCAST_WINDOW', 0)
+    try:
+        if window:
+            _enqueue_board_update(board_id, changes, window)
+        else:
+            _send_board_update(board_id, changes)
+    except (redis.RedisError, OperationalError):
+        # OperationalError - брокер celery недоступен
+        logger.exception(f'Не удалось разослать изменения доски {board_id}')
+
+
+def _queue_keys(board_id: int) -> dict:
+    prefix = f'board_updates:{board_id}'
+    return {
+        'column_ids': f'{prefix}:columns',
+        'task_ids': f'{prefix}:tasks',
+        'meta': f'{prefix}:meta',
+        'task_events': f'{prefix}:task_events',
+        'lock': f'{prefix}:lock',
+    }
+
+
+def _enqueue_board_update(board_id: int, changes: dict, window: float) -> None:
+    """
+    Изменения доски копятся в Redis, рассылку выполняет задача celery
+    через window секунд после первого изменения. Все изменения, пришедшие
+    за это время из любых процессов, рассылаются одним сообщением.
+    """
+    keys = _queue_keys(board_id)
+    pipe = board_snapshot.redis.pipeline()
+
+    if changes['column_ids']:
+        pipe.sadd(keys['column_ids'], *changes['column_ids'])
+    if changes['task_ids']:
+        pipe.sadd(keys['task_ids'], *changes['task_ids'])
+    if changes['name'] is not None:
+        pipe.hset(keys['meta'], 'name', changes['name'])
+    if changes['invalidate']:
+        pipe.hset(keys['meta'], 'invalidate', 1)
+    if changes['task_events']:
+        pipe.rpush(keys['task_events'], *(json.dumps(event) for event in changes['task_events']))
+    for key in ('column_ids', 'task_ids', 'meta', 'task_events'):
+        pipe.expire(keys[key], board_snapshot.timeout)
+
+    pipe.set(keys['lock'], 1, nx=True, ex=BROADCAST_LOCK_TIMEOUT)
+    scheduled = pipe.execute()[-1]
+
+    if scheduled:
+        # импорт внутри функции, т.к. модуль задач импортирует этот модуль
+        from workspaces.tasks import send_board_updates
+        try:
+            send_board_updates.apply_async((board_id,), countdown=window)
+        except OperationalError:
+            # рассылка не запланирована: блокировка снимается, чтобы
+            # следующее изменение запланировало ее снова
+            board_snapshot.redis.delete(keys['lock'])
+            raise
+
+
+def flush_board_updates(board_id: int) -> None:
+    """Рассылка изменений доски, накопленных в Redis за окно"""
+    keys = _queue_keys(board_id)
+    redis_client = board_snapshot.redis
+    # блокировка снимается до чтения: изменения, пришедшие после этого,
+    # запланируют следующую рассылку
+    redis_client.delete(keys['lock'])
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.smembers(keys['column_ids'])
+    pipe.smembers(keys['task_ids'])
+    pipe.hgetall(keys['meta'])
+    pipe.lrange(keys['task_events'], 0, -1)
+    pipe.delete(keys['column_ids'], keys['task_ids'], keys['meta'], keys['task_events'])
+    column_ids, task_ids, meta, task_events, deleted = pipe.execute()
+
+    if not deleted:
+        return
+
+    name = meta.get(b'name')
+    _send_board_update(board_id, {
+        'column_ids': {int(pk) for pk in column_ids},
+        'task_ids': {int(pk) for pk in task_ids},
+        'name': name.decode() if name is not None else None,
+        'invalidate': b'invalidate' in meta,
+        'task_events': [json.loads(event) for event in task_events],
+    })
+
+
+def _send_board_update(board_id: int, changes: dict) -> None:
+    task_events = changes.pop('task_events')
+    if not (changes['column_ids'] or changes['task_ids']
+            or changes['name'] is not None or changes['invalidate']):
+        # изменились только комментарии, слепок доски не меняется
+        send_task_changes(group_by_task(task_events))
+        return
+
+    try:
+        if changes.pop('invalidate'):
+            version, board_changes = board_snapshot.invalidate(board_id), None
+        else:
+            version, board_changes = board_snapshot.update(board_id, **changes)
+
+        if board_changes is not None:
+            send_board_changes(board_id, version, board_changes, task_events)
+            return
+
+        # изменения не удалось вычислить - рассылаем обьекты целиком
+        send_board_group_consumers(board_id)
+        for task_id in changes['task_ids']:
+            send_task_group_consumers(task_id)
+        send_task_changes(group_by_task(task_events))
+    except Board.DoesNotExist:
+        # доска удалена в той же транзакции, об удалении сообщит send_board_deleted
+        pass
+
+
+def send_board_deleted(board_id: int) -> None:
+    version = board_snapshot.reset(board_id)
+    group_send_data(
+        get_channel_layer(),
+        f'BoardConsumer-{board_id}',
+        {'event': 'board_changes', 'version': version, 'changes': [{'type': 'board_deleted'}]},
     )